@@ -0,0 +1,64 @@
+"""
+Startup-time benchmark for short-lived batch workers.
+
+Runs each phase in a fresh interpreter so nothing is already imported:
+  1. import gen_orchestrator
+  2. import + build the four generators (spec files loaded, no Faker yet)
+  3. import + build + first Faker use
+
+Usage:
+  python bench_startup.py              # print median timings
+  python bench_startup.py --max-ms 300 # exit 1 if phase 2 exceeds the budget
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+PHASES = {
+    "import": "import gen_orchestrator",
+    "generators": (
+        "import gen_orchestrator as o\n"
+        "o.CustomerGenerator(); o.AccountGenerator(); o.LinkGenerator(); o.TransactionGenerator()"
+    ),
+    "first_faker": (
+        "import gen_orchestrator as o\n"
+        "g = o.TransactionGenerator(); g.fake.company()"
+    ),
+}
+
+TIMER = (
+    "import time\n"
+    "t0 = time.perf_counter()\n"
+    "{code}\n"
+    "print((time.perf_counter() - t0) * 1000)\n"
+)
+
+def time_phase(code, repeats):
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(repeats):
+        out = subprocess.run(
+            [sys.executable, "-c", TIMER.format(code=code)],
+            cwd=here, capture_output=True, text=True, check=True
+        )
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None, help="Budget for the 'generators' phase")
+    args = parser.parse_args()
+
+    results = {name: time_phase(code, args.repeats) for name, code in PHASES.items()}
+    for name, ms in results.items():
+        print(f"{name:<12} {ms:8.1f} ms")
+
+    if args.max_ms is not None and results["generators"] > args.max_ms:
+        print(f"FAIL: generators startup {results['generators']:.1f} ms > budget {args.max_ms:.1f} ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,39 @@
 import random
-from gen_shared import BaseGenerator
+from gen_shared import BaseGenerator, ColumnRegistry
+
+# Account columns come straight from the account context
+ACCOUNT_COLUMNS = ColumnRegistry(default=lambda col_name, col_type: lambda ctx, run: ctx.get(col_name, ""))
 
 class AccountGenerator(BaseGenerator):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, date_service=None):
+        super().__init__(date_service)
         self.acct_spec = self._load_spec('02_Spec_Fields_Accounts.txt')
+        self.acct_plan = ACCOUNT_COLUMNS.compile(self.acct_spec, fill=lambda t: "0" if 'NUMBER' in t else "N")
         
         # Load Reference Maps
         self.country_currency_map = {
             'US': 'USD', 'DE': 'EUR', 'FR': 'EUR', 'IT': 'EUR', 'ES': 'EUR', 'NL': 'EUR', 'FI': 'EUR',
-            'GB': 'GBP', 'JP': 'JPY', 'CN': 'CNY', 'CH': 'CHF', 'CA': 'CAD', 'AU': 'AUD', 'TR': 'TRY', 'RO': 'RON'
+            'AT': 'EUR', 'BE': 'EUR', 'IE': 'EUR', 'PT': 'EUR', 'GR': 'EUR', 'LU': 'EUR', 'SK': 'EUR',
+            'SI': 'EUR', 'EE': 'EUR', 'LV': 'EUR', 'LT': 'EUR', 'MT': 'EUR', 'CY': 'EUR', 'HR': 'EUR',
+            'GB': 'GBP', 'JP': 'JPY', 'CN': 'CNY', 'CH': 'CHF', 'CA': 'CAD', 'AU': 'AUD', 'TR': 'TRY', 'RO': 'RON',
+            'SE': 'SEK', 'NO': 'NOK', 'DK': 'DKK', 'PL': 'PLN', 'CZ': 'CZK', 'HU': 'HUF', 'IN': 'INR',
+            'BR': 'BRL', 'MX': 'MXN', 'RU': 'RUB', 'ZA': 'ZAR', 'SG': 'SGD', 'HK': 'HKD', 'AE': 'AED', 'KR': 'KRW'
         }
         
-    def generate_rows(self, customer_contexts, run_date):
+    def _build_row(self, acc_ctx):
+        return ACCOUNT_COLUMNS.render(self.acct_plan, acc_ctx)
+
+    def rows_from_contexts(self, account_contexts):
+        """Re-renders CSV rows from existing contexts (e.g. restored from a snapshot)"""
+        return [self._build_row(acc_ctx) for acc_ctx in account_contexts]
+
+    def generate_rows(self, customer_contexts, run_date, rows=None):
         """
         Generates Account rows based on Customer Specific Instructions.
+        rows: sink for the CSV rows (anything with append, e.g. a RowSpool); default a new list.
         """
         account_contexts = []
-        csv_rows = []
+        csv_rows = rows if rows is not None else []
         
         for cust in customer_contexts:
             # 1. READ CUSTOMER SPECIFIC INSTRUCTIONS
@@ -43,17 +59,20 @@ class AccountGenerator(BaseGenerator):
                     types_to_generate = ['Current']
 
             # 2. Generate Account Objects
-            for acc_request in types_to_generate:
+            for acc_no, acc_request in enumerate(types_to_generate):
+                self._seed_row('ACCOUNTS', cust['ID'], acc_no)
                 
                 # Logic to handle both old string list and new dict object from tool
                 if isinstance(acc_request, dict):
                     acc_type_desc = acc_request.get('type', 'Current')
                     bp_product_code = acc_request.get('product_code')
                     bp_overdraft = float(acc_request.get('overdraft_limit', 0.00))
+                    bp_owners = acc_request.get('owners') or []
                 else:
                     acc_type_desc = str(acc_request)
                     bp_product_code = None
                     bp_overdraft = 0.00
+                    bp_owners = []
 
                 product_code_map = {"Current": "0004", "Savings": "0011", "Business": "0002", "Trading": "PRD003", "Loan": "0007", "Mortgage": "0008"}
                 
@@ -94,21 +113,19 @@ class AccountGenerator(BaseGenerator):
                     "CITY": cust.get('OVERRIDE_CITY'),
                     "POSTAL_CODE": cust.get('POSTAL_CODE'),
                     "COUNTRY_CODE": cust['COUNTRY_CODE'],
-                    "ADDRESS_VALID_FROM": cust['ACQUISITION_DATE'],
+                    "ADDRESS_VALID_FROM": f"{cust['ACQUISITION_DATE']}000000", # TIMESTAMP in the spec
                     "OVERDRAFT_LIMIT": f"{bp_overdraft:.2f}",
-                    "ACCOUNT_CHANNEL_REMOTE_FLAG": "N"
+                    "ACCOUNT_CHANNEL_REMOTE_FLAG": "N",
+                    
+                    # Owner network info (not in the spec, used for internal counterparties)
+                    "OWNER_ROLE": cust.get('ROLE', 'STANDARD'),
+                    "NETWORK_ID": cust.get('NETWORK_ID'),
+                    # Further owners (joint holders, signatories), resolved by the LinkGenerator
+                    "OWNERS_BLUEPRINT": bp_owners
                 }
                 
                 account_contexts.append(acc_ctx)
 
-                row = []
-                for i, col in enumerate(self.acct_spec['columns']):
-                    col_name = col.upper()
-                    col_type = self.acct_spec['types'][i]
-                    val = ""
-                    if col_name in acc_ctx: val = acc_ctx[col_name]
-                    if self.acct_spec['mandatory'][i] == 'YES' and not val: val = "0" if 'NUMBER' in col_type else "N"
-                    row.append(self._enforce_length(val, col_type))
-                csv_rows.append(row)
+                csv_rows.append(self._build_row(acc_ctx))
 
         return account_contexts, csv_rows
\ No newline at end of file
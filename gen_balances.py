@@ -0,0 +1,119 @@
+import itertools
+
+# Running balances per account, derived from the generated transactions.
+# Transactions are folded chunk by chunk into net movements held in NumPy arrays:
+# per account code for closing balances, per (account, day) only when daily balances
+# are wanted, so memory depends on accounts (x active days), not on the number of
+# transactions. Dates go through DateService.parse (rows whose date does not parse
+# are skipped and reported). Amounts are summed in integer cents to stay exact at 100M+ rows.
+DAY_KEY = 10000000 # daily keys are account_code * DAY_KEY + day ordinal
+
+class BalanceReconciler:
+    def __init__(self, txn_columns, chunk_size=1000000, dates=None, daily=True):
+        from gen_shared import DateService
+        import numpy as np
+        cols = [c.strip().upper() for c in txn_columns]
+        self.idx_account = cols.index('ACCOUNT_SOURCE_UNIQUE_ID')
+        self.idx_date = cols.index('POSTING_DATE') if 'POSTING_DATE' in cols else cols.index('ORIGINATION_DATE')
+        self.idx_amount = cols.index('TXN_AMOUNT_BASE')
+        self.idx_cd = cols.index('CREDIT_DEBIT_CODE')
+        self.chunk_size = chunk_size
+        self.dates = dates or DateService()
+        self.daily = daily
+        self.account_codes = {}
+        self.account_ids = []
+        self.net = np.zeros(0, dtype=np.int64) # per account code, or per sorted key when daily
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.skipped = 0
+        self.skipped_example = None
+
+    def _code(self, account_id):
+        code = self.account_codes.get(account_id)
+        if code is None:
+            code = len(self.account_ids)
+            self.account_codes[account_id] = code
+            self.account_ids.append(account_id)
+        return code
+
+    def _day(self, value):
+        try:
+            return self.dates.parse(value or '')
+        except ValueError:
+            self.skipped += 1
+            if self.skipped_example is None: self.skipped_example = value
+            return -1
+
+    def _add_chunk(self, chunk):
+        import numpy as np
+        ia, idt, iamt, icd = self.idx_account, self.idx_date, self.idx_amount, self.idx_cd
+        days = np.fromiter((self._day(r[idt]) for r in chunk), dtype=np.int64, count=len(chunk))
+        ok = days >= 0
+        if not ok.all():
+            chunk = [r for r, keep in zip(chunk, ok.tolist()) if keep]
+            days = days[ok]
+        if not chunk: return
+        codes = np.fromiter((self._code(r[ia]) for r in chunk), dtype=np.int64, count=len(chunk))
+        cents = np.rint(np.fromiter((float(r[iamt] or 0) for r in chunk), dtype=np.float64, count=len(chunk)) * 100).astype(np.int64)
+        sign = np.fromiter((-1 if r[icd] == 'D' else 1 for r in chunk), dtype=np.int64, count=len(chunk))
+        signed = cents * sign
+
+        if not self.daily:
+            if len(self.net) < len(self.account_ids):
+                self.net = np.concatenate([self.net, np.zeros(len(self.account_ids) - len(self.net), dtype=np.int64)])
+            np.add.at(self.net, codes, signed)
+            return
+        # Merge the chunk's (account, day) sums into the sorted key / net arrays
+        keys, inverse = np.unique(np.concatenate([self.keys, codes * DAY_KEY + days]), return_inverse=True)
+        net = np.zeros(len(keys), dtype=np.int64)
+        np.add.at(net, inverse, np.concatenate([self.net, signed]))
+        self.keys, self.net = keys, net
+
+    def add_rows(self, rows):
+        """Feeds transaction rows (any iterable) in chunks"""
+        it = iter(rows)
+        while True:
+            chunk = list(itertools.islice(it, self.chunk_size))
+            if not chunk: break
+            self._add_chunk(chunk)
+        if self.skipped:
+            print(f"Balances: skipped {self.skipped} transactions with unparsable dates (e.g. {self.skipped_example!r})")
+
+    def _running(self):
+        """Sorted (account codes, day ordinals, end-of-day running net in cents) via a grouped cumsum"""
+        import numpy as np
+        codes, days, net = self.keys // DAY_KEY, self.keys % DAY_KEY, self.net
+        total = np.cumsum(net)
+        starts = np.ones(len(codes), dtype=bool)
+        starts[1:] = codes[1:] != codes[:-1]
+        # Subtract the cumulative sum reached before each account's first row
+        group_start = np.maximum.accumulate(np.where(starts, np.arange(len(codes)), 0))
+        running = total - (total - net)[group_start]
+        return codes, days, running
+
+    def closing_balances(self, opening_balances):
+        """{account_id: closing balance} = opening + net movement of all transactions"""
+        closing = {acc_id: float(bal or 0) for acc_id, bal in opening_balances.items()}
+        if not len(self.net): return closing
+        if self.daily:
+            import numpy as np
+            codes, _, running = self._running()
+            ends = np.ones(len(codes), dtype=bool)
+            ends[:-1] = codes[1:] != codes[:-1]
+            totals = zip(codes[ends].tolist(), running[ends].tolist())
+        else:
+            totals = enumerate(self.net.tolist())
+        for code, cents in totals:
+            acc_id = self.account_ids[code]
+            closing[acc_id] = closing.get(acc_id, 0.0) + cents / 100
+        return closing
+
+    def iter_daily_balances(self, opening_balances):
+        """Yields [ACCOUNT_SOURCE_UNIQUE_ID, BALANCE_DATE, BALANCE] for every active day"""
+        if not self.daily:
+            raise ValueError("daily balances need a BalanceReconciler built with daily=True")
+        if not len(self.net): return
+        codes, days, running = self._running()
+        for code, day, cents in zip(codes.tolist(), days.tolist(), running.tolist()):
+            acc_id = self.account_ids[code]
+            balance = float(opening_balances.get(acc_id) or 0) + cents / 100
+            yield [acc_id, self.dates.fmt(day), f"{balance:.2f}"]
@@ -0,0 +1,111 @@
+import os
+import glob
+import json
+import time
+import hashlib
+
+# Content-addressed cache for iterative editing of a scenario.
+# Every customer profile is hashed (canonical JSON + run date); its customer/account
+# contexts and rows are stored under that hash, so a profile that did not change
+# reuses them instead of being regenerated. Transaction rows are cached per customer
+# under (customer hash, transaction blueprint hash), plus the hash of the whole
+# population when templates draw internal counterparties from other customers.
+# Keys also cover the calendar (business days, holidays) and a version hashed from the
+# spec files and every gen_*.py module, so editing either invalidates old entries.
+# prune() (called by the orchestrator after a cached run) removes entries unused for
+# max_age_days, then the least recently used ones beyond max_mb.
+
+MAX_CACHE_MB = 1024
+MAX_CACHE_AGE_DAYS = 30
+
+def content_hash(*parts):
+    text = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+def generator_version():
+    """Hash of the spec files (working directory) and all gen_*.py modules beside this one"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths = sorted(glob.glob("0*_Spec_*.txt")) + sorted(glob.glob(os.path.join(here, "gen_*.py")))
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        if not os.path.exists(path): continue
+        digest.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as f: digest.update(f.read())
+    return digest.hexdigest()
+
+class ScenarioCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.version = generator_version()
+
+    def prune(self, max_mb=MAX_CACHE_MB, max_age_days=MAX_CACHE_AGE_DAYS):
+        """Drops entries unused for max_age_days, then the least recently used until under max_mb"""
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, "*.json*")):
+            try: st = os.stat(path)
+            except OSError: continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            too_old = cutoff is not None and mtime < cutoff
+            too_big = max_mb is not None and total > max_mb * 2 ** 20
+            if not (too_old or too_big): break
+            try: os.remove(path)
+            except OSError: continue
+            total -= size
+            removed += 1
+        if removed: print(f"Cache: removed {removed} old entries from {self.cache_dir}")
+
+    def profile_keys(self, profiles, run_date, seed=None, business_days=False, holidays=None):
+        """
+        One key per profile; identical profiles get distinct keys by occurrence.
+        Seeded runs also key on the seed and position (rows are derived from both).
+        """
+        calendar = (bool(business_days), holidays or {})
+        keys, seen = [], {}
+        for i, profile in enumerate(profiles):
+            base = content_hash(profile, run_date, calendar, self.version)
+            if seed is not None: base = content_hash(base, seed, i)
+            seen[base] = seen.get(base, 0) + 1
+            keys.append(content_hash(base, seen[base]))
+        return keys
+
+    def transaction_key(self, profile_key, transaction_blueprint, population_key=None):
+        return content_hash("TXN", profile_key, transaction_blueprint or [], population_key)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f: entry = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable cache entry {path}: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        try: os.utime(path) # mtime is the last use, for prune()
+        except OSError: pass
+        return entry
+
+    def put(self, key, entry):
+        # Write then rename, so an interrupted run never leaves a half-written entry
+        tmp = self._path(key) + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f: json.dump(entry, f)
+        os.replace(tmp, self._path(key))
+
+    def diff(self, profiles, run_date, seed=None, business_days=False, holidays=None):
+        """(unchanged, changed) profile counts against the cache, without touching it"""
+        keys = self.profile_keys(profiles, run_date, seed, business_days, holidays)
+        unchanged = sum(1 for k in keys if os.path.exists(self._path(k)))
+        return unchanged, len(keys) - unchanged
@@ -0,0 +1,83 @@
+from gen_shared import ReferenceLoader
+
+# Integer codes for categorical columns in the stored / columnar forms only:
+# context snapshots (gen_snapshot) and DuckDB loads (gen_dbsink) keep the small codes
+# plus the dictionary and only turn them back into text when read. The generators,
+# contexts, rows and text writers still carry the values as strings.
+# Each domain's dictionary starts with the codes of its 00_Spec_* table (file order,
+# so a code means the same in every run); values outside the spec are appended as
+# they are met.
+
+DOMAIN_FILES = {
+    'COUNTRY': '00_Spec_Country.txt',
+    'CURRENCY': '00_Spec_Currency_Code.txt',
+    'ORG_UNIT': '00_Spec_Organization_Units.txt',
+    'CUSTOMER_CATEGORY': '00_Spec_Customer_Category.txt',
+    'CUSTOMER_SEGMENT': '00_Spec_Customer_Segment.txt',
+    'CUSTOMER_TYPE': '00_Spec_Customer_Type.txt',
+    'PRODUCT': '00_Spec_PRODUCT_SOURCE_TYPE_CODE.txt',
+    'CREDIT_DEBIT': '00_Spec_Credit_Debit_Code.txt',
+    'GENDER': '00_Spec_Gender.txt',
+    'CHANNEL': '00_Spec_Transaction_Channel_Code.txt',
+    'TXN_TYPE': '00_Spec_Transaction_Type.txt',
+    # Generated IDs are zero-padded, unlike the spec files: these dictionaries grow as values are met
+    'BRANCH': None,
+    'EMPLOYEE': None,
+    'ACCOUNT_STATUS': None,
+    'FLAG': None, # Y / N
+}
+FIXED_VALUES = {'FLAG': ['N', 'Y']}
+
+CATEGORY_COLUMNS = {
+    'COUNTRY_CODE': 'COUNTRY', 'COUNTRY_OF_RESIDENCE': 'COUNTRY', 'COUNTRY_OF_ORIGIN': 'COUNTRY',
+    'NATIONALITY_CODE': 'COUNTRY', 'INCORPORATION_COUNTRY_CODE': 'COUNTRY', 'COUNTER_PARTY_COUNTRY_CODE': 'COUNTRY',
+    'COUNTER_PARTY_BNK_CNTRY_CD': 'COUNTRY',
+    'CURRENCY_CODE': 'CURRENCY', 'CURRENCY_CODE_ORIG': 'CURRENCY', 'CURRENCY_CODE_BASE': 'CURRENCY',
+    'ORG_UNIT': 'ORG_UNIT', 'ORG_UNIT_CODE': 'ORG_UNIT', 'ORGUNIT_CODE': 'ORG_UNIT',
+    'CUSTOMER_CATEGORY_CODE': 'CUSTOMER_CATEGORY', 'PRIMARY_CUSTOMER_CATEGORY_CODE': 'CUSTOMER_CATEGORY',
+    'CUSTOMER_SEGMENT_1': 'CUSTOMER_SEGMENT', 'CUSTOMER_TYPE_CODE': 'CUSTOMER_TYPE',
+    'PRODUCT_SOURCE_TYPE_CODE': 'PRODUCT', 'CREDIT_DEBIT_CODE': 'CREDIT_DEBIT', 'GENDER_CODE': 'GENDER',
+    'TXN_CHANNEL_CODE': 'CHANNEL', 'TXN_SOURCE_TYPE_CODE': 'TXN_TYPE',
+    'PRIME_BRANCH_ID': 'BRANCH', 'BRANCH_ID': 'BRANCH', 'RELATIONSHIP_MGR_ID': 'EMPLOYEE',
+    'RESIDENCE_FLAG': 'FLAG', 'SPECIAL_ATTENTION_FLAG': 'FLAG', 'DECEASED_FLAG': 'FLAG', 'BANKRUPT_FLAG': 'FLAG',
+    'FACE_TO_FACE_FLAG': 'FLAG', 'EMPLOYEE_FLAG': 'FLAG', 'ACCOUNT_CHANNEL_REMOTE_FLAG': 'FLAG',
+    'CUSTOMER_CHANNEL_REMOTE_FLAG': 'FLAG', 'ADVERSE_MEDIA_FLAG_INGESTED': 'FLAG',
+    'ACCOUNT_STATUS_CODE': 'ACCOUNT_STATUS',
+}
+
+class CategoryDictionary:
+    def __init__(self, loader=None):
+        self.loader = loader or ReferenceLoader()
+        self._domains = {}
+
+    def _domain(self, domain):
+        entry = self._domains.get(domain)
+        if entry is None:
+            if domain in FIXED_VALUES:
+                values = list(FIXED_VALUES[domain])
+            elif DOMAIN_FILES.get(domain):
+                values = list(dict.fromkeys(r[0] for r in self.loader.load_rows(DOMAIN_FILES[domain]) if r[0]))
+            else:
+                values = []
+            entry = self._domains[domain] = (values, {v: i for i, v in enumerate(values)})
+        return entry
+
+    def values(self, domain):
+        return self._domain(domain)[0]
+
+    def encode(self, domain, value):
+        values, index = self._domain(domain)
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(values)
+            values.append(value)
+        return code
+
+    def decode(self, domain, code):
+        return self._domain(domain)[0][code]
+
+    def encode_column(self, domain, column):
+        """Strings -> NumPy uint16 codes (uint32 if the dictionary outgrows 65536 values)"""
+        import numpy as np
+        codes = [self.encode(domain, v) for v in column]
+        return np.array(codes, dtype=np.uint16 if len(self.values(domain)) <= 65536 else np.uint32)
@@ -1,12 +1,37 @@
 import random
 import re
-from faker import Faker
-from gen_shared import BaseGenerator
+from gen_shared import BaseGenerator, BranchIndex, ColumnRegistry, FAKERS, get_faker
+
+COUNTRY_LOCALES = {
+    'US': 'en_US', 'GB': 'en_GB', 'DE': 'de_DE', 'FR': 'fr_FR',
+    'IT': 'it_IT', 'ES': 'es_ES', 'NL': 'nl_NL', 'FI': 'fi_FI',
+    'PL': 'pl_PL', 'RU': 'ru_RU', 'JP': 'ja_JP', 'CN': 'zh_CN',
+    'BR': 'pt_BR', 'MX': 'es_MX', 'TR': 'tr_TR', 'RO': 'ro_RO'
+}
+
+def _customer_default(col_name, col_type):
+    """Columns without a provider: run timestamp for TIMESTAMP types, else the context value"""
+    if 'TIMESTAMP' in col_type: return lambda ctx, run: run['RUN_TIMESTAMP']
+    if 'EMAIL' in col_name: return lambda ctx, run: ctx[col_name] if col_name in ctx else ctx.get('EMAIL_ADDRESS')
+    return lambda ctx, run: ctx.get(col_name, "")
+
+CUSTOMER_COLUMNS = ColumnRegistry(default=_customer_default)
+CUSTOMER_COLUMNS.column('ORGUNIT_CODE')(lambda ctx, run: ctx['ORG_UNIT'])
+CUSTOMER_COLUMNS.column('RUN_TIMESTAMP')(lambda ctx, run: run['RUN_TIMESTAMP'])
+CUSTOMER_COLUMNS.column('CUSTOMER_STATUS_CODE')(lambda ctx, run: 'ACTIVE')
+CUSTOMER_COLUMNS.column('EMPLOYEE_FLAG')(lambda ctx, run: 'N')
+CUSTOMER_COLUMNS.column('CUSTOMER_SOURCE_UNIQUE_ID', 'CUSTOMER_SOURCE_REF_ID')(lambda ctx, run: ctx['ID'])
+CUSTOMER_COLUMNS.column('ADDRESS')(lambda ctx, run: ctx.get('OVERRIDE_ADDRESS'))
+CUSTOMER_COLUMNS.column('CITY')(lambda ctx, run: ctx.get('OVERRIDE_CITY'))
+CUSTOMER_COLUMNS.column('POSTAL_CODE')(lambda ctx, run: ctx.get('POSTAL_CODE'))
+CUSTOMER_COLUMNS.column('COUNTRY_OF_RESIDENCE', 'COUNTRY_OF_ORIGIN', 'NATIONALITY_CODE')(
+    lambda ctx, run: ctx.get('COUNTRY_OF_RESIDENCE') or ctx['COUNTRY_CODE'])
 
 class CustomerGenerator(BaseGenerator):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, date_service=None):
+        super().__init__(date_service)
         self.cust_spec = self._load_spec('01_Spec_Fields_customers.txt')
+        self.cust_plan = CUSTOMER_COLUMNS.compile(self.cust_spec, fill=lambda t: "0" if 'NUMBER' in t else "N")
         
         # Load Maps
         self.country_map, self.country_codes = self.loader.load_file('00_Spec_Country.txt')
@@ -15,29 +40,25 @@ class CustomerGenerator(BaseGenerator):
         self.cust_type_map, self.cust_type_codes = self.loader.load_file('00_Spec_Customer_Type.txt')
         self.cust_seg_map, self.cust_seg_codes = self.loader.load_file('00_Spec_Customer_Segment.txt')
         self.cat_map, self.cat_codes = self.loader.load_file('00_Spec_Customer_Category.txt')
-        _, self.branch_ids = self.loader.load_file('00_Spec_Branch.txt', key_idx=0, val_idx=1)
-        _, self.employee_ids = self.loader.load_file('00_Spec_Employee.txt', key_idx=0, val_idx=1)
+        # Branch / relationship manager lookups (same country as the customer)
+        self.branch_index = BranchIndex(self.loader)
         self.phone_codes = {
             'US': '1', 'CA': '1', 'GB': '44', 'DE': '49', 'FR': '33', 'IT': '39',
             'ES': '34', 'NL': '31', 'CH': '41', 'AU': '61', 'JP': '81', 'CN': '86',
             'BR': '55', 'MX': '52', 'IN': '91', 'TR': '90', 'RO': '40', 'RU': '7'
         }
-        self.fakers = {}
 
     def _get_faker_for_country(self, country_code):
-        if country_code in self.fakers: return self.fakers[country_code]
-        locale_map = {
-            'US': 'en_US', 'GB': 'en_GB', 'DE': 'de_DE', 'FR': 'fr_FR',
-            'IT': 'it_IT', 'ES': 'es_ES', 'NL': 'nl_NL', 'FI': 'fi_FI',
-            'PL': 'pl_PL', 'RU': 'ru_RU', 'JP': 'ja_JP', 'CN': 'zh_CN',
-            'BR': 'pt_BR', 'MX': 'es_MX', 'TR': 'tr_TR', 'RO': 'ro_RO'
-        }
-        locale = locale_map.get(country_code, 'en_US')
-        try:
-            fake = Faker(locale)
-            self.fakers[country_code] = fake
-            return fake
-        except: return self.fake
+        # Per-thread instances from the shared pool (unknown locales fall back, with a message)
+        return get_faker(COUNTRY_LOCALES.get(country_code, 'en_US'))
+
+    def warm_fakers(self, profiles, workers=None):
+        """Preloads the Faker locales the profiles need (plus the default one) in parallel"""
+        locales = [None]
+        for profile in profiles:
+            country_code = self._resolve_value(profile.get('country'), self.country_map, self.country_codes, default='US', domain='COUNTRY')
+            locales.append(COUNTRY_LOCALES.get(country_code, 'en_US'))
+        FAKERS.warm(locales, workers)
 
     def _generate_smart_email(self, first, last, company, is_company):
         if is_company and company:
@@ -55,7 +76,7 @@ class CustomerGenerator(BaseGenerator):
 
     def generate_single_profile(self, profile):
         # 1. RESOLVE COUNTRY & FAKER
-        country_code = self._resolve_value(profile.get('country'), self.country_map, self.country_codes, default='US')
+        country_code = self._resolve_value(profile.get('country'), self.country_map, self.country_codes, default='US', domain='COUNTRY')
         local_fake = self._get_faker_for_country(country_code)
 
         raw_type = profile.get('type')
@@ -65,7 +86,7 @@ class CustomerGenerator(BaseGenerator):
         is_company = (raw_type == 'C')
 
         # 2. Resolve the Code for the CSV (Allows fallback to 'C' code if P is missing in spec, without breaking logic)
-        cust_type = self._resolve_value(raw_type, self.cust_type_map, self.cust_type_codes, default='C')
+        cust_type = self._resolve_value(raw_type, self.cust_type_map, self.cust_type_codes, default='C', domain='CUSTOMER_TYPE')
         # --- FIX END ---
         
         # 2. IDENTITY LOGIC
@@ -86,7 +107,7 @@ class CustomerGenerator(BaseGenerator):
                 legal_name = f"{legal_name} {company_form}"
             
             registered_number = profile.get('registered_number') or f"REG-{random.randint(10000,99999)}"
-            incorp_date = profile.get('incorporation_date') or self._get_random_date(start_year=-10, end_year=-1)
+            incorp_date = profile.get('incorporation_date') or self._get_random_date(start_year=-10, end_year=-1, country=country_code)
             incorp_country = country_code
         else:
             first_name = profile.get('first_name') or local_fake.first_name()
@@ -94,7 +115,7 @@ class CustomerGenerator(BaseGenerator):
             legal_name = f"{first_name} {last_name}"
             
             gender_input = profile.get('gender', 'Male' if random.random() > 0.5 else 'Female')
-            gender_code = self._resolve_value(gender_input, self.gender_map, self.gender_codes)
+            gender_code = self._resolve_value(gender_input, self.gender_map, self.gender_codes, domain='GENDER')
             
             if gender_code == 'GN0001': person_title = "Mr"
             elif gender_code == 'GN0002': person_title = "Ms"
@@ -128,16 +149,20 @@ class CustomerGenerator(BaseGenerator):
         elif country_code == 'ES':
              tax_type = "CIF" if is_company else "NIF"
         
+        branch_id, manager_id = self.branch_index.assign(country_code, balanced=self.rng is None)
+
         # 6. CONSTRUCT CONTEXT
         ctx = {
             "ID": f"CUST-{random.randint(100000,999999)}",
+            # Alias other profiles use to name this customer (e.g. as joint account owner)
+            "REF": str(profile['ref']) if profile.get('ref') else "",
             # Pass the SPECIFIC accounts for this customer to the next step
             "ACCOUNTS_BLUEPRINT": profile.get('accounts', []), 
 
-            "ORG_UNIT": self._resolve_value(profile.get('org_unit'), self.org_map, self.org_codes, default='EUR'),
+            "ORG_UNIT": self._resolve_value(profile.get('org_unit'), self.org_map, self.org_codes, default='EUR', domain='ORG_UNIT'),
             "CUSTOMER_TYPE_CODE": cust_type,
-            "CUSTOMER_CATEGORY_CODE": self._resolve_value(profile.get('category'), self.cat_map, self.cat_codes, default='RETAIL'),
-            "CUSTOMER_SEGMENT_1": self._resolve_value(profile.get('segment'), self.cust_seg_map, self.cust_seg_codes, default='SME' if is_company else 'PERS'),
+            "CUSTOMER_CATEGORY_CODE": self._resolve_value(profile.get('category'), self.cat_map, self.cat_codes, default='RETAIL', domain='CUSTOMER_CATEGORY'),
+            "CUSTOMER_SEGMENT_1": self._resolve_value(profile.get('segment'), self.cust_seg_map, self.cust_seg_codes, default='SME' if is_company else 'PERS', domain='CUSTOMER_SEGMENT'),
             
             "BUSINESS_SEGMENT_1": biz_seg_desc, 
             
@@ -148,9 +173,9 @@ class CustomerGenerator(BaseGenerator):
             "LAST_NAME": last_name,
             "MIDDLE_NAMES": profile.get('middle_names', ''),
             "GENDER_CODE": gender_code,
-            "PRIME_BRANCH_ID": str(random.choice(self.branch_ids) if self.branch_ids else "8").zfill(6),
-            "RELATIONSHIP_MGR_ID": str(random.choice(self.employee_ids) if self.employee_ids else "000001").zfill(6),
-            "ACQUISITION_DATE": self._get_random_date(),
+            "PRIME_BRANCH_ID": str(branch_id or "8").zfill(6),
+            "RELATIONSHIP_MGR_ID": str(manager_id or "000001").zfill(6),
+            "ACQUISITION_DATE": self._get_random_date(country=country_code),
             
             "REGISTERED_NUMBER": registered_number,
             "INCORPORATION_DATE": incorp_date,
@@ -207,34 +232,26 @@ class CustomerGenerator(BaseGenerator):
         }
         return ctx
 
-    def generate_rows(self, profiles, run_date):
+    def _build_row(self, ctx, run_timestamp_val):
+        return CUSTOMER_COLUMNS.render(self.cust_plan, ctx, {'RUN_TIMESTAMP': run_timestamp_val})
+
+    def rows_from_contexts(self, context_list, run_date):
+        """Re-renders CSV rows from existing contexts (e.g. restored from a snapshot)"""
         run_timestamp_val = f"{run_date}000000"
-        context_list, csv_rows = [], []
+        return [self._build_row(ctx, run_timestamp_val) for ctx in context_list]
 
-        for p in profiles:
+    def generate_rows(self, profiles, run_date, first_index=0, rows=None):
+        """
+        first_index: position of profiles[0] in the full blueprint (row key in seeded runs).
+        rows: sink for the CSV rows (anything with append, e.g. a RowSpool); default a new list.
+        """
+        run_timestamp_val = f"{run_date}000000"
+        context_list, csv_rows = [], rows if rows is not None else []
+
+        for i, p in enumerate(profiles, start=first_index):
+            self._seed_row('CUSTOMERS', i)
             ctx = self.generate_single_profile(p)
             context_list.append(ctx) 
-            
-            row = []
-            for i, col in enumerate(self.cust_spec['columns']):
-                col_name = col.upper()
-                col_type = self.cust_spec['types'][i]
-                val = ""
-                
-                if col_name == 'ORGUNIT_CODE': val = ctx['ORG_UNIT']
-                elif col_name == 'RUN_TIMESTAMP' or 'TIMESTAMP' in col_type: val = run_timestamp_val
-                elif col_name == 'CUSTOMER_STATUS_CODE': val = 'ACTIVE'
-                elif col_name == 'EMPLOYEE_FLAG': val = 'N'
-                elif col_name in ['CUSTOMER_SOURCE_UNIQUE_ID', 'CUSTOMER_SOURCE_REF_ID']: val = ctx['ID']
-                elif col_name == 'ADDRESS': val = ctx.get('OVERRIDE_ADDRESS')
-                elif col_name == 'CITY': val = ctx.get('OVERRIDE_CITY')
-                elif col_name == 'POSTAL_CODE': val = ctx.get('POSTAL_CODE')
-                elif col_name in ctx: val = ctx[col_name]
-                elif 'EMAIL' in col_name: val = ctx.get('EMAIL_ADDRESS')
-                elif col_name in ['COUNTRY_OF_RESIDENCE', 'COUNTRY_OF_ORIGIN', 'NATIONALITY_CODE']: val = ctx['COUNTRY_CODE']
-                
-                if self.cust_spec['mandatory'][i] == 'YES' and not val: val = "0" if 'NUMBER' in col_type else "N"
-                row.append(self._enforce_length(val, col_type))
-            csv_rows.append(row)
+            csv_rows.append(self._build_row(ctx, run_timestamp_val))
             
         return context_list, csv_rows
\ No newline at end of file
@@ -0,0 +1,128 @@
+import itertools
+from gen_schema import compile_rules
+from gen_categories import CATEGORY_COLUMNS, CategoryDictionary
+
+# Loads generated rows straight into a local database (no text round-trip).
+#   sqlite : stdlib sqlite3, executemany batches inside one transaction per table
+#   duckdb : optional (pip install duckdb), batches appended as Arrow tables
+#            (pandas DataFrames if pyarrow is not installed); categorical columns
+#            (gen_categories) are handed over dictionary-encoded
+# Tables are created from the 0x_Spec_Fields definitions; ID indexes are built after loading.
+
+ID_COLUMNS = ['CUSTOMER_SOURCE_UNIQUE_ID', 'ACCOUNT_SOURCE_UNIQUE_ID', 'SOURCE_TXN_UNIQUE_ID']
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def _sql_type(kind, arg, engine):
+    if kind == 'DECIMAL':
+        return 'NUMERIC' if engine == 'sqlite' else f'DECIMAL({min(arg[0], 38)},{arg[1]})'
+    if kind == 'INTEGER': return 'INTEGER' if engine == 'sqlite' else 'BIGINT'
+    if kind == 'NUMBER': return 'REAL' if engine == 'sqlite' else 'DOUBLE'
+    # Dates / timestamps stay in their YYYYMMDD[HH24MISS] text form, as in the files
+    return 'TEXT' if engine == 'sqlite' else 'VARCHAR'
+
+def _to_number(val):
+    if val == '' or val is None: return None
+    try: return float(val)
+    except ValueError: return None
+
+class DatabaseSink:
+    def __init__(self, path, engine='sqlite', batch_size=50000):
+        self.path = path
+        self.engine = engine
+        self.batch_size = batch_size
+        self.tables = []
+        self.categories = CategoryDictionary()
+        if engine == 'sqlite':
+            import sqlite3
+            self.con = sqlite3.connect(path)
+            self.con.execute("PRAGMA journal_mode=MEMORY")
+            self.con.execute("PRAGMA synchronous=OFF")
+        elif engine == 'duckdb':
+            import duckdb
+            self.con = duckdb.connect(path)
+        else:
+            raise ValueError(f"Unsupported database engine: {engine}")
+
+    def _create(self, table, rules):
+        cols = ", ".join(f"{_quote(name)} {_sql_type(kind, arg, self.engine)}" for name, kind, arg, _ in rules)
+        self.con.execute(f"DROP TABLE IF EXISTS {_quote(table)}")
+        self.con.execute(f"CREATE TABLE {_quote(table)} ({cols})")
+
+    def load(self, table, spec, rows):
+        """Creates table from spec and loads rows (any iterable) in batches; returns row count"""
+        rules = compile_rules(spec)
+        self._create(table, rules)
+        # Numeric columns get '' -> NULL; rows themselves are left untouched
+        numeric = [i for i, (_, kind, _, _) in enumerate(rules) if kind in ('DECIMAL', 'INTEGER', 'NUMBER')]
+        n_cols = len(rules)
+        total = 0
+
+        it = iter(rows)
+        if self.engine == 'sqlite':
+            sql = f"INSERT INTO {_quote(table)} VALUES ({', '.join('?' * n_cols)})"
+            with self.con: # one transaction for the whole table
+                while True:
+                    batch = list(itertools.islice(it, self.batch_size))
+                    if not batch: break
+                    values = []
+                    for row in batch:
+                        vals = list(row[:n_cols]) + [''] * (n_cols - len(row))
+                        for i in numeric: vals[i] = _to_number(vals[i])
+                        values.append(vals)
+                    self.con.executemany(sql, values)
+                    total += len(batch)
+        else:
+            names = [r[0] for r in rules]
+            while True:
+                batch = list(itertools.islice(it, self.batch_size))
+                if not batch: break
+                columns = {}
+                for i, name in enumerate(names):
+                    col = [row[i] if i < len(row) else '' for row in batch]
+                    columns[name] = [_to_number(v) for v in col] if i in numeric else col
+                self._append_duckdb(table, names, rules, columns)
+                total += len(batch)
+
+        self.tables.append((table, [r[0] for r in rules]))
+        return total
+
+    def _categorical(self, name, col, pa=None):
+        """Strings -> dictionary array (pyarrow) / Categorical (pandas) over the shared codes"""
+        domain = CATEGORY_COLUMNS[name]
+        codes = self.categories.encode_column(domain, col)
+        values = self.categories.values(domain)
+        if pa is not None:
+            return pa.DictionaryArray.from_arrays(pa.array(codes), pa.array(values, pa.string()))
+        import pandas as pd
+        return pd.Categorical.from_codes(codes, categories=values)
+
+    def _append_duckdb(self, table, names, rules, columns):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            pa = None
+        for name in names:
+            if name in CATEGORY_COLUMNS:
+                columns[name] = self._categorical(name, columns[name], pa)
+        if pa is not None:
+            frame = pa.table(columns)
+        else:
+            import pandas as pd
+            frame = pd.DataFrame(columns, columns=names)
+        self.con.register("_batch", frame)
+        casts = ", ".join(f"CAST({_quote(n)} AS {_sql_type(k, a, 'duckdb')})" for n, k, a, _ in rules)
+        self.con.execute(f"INSERT INTO {_quote(table)} SELECT {casts} FROM _batch")
+        self.con.unregister("_batch")
+
+    def create_indexes(self):
+        for table, columns in self.tables:
+            for col in ID_COLUMNS:
+                if col in columns:
+                    self.con.execute(f"CREATE INDEX IF NOT EXISTS {_quote(f'IX_{table}_{col}')} ON {_quote(table)} ({_quote(col)})")
+        if self.engine == 'sqlite': self.con.commit()
+
+    def close(self):
+        self.create_indexes()
+        self.con.close()
@@ -0,0 +1,98 @@
+import os
+import random
+
+# Fixed-width, memory-mapped copy of the account fields needed to resolve
+# internal counterparties and to book transactions on them (typology round trips
+# write the partner's legs too). Written once per run; any number of worker
+# processes can open it read-only and share the same pages (no pickling).
+DIRECTORY_FILE = "account_directory.npy"
+DIRECTORY_FIELDS = [
+    "ACCOUNT_SOURCE_UNIQUE_ID", "ACCOUNT_NAME", "IBAN", "BIC",
+    "ADDRESS", "CITY", "POSTAL_CODE", "COUNTRY_CODE",
+    "CUSTOMER_SOURCE_UNIQUE_ID", "OWNER_ROLE", "NETWORK_ID",
+    "BRANCH_ID", "CURRENCY_CODE", "ORG_UNIT_CODE"
+]
+
+def write_account_directory(output_dir, account_contexts):
+    """Writes the account directory for a run and returns its path"""
+    import numpy as np
+
+    columns = {}
+    for field in DIRECTORY_FIELDS:
+        columns[field] = [str(acc.get(field) or "").encode("utf-8") for acc in account_contexts]
+    dtype = [(field, f"S{max([len(v) for v in columns[field]] + [1])}") for field in DIRECTORY_FIELDS]
+
+    table = np.empty(len(account_contexts), dtype=dtype)
+    for field in DIRECTORY_FIELDS:
+        table[field] = columns[field]
+
+    path = os.path.join(output_dir, DIRECTORY_FILE)
+    np.save(path, table, allow_pickle=False)
+    return path
+
+class AccountDirectory:
+    """Read-only view over an account directory file (memory-mapped)"""
+    def __init__(self, path):
+        import numpy as np
+        if os.path.isdir(path): path = os.path.join(path, DIRECTORY_FILE)
+        self.path = path
+        self.table = np.load(path, mmap_mode="r", allow_pickle=False)
+        self.fields = [f for f in DIRECTORY_FIELDS if f in self.table.dtype.names] # older files have fewer
+        self._owners = self.table["CUSTOMER_SOURCE_UNIQUE_ID"]
+        self._pools = {}
+
+    def __len__(self):
+        return len(self.table)
+
+    def __iter__(self):
+        # Rows in file order, so the directory can stand in for the account list it was written from
+        for idx in range(len(self.table)): yield self.get(idx)
+
+    def iter_customers(self):
+        """
+        (customer id, its accounts as dicts) in order of first appearance, accounts in file
+        order. Grouped on the mapped owner column; dicts are built one customer at a time.
+        """
+        import numpy as np
+        if not len(self.table): return
+        _, first, inverse = np.unique(self._owners, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        order = np.argsort(inverse, kind="stable") # rows grouped by customer, file order within
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(inverse, minlength=len(first)))])
+        for group in np.argsort(first).tolist():
+            rows = order[bounds[group]:bounds[group + 1]]
+            yield self._owners[rows[0]].decode("utf-8"), [self.get(int(i)) for i in rows]
+
+    def get(self, idx):
+        """Row idx as a dict shaped like an account context"""
+        rec = self.table[idx]
+        return {field: rec[field].decode("utf-8") for field in self.fields}
+
+    def _pool(self, role, network_id):
+        """Row indices matching role (and network), cached per filter"""
+        key = (role, network_id)
+        if key not in self._pools:
+            mask = self.table["OWNER_ROLE"] == role.encode("utf-8")
+            if network_id: mask &= self.table["NETWORK_ID"] == str(network_id).encode("utf-8")
+            self._pools[key] = mask.nonzero()[0]
+        return self._pools[key]
+
+    def pick(self, exclude_customer=None, role=None, network_id=None, tries=16):
+        """Random account (by row index) not owned by exclude_customer, optionally with an owner role"""
+        n = len(self.table)
+        if not n: return None
+        excluded = exclude_customer.encode("utf-8") if exclude_customer else None
+        pools = []
+        if role and network_id: pools.append(self._pool(role.upper(), network_id))
+        if role: pools.append(self._pool(role.upper(), None))
+        for pool in pools:
+            if not len(pool): continue
+            for _ in range(tries):
+                idx = int(random.choice(pool))
+                if self._owners[idx] != excluded: return self.get(idx)
+        for _ in range(tries):
+            idx = random.randrange(n)
+            if self._owners[idx] != excluded: return self.get(idx)
+        # Most accounts belong to exclude_customer: scan once for the rest
+        candidates = (self._owners != excluded).nonzero()[0]
+        return self.get(int(random.choice(candidates))) if len(candidates) else None
@@ -0,0 +1,102 @@
+import os
+from datetime import datetime
+
+# Used when 00_Spec_FX_Rates.txt is missing (units of currency per 1 USD)
+DEFAULT_RATES = {'USD': 1.0, 'EUR': 0.95, 'GBP': 0.80, 'JPY': 150.0, 'CNY': 7.2, 'CAD': 1.35}
+
+class FxRates:
+    """
+    Local date x currency rate table (units per USD), no network access.
+    00_Spec_FX_Rates.txt holds RATE_DATE|CURRENCY_CODE|UNITS_PER_USD points; they are
+    interpolated once into a dense NumPy matrix indexed by (day - first day, currency index).
+    Dates outside the table use its first / last day.
+    Batches convert through codes() / day_indices() / convert_array(), one lookup per batch.
+    """
+    def __init__(self, file_path='00_Spec_FX_Rates.txt'):
+        self.currencies = {}
+        self.first_day = 0
+        self.matrix = None
+        self.missing = set()
+        self._table = None
+        points = self._read_points(file_path)
+        if points: self._build(points)
+        else:
+            self.currencies = {c: i for i, c in enumerate(DEFAULT_RATES)}
+            self.static = list(DEFAULT_RATES.values())
+
+    def _read_points(self, file_path):
+        points = []
+        if not os.path.exists(file_path): return points
+        try:
+            with open(file_path, 'r', encoding='utf-8-sig') as f:
+                for line in f.readlines()[1:]:
+                    parts = line.strip().split('|')
+                    if len(parts) >= 3 and parts[2].strip():
+                        day = datetime.strptime(parts[0].strip(), "%Y%m%d").toordinal()
+                        points.append((day, parts[1].strip().upper(), float(parts[2])))
+        except Exception as e:
+            print(f"Error reading {file_path}: {e}")
+            return []
+        return points
+
+    def _build(self, points):
+        import numpy as np
+        for _, ccy, _ in points:
+            if ccy not in self.currencies: self.currencies[ccy] = len(self.currencies)
+        self.first_day = min(p[0] for p in points)
+        days = np.arange(self.first_day, max(p[0] for p in points) + 1)
+        self.matrix = np.empty((len(days), len(self.currencies)))
+        for ccy, j in self.currencies.items():
+            known = sorted((d, r) for d, c, r in points if c == ccy)
+            self.matrix[:, j] = np.interp(days, [d for d, _ in known], [r for _, r in known])
+
+    def _warn_missing(self, ccy):
+        if ccy not in self.missing:
+            self.missing.add(ccy)
+            print(f"No FX rate for {ccy}, using 1.0")
+
+    def _day_index(self, day_ordinal):
+        if self.matrix is None: return 0
+        return min(max(day_ordinal - self.first_day, 0), len(self.matrix) - 1)
+
+    def rate(self, ccy, day_ordinal):
+        """Units of ccy per USD on that day"""
+        j = self.currencies.get(ccy)
+        if j is None:
+            self._warn_missing(ccy)
+            return 1.0
+        if self.matrix is None: return self.static[j]
+        return float(self.matrix[self._day_index(day_ordinal), j])
+
+    def convert(self, amount, from_ccy, to_ccy, day_ordinal):
+        if from_ccy == to_ccy: return amount
+        return amount * self.rate(to_ccy, day_ordinal) / self.rate(from_ccy, day_ordinal)
+
+    def codes(self, ccys):
+        """Currency indices for convert_array; unknown currencies map to a column of 1.0"""
+        import numpy as np
+        out = np.empty(len(ccys), dtype=np.int64)
+        for i, ccy in enumerate(ccys):
+            j = self.currencies.get(ccy)
+            if j is None:
+                self._warn_missing(ccy)
+                j = len(self.currencies)
+            out[i] = j
+        return out
+
+    def day_indices(self, day_ordinals):
+        """Row indices of the rate table for day ordinals (clamped to its first / last day)"""
+        import numpy as np
+        days = np.asarray(day_ordinals, dtype=np.int64)
+        if self.matrix is None: return np.zeros(len(days), dtype=np.int64)
+        return np.clip(days - self.first_day, 0, len(self.matrix) - 1)
+
+    def convert_array(self, from_codes, to_codes, day_idx, amounts):
+        """Vectorized convert: amounts (NumPy array) from / to currency codes on table rows day_idx"""
+        import numpy as np
+        if self._table is None:
+            rates = self.matrix if self.matrix is not None else np.array([self.static], dtype=np.float64)
+            self._table = np.hstack([rates, np.ones((len(rates), 1))]) # last column: unknown currency
+        # One fancy-indexed lookup fetches both rates of every row
+        to_rate, from_rate = self._table[np.stack([day_idx, day_idx]), np.stack([to_codes, from_codes])]
+        return np.asarray(amounts, dtype=np.float64) * to_rate / from_rate
@@ -1,36 +1,73 @@
-from gen_shared import BaseGenerator
+from gen_shared import BaseGenerator, ColumnRegistry
+
+# A link is (account id, customer id, role, from date, to date)
+LINK_COLUMNS = ColumnRegistry()
+LINK_COLUMNS.column('ACCOUNT_SOURCE_UNIQUE_ID')(lambda link, run: link[0])
+LINK_COLUMNS.column('CUSTOMER_SOURCE_UNIQUE_ID')(lambda link, run: link[1])
+LINK_COLUMNS.column('CUSTOMER_ROLE')(lambda link, run: link[2])
+LINK_COLUMNS.column('FROM_DATE')(lambda link, run: link[3])
+LINK_COLUMNS.column('TO_DATE')(lambda link, run: link[4])
 
 class LinkGenerator(BaseGenerator):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, date_service=None):
+        super().__init__(date_service)
         self.link_spec = self._load_spec('04_Spec_Fields_CustomerAccountLink.txt')
+        self.link_plan = LINK_COLUMNS.compile(self.link_spec, fill=lambda t: "N")
 
-    def generate_rows(self, customer_contexts, account_contexts):
-        csv_rows = []
-        
-        # Create a lookup for customers to easily find them by ID
-        # (Though in this flow, we usually just iterate accounts, this is safer)
-        cust_map = {c['ID']: c for c in customer_contexts}
+    def _customer_refs(self, customer_contexts):
+        """
+        Profile alias ('ref') or customer ID -> customer ID, and profile position -> customer ID.
+        Positions are a separate namespace ("#3", or a bare "3" no alias claims), so a ref
+        named "0" never collides with the first profile.
+        """
+        refs, positions = {}, {}
+        for i, cust in enumerate(customer_contexts):
+            positions[str(i)] = cust['ID']
+            refs[cust['ID']] = cust['ID']
+            if cust.get('REF'): refs[cust['REF']] = cust['ID']
+        return refs, positions
+
+    def _resolve_ref(self, ref, refs, positions):
+        if ref in refs: return refs[ref]
+        return positions.get(ref[1:] if ref.startswith('#') else ref)
+
+    def build_owner_index(self, customer_contexts, account_contexts):
+        """
+        [(account ID, [(customer ID, role, from date, to date)])] in account order.
+        Every account starts with its PRIMARY owner; 'owners' entries of the account
+        blueprint ({customer_ref, role, from_date, to_date}) add joint holders,
+        signatories etc. An entry naming the primary customer changes its role / dates.
+        """
+        refs, positions = self._customer_refs(customer_contexts)
+        unknown = set()
+        index = []
+        seen_ids, duplicates = set(), 0
 
         for acc in account_contexts:
-            cust_id = acc['CUSTOMER_SOURCE_UNIQUE_ID']
-            
-            # Context for Link is simple, we mostly just map to CSV
-            row = []
-            for i, col in enumerate(self.link_spec['columns']):
-                col_name = col.upper()
-                col_type = self.link_spec['types'][i] if i < len(self.link_spec['types']) else "STRING"
-                val = ""
-                
-                if col_name == 'ACCOUNT_SOURCE_UNIQUE_ID': val = acc['ACCOUNT_SOURCE_UNIQUE_ID']
-                elif col_name == 'CUSTOMER_SOURCE_UNIQUE_ID': val = cust_id
-                elif col_name == 'CUSTOMER_ROLE': val = 'PRIMARY'
-                elif col_name == 'FROM_DATE': val = acc['DATE_OPENED']
-                
-                is_mandatory = self.link_spec['mandatory'][i] if i < len(self.link_spec['mandatory']) else 'NO'
-                if is_mandatory == 'YES' and not val: val = "N"
-                row.append(self._enforce_length(val, col_type))
-            
-            csv_rows.append(row)
-            
-        return csv_rows
\ No newline at end of file
+            primary = acc['CUSTOMER_SOURCE_UNIQUE_ID']
+            owners = {primary: (primary, 'PRIMARY', acc['DATE_OPENED'], "")}
+
+            for item in acc.get('OWNERS_BLUEPRINT') or []:
+                ref = str(item.get('customer_ref', '')).strip()
+                cust_id = self._resolve_ref(ref, refs, positions)
+                if cust_id is None:
+                    if ref not in unknown:
+                        unknown.add(ref)
+                        print(f"Unknown customer_ref '{ref}' in account owners, skipped")
+                    continue
+                role = str(item.get('role') or ('PRIMARY' if cust_id == primary else 'JOINT')).strip().upper()
+                owners[cust_id] = (cust_id, role, item.get('from_date') or acc['DATE_OPENED'], item.get('to_date') or "")
+
+            # Kept per account row: a dict keyed by ID would silently merge the owners of colliding IDs
+            acc_id = acc['ACCOUNT_SOURCE_UNIQUE_ID']
+            if acc_id in seen_ids: duplicates += 1
+            seen_ids.add(acc_id)
+            index.append((acc_id, list(owners.values())))
+        if duplicates:
+            print(f"Warning: {duplicates} duplicate account ID(s); their links are kept per account row")
+        return index
+
+    def generate_rows(self, customer_contexts, account_contexts):
+        index = self.build_owner_index(customer_contexts, account_contexts)
+        return [LINK_COLUMNS.render(self.link_plan, (acc_id,) + owner)
+                for acc_id, owners in index for owner in owners]
\ No newline at end of file
@@ -0,0 +1,143 @@
+import os
+import csv
+import sys
+import atexit
+import shutil
+import tempfile
+
+# Memory governor for large runs.
+# Watches the process RSS (Linux /proc, else the sizes of the buffers it is told
+# about) against a budget. Under pressure, row buffers (RowSpool) move their rows
+# to pipe-delimited files in a temporary spill directory and read them back when
+# iterated, batch sizes shrink, and the orchestrator swaps the account population
+# for a memory-mapped AccountDirectory. Spill files are removed by cleanup().
+# RSS seldom shrinks after a spill (CPython reuses freed memory rather than returning
+# it), so past the high-water mark only growth since the last spill counts as new
+# pressure; otherwise every buffer would spill on every check from then on.
+
+def rss_mb():
+    """Current resident set size in MB (None where /proc is not available)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _row_bytes(row):
+    return sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row)
+
+class MemoryGovernor:
+    def __init__(self, budget_mb, spill_dir=None, high_water=0.8):
+        self.budget_mb = float(budget_mb)
+        self.high_water = high_water
+        self.spill_parent = spill_dir
+        self.spill_dir = None
+        self.in_flight = {} # buffer name -> estimated bytes held in memory
+        self.spilled_rows = 0
+        self.step_mb = self.budget_mb * (1.0 - high_water) / 4 # growth that triggers the next spill
+        self._spill_mark = None # usage right after the last spill
+        self._spools = []
+
+    def used_mb(self):
+        rss = rss_mb()
+        return rss if rss is not None else sum(self.in_flight.values()) / 2 ** 20
+
+    def pressure(self):
+        """Fraction of the budget in use"""
+        return self.used_mb() / self.budget_mb
+
+    def over(self):
+        used = self.used_mb()
+        if used < self.budget_mb * self.high_water: return False
+        return self._spill_mark is None or used - self._spill_mark >= self.step_mb
+
+    def spilled(self):
+        """Called after a spill: further spills wait for usage to grow by step_mb"""
+        self._spill_mark = self.used_mb()
+
+    def track(self, name, n_bytes):
+        self.in_flight[name] = n_bytes
+
+    def batch_size(self, base, minimum=256):
+        """base while there is headroom, shrinking linearly to minimum as usage nears the budget"""
+        headroom = 1.0 - max(0.0, self.pressure() - self.high_water / 2) / (1.0 - self.high_water / 2)
+        return max(minimum, int(base * max(0.0, headroom)))
+
+    def spill_root(self):
+        """Temporary spill directory, created on first use"""
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="gen_spill_", dir=self.spill_parent)
+            atexit.register(self.cleanup)
+        return self.spill_dir
+
+    def spool(self, name, rows=()):
+        """RowSpool holding rows (spilled right away if the budget is already tight)"""
+        spool = RowSpool(self, name)
+        self._spools.append(spool)
+        spool.extend(rows)
+        if self.over(): spool.spill()
+        return spool
+
+    def checkpoint(self):
+        """Between pipeline steps: under pressure, moves the in-memory rows of every spool to disk"""
+        if not self.over(): return False
+        for spool in self._spools: spool.spill()
+        return True
+
+    def report(self):
+        used = self.used_mb()
+        print(f"Memory: {used:.0f} / {self.budget_mb:.0f} MB, {self.spilled_rows} rows spilled to disk")
+
+    def cleanup(self):
+        if self.spill_dir and os.path.isdir(self.spill_dir):
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+        self.spill_dir = None
+
+class RowSpool:
+    """
+    Append-only row buffer. Rows stay in memory until the governor reports pressure
+    (checked every `check_every` appends), then go to a spill file; iterating yields
+    the spilled segments in order followed by the rows still in memory.
+    """
+    def __init__(self, governor, name, check_every=4096):
+        self.governor = governor
+        self.name = name
+        self.check_every = check_every
+        self.rows = []
+        self.segments = []
+        self.spilled = 0
+        self._row_bytes = None
+
+    def __len__(self):
+        return self.spilled + len(self.rows)
+
+    def append(self, row):
+        self.rows.append(row)
+        if len(self.rows) % self.check_every == 0:
+            if self._row_bytes is None: self._row_bytes = _row_bytes(row)
+            self.governor.track(self.name, len(self.rows) * self._row_bytes)
+            if self.governor.over():
+                self.spill()
+                # Spill smaller chunks from now on, so the in-memory tail stays bounded
+                self.check_every = min(self.check_every, self.governor.batch_size(self.check_every, minimum=512))
+
+    def extend(self, rows):
+        for row in rows: self.append(row)
+
+    def spill(self):
+        if not self.rows: return
+        path = os.path.join(self.governor.spill_root(), f"{self.name}_{len(self.segments):05d}.txt")
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f, delimiter='|', quoting=csv.QUOTE_MINIMAL).writerows(self.rows)
+        self.segments.append(path)
+        self.spilled += len(self.rows)
+        self.governor.spilled_rows += len(self.rows)
+        self.rows = []
+        self.governor.track(self.name, 0)
+        self.governor.spilled()
+
+    def __iter__(self):
+        for path in self.segments:
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                yield from csv.reader(f, delimiter='|')
+        yield from self.rows
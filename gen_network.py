@@ -0,0 +1,130 @@
+import random
+
+# Money-flow patterns over the HUB / FEEDER / BENEFICIARY roles of a network:
+#   FAN_IN   : every FEEDER pays every HUB
+#   FAN_OUT  : every HUB pays every BENEFICIARY
+#   LAYERING : FEEDER -> HUB, then HUB forwards what it received to BENEFICIARY
+#   CYCLE    : the members pass the money round a ring back to the first one
+PATTERNS = ['FAN_IN', 'FAN_OUT', 'LAYERING', 'CYCLE']
+ROLE_ORDER = ['HUB', 'FEEDER', 'BENEFICIARY', 'STANDARD']
+
+def _role_of(acc):
+    return str(acc.get('OWNER_ROLE') or 'STANDARD').upper()
+
+class NetworkIndex:
+    """
+    Adjacency of each network_id, built once from the account contexts.
+    Nodes are the first account of every customer in a network. Each
+    (network, pattern) is kept as a list of hop layers, each layer in CSR
+    form (indptr / indices over node positions), and generated round by
+    round in NumPy batches.
+    """
+    def __init__(self, account_contexts):
+        self.accounts = account_contexts
+        self.by_role = {}        # role -> [account idx]
+        self.by_net_role = {}    # (network_id, role) -> [account idx]
+        self.nodes = {}          # network_id -> [(account idx, role)] one per customer
+        self._csr = {}
+
+        seen = set()
+        for i, acc in enumerate(account_contexts):
+            role = _role_of(acc)
+            nid = acc.get('NETWORK_ID')
+            self.by_role.setdefault(role, []).append(i)
+            if not nid: continue
+            self.by_net_role.setdefault((nid, role), []).append(i)
+            if acc['CUSTOMER_SOURCE_UNIQUE_ID'] not in seen:
+                seen.add(acc['CUSTOMER_SOURCE_UNIQUE_ID'])
+                self.nodes.setdefault(nid, []).append((i, role))
+
+    @property
+    def network_ids(self):
+        return list(self.nodes)
+
+    def pick(self, exclude_customer=None, role=None, network_id=None, tries=16):
+        """Random account with the role (same network first), not owned by exclude_customer"""
+        role = role.upper() if role else None
+        pools = []
+        if role and network_id: pools.append(self.by_net_role.get((network_id, role), []))
+        if role: pools.append(self.by_role.get(role, []))
+        pools.append(range(len(self.accounts)))
+        for pool in pools:
+            if not pool: continue
+            for _ in range(tries):
+                acc = self.accounts[random.choice(pool)]
+                if acc['CUSTOMER_SOURCE_UNIQUE_ID'] != exclude_customer: return acc
+            others = [j for j in pool if self.accounts[j]['CUSTOMER_SOURCE_UNIQUE_ID'] != exclude_customer]
+            if others: return self.accounts[random.choice(others)]
+        return None
+
+    def _edge_layers(self, network_id, pattern):
+        members = self.nodes.get(network_id, [])
+        pos = {r: [k for k, (_, role) in enumerate(members) if role == r] for r in ROLE_ORDER}
+        fan_in = [(f, h) for f in pos['FEEDER'] for h in pos['HUB']]
+        fan_out = [(h, b) for h in pos['HUB'] for b in pos['BENEFICIARY']]
+        if pattern == 'FAN_IN': return [fan_in]
+        if pattern == 'FAN_OUT': return [fan_out]
+        if pattern == 'LAYERING': return [fan_in, fan_out]
+        if pattern == 'CYCLE':
+            ring = [k for r in ROLE_ORDER for k in pos[r]]
+            if len(ring) < 2: return []
+            return [[(ring[k], ring[(k + 1) % len(ring)])] for k in range(len(ring))]
+        raise ValueError(f"Unknown network pattern: {pattern}")
+
+    def csr(self, network_id, pattern):
+        """[(indptr, indices), ...] per hop layer, cached per (network, pattern)"""
+        import numpy as np
+        key = (network_id, pattern)
+        if key not in self._csr:
+            n = len(self.nodes.get(network_id, []))
+            layers = []
+            for edges in self._edge_layers(network_id, pattern):
+                if not edges: continue
+                edges = sorted(edges)
+                src = np.array([e[0] for e in edges], dtype=np.int64)
+                indices = np.array([e[1] for e in edges], dtype=np.int64)
+                indptr = np.zeros(n + 1, dtype=np.int64)
+                np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+                layers.append((indptr, indices))
+            self._csr[key] = layers
+        return self._csr[key]
+
+    def iter_edges(self, network_id, pattern, rounds, run_ordinal, base_amount=1000.0,
+                   fee=0.02, max_days=30, batch=10000, seed=None):
+        """
+        Yields (src account idx, dst account idx, amount, day ordinal) for every hop of
+        every round. Rounds are drawn in batches: first-layer amounts are lognormal around
+        base_amount, later layers forward the node's inflow minus fee split over its out-edges.
+        """
+        import numpy as np
+        layers = self.csr(network_id, pattern)
+        if not layers or rounds <= 0: return
+        members = self.nodes[network_id]
+        n = len(members)
+        acc_idx = np.array([m[0] for m in members], dtype=np.int64)
+        rng = np.random.default_rng(seed if seed is not None else random.getrandbits(32))
+        hops = len(layers)
+
+        for start in range(0, rounds, batch):
+            size = min(batch, rounds - start)
+            first_day = run_ordinal - rng.integers(hops, max(hops, max_days) + 1, size=size)
+            inflow = None
+            for depth, (indptr, indices) in enumerate(layers):
+                src = np.repeat(np.arange(n), np.diff(indptr))
+                fresh = base_amount * rng.lognormal(0.0, 0.25, size=(size, len(indices)))
+                if inflow is None:
+                    amounts = fresh
+                else:
+                    out_deg = np.diff(indptr)[src]
+                    forwarded = inflow[:, src] * (1.0 - fee) / out_deg
+                    amounts = np.where(forwarded > 0, forwarded, fresh)
+                inflow = np.zeros((size, n))
+                np.add.at(inflow.T, indices, amounts.T)
+
+                days = first_day + depth
+                src_acc, dst_acc = acc_idx[src].tolist(), acc_idx[indices].tolist()
+                for r in range(size):
+                    day = int(days[r])
+                    row_amounts = amounts[r].tolist()
+                    for e in range(len(indices)):
+                        yield src_acc[e], dst_acc[e], row_amounts[e], day
@@ -1,62 +1,306 @@
 import os
 import csv
+import itertools
 from gen_customers import CustomerGenerator
 from gen_accounts import AccountGenerator
 from gen_links import LinkGenerator
 from gen_transactions import TransactionGenerator
+from gen_shared import DateService, CounterRng
+from gen_snapshot import save_snapshot, load_snapshot
+from gen_directory import write_account_directory, AccountDirectory
+from gen_balances import BalanceReconciler
+from gen_validate import validate_run
+from gen_schema import header_row, write_schema
+from gen_dbsink import DatabaseSink
+from gen_cache import ScenarioCache, content_hash
+from gen_typologies import TypologyInjector, LABEL_SPEC
+from gen_memory import MemoryGovernor
+from gen_profile import RunProfile, PROFILE_FILE
 
-def generate_custom_data(customer_profiles, run_date, account_blueprint=None, transaction_blueprint=None, output_dir="output"):
+def _cached_transactions(cache, gen_txn, profile_keys, customer_contexts, account_contexts, run_date, blueprint, directory):
+    """Transaction rows per customer from the cache; only customers without an entry are generated"""
+    # Internal counterparties are drawn from the other customers, so the whole population joins the key
+    internal = any(item.get('is_internal') for item in blueprint or [])
+    population = content_hash(profile_keys) if internal else None
+    txn_keys = {}
+    rows_by_cust = {}
+    for cust, key in zip(customer_contexts, profile_keys):
+        txn_keys[cust['ID']] = cache.transaction_key(key, blueprint, population)
+        entry = cache.get(txn_keys[cust['ID']])
+        rows_by_cust[cust['ID']] = entry['rows'] if entry is not None else None
+
+    missing = {cust_id for cust_id, rows in rows_by_cust.items() if rows is None}
+    if missing:
+        cust_idx = [c.strip().upper() for c in gen_txn.txn_spec['columns']].index('CUSTOMER_SOURCE_UNIQUE_ID')
+        accounts = [a for a in account_contexts if a['CUSTOMER_SOURCE_UNIQUE_ID'] in missing]
+        for cust_id in missing: rows_by_cust[cust_id] = []
+        # One pass for all changed customers; internal counterparties still come from everyone
+        all_accounts = directory if directory is not None else account_contexts
+        for row in gen_txn.iter_rows(accounts, run_date, blueprint, all_accounts):
+            rows_by_cust[row[cust_idx]].append(row)
+        for cust_id in missing:
+            cache.put(txn_keys[cust_id], {"rows": rows_by_cust[cust_id]})
+
+    return [row for cust in customer_contexts for row in rows_by_cust[cust['ID']]]
+
+def generate_custom_data(customer_profiles, run_date, account_blueprint=None, transaction_blueprint=None, output_dir="output", business_days=False, holidays=None,
+                         save_contexts=False, restore_from=None, account_directory=False,
+                         network_blueprint=None, reconcile_balances=False, daily_balances=False,
+                         validate=False, validate_workers=None, header=False, schema=False,
+                         write_files=True, db_path=None, db_engine='sqlite', cache_dir=None,
+                         seed=None, customer_slice=None, typology_blueprint=None,
+                         memory_budget_mb=None, spill_dir=None, profile=False):
+    """
+    Runs the pipeline and returns the paths of the files written.
+    seed: counter-based mode - every customer / account / transaction row is derived from
+          hash(seed, table, row key), so the same seed gives the same rows in any slice.
+    customer_slice: (start, stop) profile positions to write (needs seed); the rest of the
+          population is only generated when internal counterparties or networks need it.
+    typology_blueprint: labelled AML typologies to inject (see gen_typologies); the ground
+          truth goes to TYPOLOGY_LABELS_<run_date>.txt.
+    memory_budget_mb: memory ceiling for the run (see gen_memory). Near the budget, row buffers
+          spill to temporary files under spill_dir (default: system temp) and the account
+          population for internal counterparties moves to a memory-mapped directory.
+    profile: writes profile.json (mixes, amount quantiles / histograms, distinct counts) computed
+          while the rows are written; slices can be combined with gen_profile.merge_profiles.
+    """
     if not os.path.exists(output_dir): os.makedirs(output_dir)
+    if customer_slice and seed is None:
+        raise ValueError("customer_slice needs a seed (rows must not depend on the profiles before it)")
     
-    # 1. Initialize Engines
-    gen_cust = CustomerGenerator()
-    gen_acct = AccountGenerator()
-    gen_link = LinkGenerator()
-    gen_txn = TransactionGenerator()
-    
+    # 1. Initialize Engines (one date service so day ranges and formats are computed once per run)
+    # business_days skips Sundays; holidays = {'DE': ['1225', '20251003'], ...}
+    dates = DateService(skip_sundays=business_days, holidays=holidays)
+    gen_cust = CustomerGenerator(dates)
+    gen_acct = AccountGenerator(dates)
+    gen_link = LinkGenerator(dates)
+    gen_txn = TransactionGenerator(dates)
+    rng = CounterRng(seed) if seed is not None else None
+    for gen in (gen_cust, gen_acct, gen_link, gen_txn): gen.rng = rng
+
+    # Memory ceiling (see gen_memory): in place before the first row, re-checked after every step
+    governor = MemoryGovernor(memory_budget_mb, spill_dir) if memory_budget_mb else None
+
+    # Profiles actually generated: all of them, unless a slice is requested whose
+    # transactions do not draw internal counterparties / network hops from the others
+    needs_population = bool(network_blueprint) or any(item.get('is_internal') for item in transaction_blueprint or [])
+    lo, hi = (0, len(customer_profiles))
+    if customer_slice and not needs_population and not restore_from and not cache_dir:
+        lo, hi = max(0, customer_slice[0]), min(len(customer_profiles), customer_slice[1])
+
+    # Build the Faker locales of the blueprint up front (in parallel) instead of on first use
+    if not restore_from:
+        gen_cust.warm_fakers(customer_profiles)
+
     # 2. EXECUTE SEQUENCE
+    # Under a budget, freshly generated customer / account rows go straight into spools
+    # (restored, cached and sliced rows are spooled once they are complete)
+    spooled = governor is not None and not restore_from and not cache_dir and not customer_slice
     
-    # Step A: Customers
-    print("--- Step 1: Generating Customers ---")
-    customer_contexts, customer_rows = gen_cust.generate_rows(customer_profiles, run_date)
-    
-    # Step B: Accounts
-    print("--- Step 2: Generating Accounts ---")
-    account_contexts, account_rows = gen_acct.generate_rows(customer_contexts, run_date)
+    if restore_from:
+        # Steps A+B from a previous run's snapshot (same IDs, only downstream stages regenerate)
+        print(f"--- Step 1-2: Restoring Customers & Accounts from {restore_from} ---")
+        customer_contexts, account_contexts = load_snapshot(restore_from)
+        customer_rows = gen_cust.rows_from_contexts(customer_contexts, run_date)
+        account_rows = gen_acct.rows_from_contexts(account_contexts)
+    elif cache_dir:
+        # Steps A+B per profile: unchanged profiles (same content hash) reuse their cached rows
+        print("--- Step 1-2: Generating Customers & Accounts (cached) ---")
+        cache = ScenarioCache(cache_dir)
+        profile_keys = cache.profile_keys(customer_profiles, run_date, seed, business_days, holidays)
+        customer_contexts, customer_rows, account_contexts, account_rows = [], [], [], []
+        for i, (profile, key) in enumerate(zip(customer_profiles, profile_keys)):
+            entry = cache.get(key)
+            if entry is None:
+                gen_cust._seed_row('CUSTOMERS', i)
+                cust_ctx = gen_cust.generate_single_profile(profile)
+                acc_ctxs, acc_rows = gen_acct.generate_rows([cust_ctx], run_date)
+                entry = {"customer": cust_ctx, "customer_row": gen_cust.rows_from_contexts([cust_ctx], run_date)[0],
+                         "accounts": acc_ctxs, "account_rows": acc_rows}
+                cache.put(key, entry)
+            customer_contexts.append(entry["customer"])
+            customer_rows.append(entry["customer_row"])
+            account_contexts.extend(entry["accounts"])
+            account_rows.extend(entry["account_rows"])
+        print(f"Profiles reused: {cache.hits}, regenerated: {cache.misses}")
+        cache.prune() # entries used above were just touched, so only stale ones go
+    else:
+        # Step A: Customers
+        print("--- Step 1: Generating Customers ---")
+        customer_contexts, customer_rows = gen_cust.generate_rows(customer_profiles[lo:hi], run_date, first_index=lo,
+                                                                 rows=governor.spool("CUSTOMERS") if spooled else None)
+        if governor is not None: governor.checkpoint()
+        
+        # Step B: Accounts
+        print("--- Step 2: Generating Accounts ---")
+        account_contexts, account_rows = gen_acct.generate_rows(customer_contexts, run_date,
+                                                                rows=governor.spool("ACCOUNTS") if spooled else None)
+        if governor is not None: governor.checkpoint()
+
+    # Slice: keep the whole population for counterparty lookups, write only the slice
+    population, population_customers = account_contexts, customer_contexts
+    if customer_slice:
+        start, stop = max(customer_slice[0] - lo, 0), max(customer_slice[1] - lo, 0)
+        slice_ids = {c['ID'] for c in customer_contexts[start:stop]}
+        customer_rows = customer_rows[start:stop]
+        customer_contexts = customer_contexts[start:stop]
+        kept = [(a, r) for a, r in zip(account_contexts, account_rows) if a['CUSTOMER_SOURCE_UNIQUE_ID'] in slice_ids]
+        account_contexts = [a for a, _ in kept]
+        account_rows = [r for _, r in kept]
+
+    if save_contexts:
+        save_snapshot(output_dir, customer_contexts, account_contexts, run_date)
+
+    if governor is not None and not spooled:
+        customer_rows = governor.spool("CUSTOMERS", customer_rows)
+        account_rows = governor.spool("ACCOUNTS", account_rows)
     
     # Step C: Links
     print("--- Step 3: Generating Links ---")
-    link_rows = gen_link.generate_rows(customer_contexts, account_contexts)
+    link_rows = gen_link.generate_rows(population_customers, account_contexts)
+    if governor is not None:
+        link_rows = governor.spool("CUSTOMER_ACCOUNT_LINK", link_rows)
+        governor.checkpoint()
     
     # Step D: Transactions
     print("--- Step 4: Generating Transactions ---")
-    transaction_rows = gen_txn.generate_rows(account_contexts, run_date, transaction_blueprint)
+    # Optional: resolve internal counterparties through a memory-mapped directory file
+    # (the same file can be opened by worker processes generating shards of accounts)
+    directory = AccountDirectory(write_account_directory(output_dir, population)) if account_directory else None
+    if (directory is None and governor is not None and governor.pressure() >= governor.high_water
+            and not network_blueprint and not (reconcile_balances or daily_balances)):
+        # Over budget: from here on the accounts only serve row building and counterparty lookups,
+        # which the directory covers (networks and balance reconciliation still need the contexts)
+        print("Memory budget: moving the account population to a memory-mapped directory")
+        directory = AccountDirectory(write_account_directory(governor.spill_root(), population))
+        if population is account_contexts: account_contexts = directory # the list itself is released
+        population = None
+    if cache_dir and not restore_from and not customer_slice:
+        transaction_rows = _cached_transactions(cache, gen_txn, profile_keys, customer_contexts, account_contexts,
+                                                run_date, transaction_blueprint, directory)
+    elif governor is not None:
+        transaction_rows = governor.spool("TRANSACTIONS", gen_txn.iter_rows(account_contexts, run_date, transaction_blueprint,
+                                                                            directory if directory is not None else population))
+    else:
+        transaction_rows = gen_txn.generate_rows(account_contexts, run_date, transaction_blueprint,
+                                                 directory if directory is not None else population)
+    
+    # Step E: Network patterns (fan-in / fan-out / layering / cycles between HUB, FEEDER, BENEFICIARY)
+    if network_blueprint:
+        print("--- Step 5: Generating Network Patterns ---")
+        network_rows = gen_txn.iter_network_rows(population, run_date, network_blueprint)
+        if customer_slice:
+            # Hops are generated for the whole population, rows kept for the slice's accounts
+            acc_idx = [c.strip().upper() for c in gen_txn.txn_spec['columns']].index('ACCOUNT_SOURCE_UNIQUE_ID')
+            slice_accounts = {a['ACCOUNT_SOURCE_UNIQUE_ID'] for a in account_contexts}
+            network_rows = (row for row in network_rows if row[acc_idx] in slice_accounts)
+        transaction_rows.extend(network_rows)
 
-    # 3. WRITE FILES
+    # Step E2: Labelled typologies (structuring, rapid in/out, round trips, high-risk wires)
+    label_rows = None
+    if typology_blueprint:
+        print("--- Step 5b: Injecting Typologies ---")
+        label_rows = []
+        injector = TypologyInjector(gen_txn, typology_blueprint)
+        # A slice writes only its own accounts, so round-trip partners come from the slice
+        # (a partner in another slice would have its legs written by this one)
+        partners = account_contexts if customer_slice else (directory if directory is not None else population)
+        transaction_rows.extend(injector.iter_rows(account_contexts, run_date, label_rows, partners))
+    if governor is not None: governor.checkpoint()
+
+    # Step F: Balance reconciliation (ACCOUNT_BALANCE becomes opening balance + net transactions)
+    reconciler = None
+    if reconcile_balances or daily_balances:
+        print("--- Step 6: Reconciling Balances ---")
+        reconciler = BalanceReconciler(gen_txn.txn_spec['columns'], dates=dates, daily=daily_balances)
+        if governor is not None: reconciler.chunk_size = governor.batch_size(reconciler.chunk_size)
+        reconciler.add_rows(transaction_rows)
+        opening = {a['ACCOUNT_SOURCE_UNIQUE_ID']: a['ACCOUNT_BALANCE'] for a in account_contexts}
+        if reconcile_balances:
+            closing = reconciler.closing_balances(opening)
+            # New dicts: restored contexts are read-only views over the snapshot
+            account_contexts = [dict(acc, ACCOUNT_BALANCE=f"{closing[acc['ACCOUNT_SOURCE_UNIQUE_ID']]:.2f}")
+                                for acc in account_contexts]
+            account_rows = gen_acct.rows_from_contexts(account_contexts)
+
+    # 3. WRITE FILES (optionally with a header row and a <file>.schema.json sidecar)
     files_created = []
-    
-    # Write Customers
-    c_file = os.path.join(output_dir, f"CUSTOMERS_{run_date}.txt")
-    with open(c_file, 'w', newline='', encoding='utf-8') as f: 
-        csv.writer(f, delimiter='|', quoting=csv.QUOTE_MINIMAL).writerows(customer_rows)
-    files_created.append(c_file)
-    
-    # Write Accounts
-    a_file = os.path.join(output_dir, f"ACCOUNTS_{run_date}.txt")
-    with open(a_file, 'w', newline='', encoding='utf-8') as f: 
-        csv.writer(f, delimiter='|', quoting=csv.QUOTE_MINIMAL).writerows(account_rows)
-    files_created.append(a_file)
-
-    # Write Links
-    l_file = os.path.join(output_dir, f"CUSTOMER_ACCOUNT_LINK_{run_date}.txt")
-    with open(l_file, 'w', newline='', encoding='utf-8') as f: 
-        csv.writer(f, delimiter='|', quoting=csv.QUOTE_MINIMAL).writerows(link_rows)
-    files_created.append(l_file)
-    
-    # Write Transactions
-    t_file = os.path.join(output_dir, f"TRANSACTIONS_{run_date}.txt")
-    with open(t_file, 'w', newline='', encoding='utf-8') as f: 
-        csv.writer(f, delimiter='|', quoting=csv.QUOTE_MINIMAL).writerows(transaction_rows)
-    files_created.append(t_file)
-        
-    return files_created
\ No newline at end of file
+    tables = [
+        ("CUSTOMERS", gen_cust.cust_spec, customer_rows),
+        ("ACCOUNTS", gen_acct.acct_spec, account_rows),
+        ("CUSTOMER_ACCOUNT_LINK", gen_link.link_spec, link_rows),
+        ("TRANSACTIONS", gen_txn.txn_spec, transaction_rows),
+    ]
+    if label_rows is not None: tables.append(("TYPOLOGY_LABELS", LABEL_SPEC, label_rows))
+    # Profile: rows are observed by whichever stage reads them first (file writer, else DB sink)
+    run_profile = RunProfile() if profile else None
+    observe = lambda table, spec, rows: run_profile.observe(table, header_row(spec), rows) if run_profile else rows
+    for table, spec, rows in tables if write_files else []:
+        path = os.path.join(output_dir, f"{table}_{run_date}.txt")
+        with open(path, 'w', newline='', encoding='utf-8') as f: 
+            writer = csv.writer(f, delimiter='|', quoting=csv.QUOTE_MINIMAL)
+            if header: writer.writerow(header_row(spec))
+            writer.writerows(observe(table, spec, rows))
+        files_created.append(path)
+        if schema: files_created.append(write_schema(table, spec, path, header))
+
+    # Optional: bulk load the same rows into SQLite / DuckDB (indexes on the ID columns after loading)
+    if db_path:
+        print(f"--- Loading {db_engine} database {db_path} ---")
+        sink = DatabaseSink(db_path, engine=db_engine, batch_size=governor.batch_size(50000) if governor else 50000)
+        for table, spec, rows in tables:
+            sink.load(table, spec, rows if write_files else observe(table, spec, rows))
+        sink.close()
+        files_created.append(db_path)
+
+    if run_profile is not None:
+        files_created.append(run_profile.save(os.path.join(output_dir, PROFILE_FILE), run_date=run_date,
+                                              customer_slice=list(customer_slice) if customer_slice else None))
+
+    # Write Daily Balances (end-of-day balance for every account/day with activity)
+    if daily_balances and write_files:
+        b_file = os.path.join(output_dir, f"ACCOUNT_DAILY_BALANCES_{run_date}.txt")
+        with open(b_file, 'w', newline='', encoding='utf-8') as f: 
+            writer = csv.writer(f, delimiter='|', quoting=csv.QUOTE_MINIMAL)
+            if header: writer.writerow(["ACCOUNT_SOURCE_UNIQUE_ID", "BALANCE_DATE", "BALANCE"])
+            writer.writerows(reconciler.iter_daily_balances(opening))
+        files_created.append(b_file)
+
+    # 4. OPTIONAL: Validate the written files against the specs (report lands next to them)
+    if validate and write_files:
+        print("--- Validating Output Files ---")
+        report = validate_run(output_dir, run_date, workers=validate_workers, header=header)
+        print(f"Validation {'passed' if report['ok'] else 'FAILED'}")
+        files_created.append(os.path.join(output_dir, "validation_report.json"))
+
+    if governor is not None:
+        governor.report()
+        governor.cleanup()
+    return files_created
+
+def iter_tables(customer_profiles, run_date, transaction_blueprint=None, network_blueprint=None,
+                business_days=False, holidays=None, seed=None):
+    """
+    In-memory variant for streaming consumers (no files, no snapshot / cache / balances).
+    Returns [(table, spec, rows)]; TRANSACTIONS rows are a generator, produced while read.
+    """
+    dates = DateService(skip_sundays=business_days, holidays=holidays)
+    gen_cust, gen_acct = CustomerGenerator(dates), AccountGenerator(dates)
+    gen_link, gen_txn = LinkGenerator(dates), TransactionGenerator(dates)
+    rng = CounterRng(seed) if seed is not None else None
+    for gen in (gen_cust, gen_acct, gen_link, gen_txn): gen.rng = rng
+    gen_cust.warm_fakers(customer_profiles)
+
+    customer_contexts, customer_rows = gen_cust.generate_rows(customer_profiles, run_date)
+    account_contexts, account_rows = gen_acct.generate_rows(customer_contexts, run_date)
+    link_rows = gen_link.generate_rows(customer_contexts, account_contexts)
+    transaction_rows = itertools.chain(
+        gen_txn.iter_rows(account_contexts, run_date, transaction_blueprint),
+        gen_txn.iter_network_rows(account_contexts, run_date, network_blueprint)
+    )
+    return [
+        ("CUSTOMERS", gen_cust.cust_spec, customer_rows),
+        ("ACCOUNTS", gen_acct.acct_spec, account_rows),
+        ("CUSTOMER_ACCOUNT_LINK", gen_link.link_spec, link_rows),
+        ("TRANSACTIONS", gen_txn.txn_spec, transaction_rows),
+    ]
\ No newline at end of file
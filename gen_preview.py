@@ -0,0 +1,195 @@
+import os
+import csv
+import mmap
+import threading
+
+# Paged access to large generated files (Streamlit run browser).
+# A file is memory-mapped and indexed once: the byte offset of every `stride`-th
+# row, found with NumPy over 16 MB blocks and cached beside the file as
+# <file>.lineidx.npy (rebuilt when size / mtime change). A page then costs one seek
+# plus at most `stride` row scans, whatever the file size.
+# Rows end at a newline outside quotes (addresses can contain line breaks), so a
+# newline only counts when the number of '"' before it is even.
+
+INDEX_SUFFIX = ".lineidx.npy"
+BLOCK = 16 * 2 ** 20
+
+def table_columns(file_name):
+    """Column names for an output file, from its spec (None for unknown files)"""
+    from gen_validate import TABLES, load_table_spec
+    from gen_schema import header_row
+    base = os.path.basename(file_name)
+    for _, prefix, spec, _, _ in TABLES:
+        # TRANSACTIONS_ must not match CUSTOMER_ACCOUNT_LINK_..., so compare the whole prefix
+        if base.startswith(prefix + "_") and base[len(prefix) + 1:len(prefix) + 2].isdigit():
+            return header_row(load_table_spec(spec))
+    return None
+
+class LineIndex:
+    def __init__(self, path, stride=1024):
+        import numpy as np
+        self.path = path
+        self.stride = stride
+        self._file = open(path, "rb")
+        stat = os.fstat(self._file.fileno())
+        self.size = stat.st_size
+        self.mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+
+        cached = self._load_cached(stat)
+        if cached is None:
+            self.n_rows, self.offsets = self._build()
+            header = np.array([stat.st_size, stat.st_mtime_ns, stride, self.n_rows], dtype=np.int64)
+            try:
+                np.save(path + INDEX_SUFFIX, np.concatenate([header, self.offsets]), allow_pickle=False)
+            except OSError:
+                pass # read-only run folder: keep the index in memory
+        else:
+            self.n_rows, self.offsets = cached
+
+    def _load_cached(self, stat):
+        import numpy as np
+        try:
+            data = np.load(self.path + INDEX_SUFFIX, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        if len(data) < 4 or data[:3].tolist() != [stat.st_size, stat.st_mtime_ns, self.stride]: return None
+        return int(data[3]), data[4:]
+
+    def _build(self):
+        """(row count, offsets of rows 0, stride, 2*stride, ...)"""
+        import numpy as np
+        offsets = [np.zeros(1, dtype=np.int64)]
+        seen = 0 # row ends before the current block
+        quotes = 0 # '"' before the current block
+        for start in range(0, self.size, BLOCK):
+            block = np.frombuffer(self.mm[start:start + BLOCK], dtype=np.uint8)
+            in_quotes = (np.cumsum(block == 34) + quotes) % 2 == 1
+            quotes += int(np.count_nonzero(block == 34))
+            ends = np.flatnonzero((block == 10) & ~in_quotes) + start + 1 # offset of the row after each row end
+            # Row k starts after row end k-1: keep rows stride, 2*stride, ...
+            first = (-seen - 1) % self.stride
+            offsets.append(ends[first::self.stride].astype(np.int64))
+            seen += len(ends)
+        offsets = np.concatenate(offsets)
+        n_rows = seen + (1 if self.size and self.mm[self.size - 1:self.size] != b"\n" else 0)
+        if len(offsets) and offsets[-1] >= self.size: offsets = offsets[:-1] # trailing newline: no row there
+        return n_rows, offsets
+
+    def __len__(self):
+        return self.n_rows
+
+    def _row_end(self, pos):
+        """Offset of the newline ending the row that starts at pos (or the file size)"""
+        end = self.mm.find(b"\n", pos)
+        while end >= 0 and self.mm[pos:end].count(b'"') % 2:
+            end = self.mm.find(b"\n", end + 1)
+        return end if end >= 0 else self.size
+
+    def lines(self, start, count):
+        """Decoded text of rows [start, start + count)"""
+        if start >= self.n_rows or count <= 0: return []
+        pos = int(self.offsets[start // self.stride])
+        for _ in range(start % self.stride):
+            pos = self._row_end(pos) + 1
+        out = []
+        while len(out) < count and pos < self.size:
+            end = self._row_end(pos)
+            out.append(self.mm[pos:end].decode("utf-8", errors="replace").rstrip("\r"))
+            pos = end + 1
+        return out
+
+    def rows(self, start, count):
+        return list(csv.reader(self.lines(start, count), delimiter="|"))
+
+    def close(self):
+        if self.size: self.mm.close()
+        self._file.close()
+
+class ColumnProfiler:
+    """
+    Per-column summary (filled / empty, numeric min / max / mean, distinct values up
+    to a cap, most frequent values) computed on a background thread; snapshot() can
+    be called at any time while it runs.
+    """
+    MAX_DISTINCT = 10000
+
+    def __init__(self, path, columns=None, skip_header=False, chunk_lines=50000):
+        self.path = path
+        self.columns = columns
+        self.skip_header = skip_header
+        self.chunk_lines = chunk_lines
+        self.stats = {}
+        self.rows = 0
+        self.progress = 0.0
+        self.done = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        if not self._thread.is_alive() and not self.done: self._thread.start()
+        return self
+
+    def _column(self, i):
+        stat = self.stats.get(i)
+        if stat is None:
+            stat = self.stats[i] = {"filled": 0, "empty": 0, "numeric": 0, "min": None, "max": None,
+                                    "sum": 0.0, "counts": {}, "capped": False}
+        return stat
+
+    def _add(self, rows):
+        for row in rows:
+            for i, val in enumerate(row):
+                stat = self._column(i)
+                if val == "":
+                    stat["empty"] += 1
+                    continue
+                stat["filled"] += 1
+                counts = stat["counts"]
+                if val in counts: counts[val] += 1
+                elif len(counts) < self.MAX_DISTINCT: counts[val] = 1
+                else: stat["capped"] = True
+                try: num = float(val)
+                except ValueError: continue
+                stat["numeric"] += 1
+                stat["sum"] += num
+                stat["min"] = num if stat["min"] is None else min(stat["min"], num)
+                stat["max"] = num if stat["max"] is None else max(stat["max"], num)
+        self.rows += len(rows)
+
+    def _run(self):
+        size = os.path.getsize(self.path) or 1
+        with open(self.path, "r", newline="", encoding="utf-8", errors="replace") as f:
+            reader = csv.reader(f, delimiter="|")
+            if self.skip_header: next(reader, None)
+            chunk = []
+            for row in reader:
+                chunk.append(row)
+                if len(chunk) == self.chunk_lines:
+                    with self._lock:
+                        self._add(chunk)
+                        self.progress = f.buffer.tell() / size
+                    chunk = []
+            with self._lock:
+                self._add(chunk)
+                self.progress = 1.0
+                self.done = True
+
+    def snapshot(self, top=5):
+        """List of per-column summaries (dicts) for the rows profiled so far"""
+        with self._lock:
+            out = []
+            for i in sorted(self.stats):
+                stat = self.stats[i]
+                numeric = stat["numeric"] and stat["numeric"] == stat["filled"]
+                ranked = sorted(stat["counts"].items(), key=lambda kv: -kv[1])[:top]
+                out.append({
+                    "column": self.columns[i] if self.columns and i < len(self.columns) else f"#{i + 1}",
+                    "filled": stat["filled"],
+                    "empty": stat["empty"],
+                    "distinct": f"{len(stat['counts'])}+" if stat["capped"] else len(stat["counts"]),
+                    "min": stat["min"] if numeric else "",
+                    "max": stat["max"] if numeric else "",
+                    "mean": round(stat["sum"] / stat["numeric"], 4) if numeric else "",
+                    "top": ", ".join(f"{v} ({n})" for v, n in ranked),
+                })
+            return out
@@ -0,0 +1,261 @@
+import math
+import json
+import base64
+import hashlib
+
+# Streaming data profile of a run (profile.json next to the output files).
+# Rows are observed while the writers consume them, so nothing is re-read:
+#   - categorical mixes: exact counts (small domains, capped)
+#   - amounts: QuantileSketch per currency (log-spaced buckets, 1% relative error,
+#     mergeable; also gives the histogram)
+#   - distinct customers / counterparty accounts: HyperLogLog (p=12, ~1.6% error)
+# profile.json carries the mergeable sketch states next to the readable summary, so
+# profiles of customer slices combine with merge_profiles().
+
+PROFILE_FILE = "profile.json"
+MAX_CATEGORIES = 500 # further values are counted under "_OTHER"
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'little')
+
+class HyperLogLog:
+    def __init__(self, p=12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add(self, value):
+        x = _hash64(value)
+        idx = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[idx]: self.registers[idx] = rank
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros: estimate = m * math.log(m / zeros) # small-range correction
+        return int(round(estimate))
+
+    def merge(self, other):
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def state(self):
+        return {"p": self.p, "registers": base64.b64encode(bytes(self.registers)).decode('ascii')}
+
+    @classmethod
+    def from_state(cls, state):
+        hll = cls(state["p"])
+        hll.registers = bytearray(base64.b64decode(state["registers"]))
+        return hll
+
+class QuantileSketch:
+    """Log-bucketed sketch (DDSketch style): quantiles within rel_acc relative error"""
+    def __init__(self, rel_acc=0.01):
+        self.rel_acc = rel_acc
+        self.gamma = (1 + rel_acc) / (1 - rel_acc)
+        self.log_gamma = math.log(self.gamma)
+        self.bins = {} # signed bucket index -> count (0 = zero)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, x, n=1):
+        if x == 0: key = 0
+        else:
+            i = max(1, math.ceil(math.log(abs(x)) / self.log_gamma) + 1025) # +1025: values down to ~1e-9 stay > 0
+            key = i if x > 0 else -i
+        self.bins[key] = self.bins.get(key, 0) + n
+        self.count += n
+        self.sum += x * n
+        self.min = x if self.min is None else min(self.min, x)
+        self.max = x if self.max is None else max(self.max, x)
+
+    def _value(self, key):
+        if key == 0: return 0.0
+        v = 2 * self.gamma ** (abs(key) - 1025) / (self.gamma + 1)
+        return v if key > 0 else -v
+
+    def quantile(self, q):
+        if not self.count: return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.bins, key=self._value):
+            seen += self.bins[key]
+            if seen > rank: return min(max(self._value(key), self.min), self.max)
+        return self.max
+
+    def histogram(self):
+        """Counts per power-of-ten range of the absolute value"""
+        out = {}
+        for key, n in self.bins.items():
+            v = abs(self._value(key))
+            label = "0" if v < 1 else f"1e{int(math.floor(math.log10(v)))}"
+            out[label] = out.get(label, 0) + n
+        return dict(sorted(out.items(), key=lambda kv: float(kv[0]) if kv[0] != "0" else 0.0))
+
+    def merge(self, other):
+        for key, n in other.bins.items(): self.bins[key] = self.bins.get(key, 0) + n
+        self.count += other.count
+        self.sum += other.sum
+        for v in (other.min, other.max):
+            if v is None: continue
+            self.min = v if self.min is None else min(self.min, v)
+            self.max = v if self.max is None else max(self.max, v)
+
+    def summary(self):
+        if not self.count: return {"count": 0}
+        return {"count": self.count, "sum": round(self.sum, 2), "min": self.min, "max": self.max,
+                "mean": round(self.sum / self.count, 2),
+                "p50": round(self.quantile(0.5), 2), "p90": round(self.quantile(0.9), 2),
+                "p99": round(self.quantile(0.99), 2), "histogram": self.histogram()}
+
+    def state(self):
+        return {"rel_acc": self.rel_acc, "bins": {str(k): n for k, n in self.bins.items()},
+                "count": self.count, "sum": self.sum, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state["rel_acc"])
+        sketch.bins = {int(k): n for k, n in state["bins"].items()}
+        sketch.count, sketch.sum, sketch.min, sketch.max = state["count"], state["sum"], state["min"], state["max"]
+        return sketch
+
+def _cap(counts):
+    """Keeps the MAX_CATEGORIES most frequent values, folding the rest into _OTHER"""
+    values = [v for v in counts if v != "_OTHER"]
+    if len(values) <= MAX_CATEGORIES: return counts
+    values.sort(key=lambda v: -counts[v])
+    capped = {v: counts[v] for v in values[:MAX_CATEGORIES]}
+    capped["_OTHER"] = counts.get("_OTHER", 0) + sum(counts[v] for v in values[MAX_CATEGORIES:])
+    return capped
+
+def _to_float(val):
+    try: return float(val)
+    except (TypeError, ValueError): return None
+
+class RunProfile:
+    # table -> categorical columns counted exactly
+    MIXES = {
+        "CUSTOMERS": ["CUSTOMER_TYPE_CODE", "COUNTRY_OF_RESIDENCE", "CUSTOMER_SEGMENT_1"],
+        "ACCOUNTS": ["CURRENCY_CODE", "COUNTRY_CODE", "PRODUCT_SOURCE_TYPE_CODE"],
+        "TRANSACTIONS": ["CREDIT_DEBIT_CODE", "CURRENCY_CODE_ORIG", "TXN_CHANNEL_CODE",
+                         "COUNTER_PARTY_COUNTRY_CODE", "TXN_SOURCE_TYPE_CODE"],
+    }
+
+    def __init__(self):
+        self.rows = {}
+        self.mixes = {}
+        self.amounts = {} # currency -> QuantileSketch of TXN_AMOUNT_ORIG ("BASE" for TXN_AMOUNT_BASE)
+        self.distinct = {} # name -> HyperLogLog
+        self.internal = {"INTERNAL": 0, "EXTERNAL": 0}
+        self.per_customer = QuantileSketch() # transactions per customer, filled by finish()
+        self._txn_counts = {}
+
+    def _mix(self, table, col, val):
+        counts = self.mixes.setdefault(table, {}).setdefault(col, {})
+        if val not in counts and len(counts) >= MAX_CATEGORIES: val = "_OTHER"
+        counts[val] = counts.get(val, 0) + 1
+
+    def _hll(self, name):
+        hll = self.distinct.get(name)
+        if hll is None: hll = self.distinct[name] = HyperLogLog()
+        return hll
+
+    def _amount(self, key):
+        sketch = self.amounts.get(key)
+        if sketch is None: sketch = self.amounts[key] = QuantileSketch()
+        return sketch
+
+    def observe(self, table, columns, rows):
+        """Passes rows through unchanged while profiling them (wrap the writer's input with it)"""
+        idx = {c: i for i, c in enumerate(columns)}
+        mixes = [(c, idx[c]) for c in self.MIXES.get(table, []) if c in idx]
+        get = lambda row, col: row[idx[col]] if col in idx and idx[col] < len(row) else ""
+        n = 0
+        for row in rows:
+            n += 1
+            for col, i in mixes: self._mix(table, col, row[i] if i < len(row) else "")
+            if table == "CUSTOMERS":
+                self._hll("customers").add(get(row, "CUSTOMER_SOURCE_UNIQUE_ID"))
+            elif table == "ACCOUNTS":
+                self._hll("accounts").add(get(row, "ACCOUNT_SOURCE_UNIQUE_ID"))
+            elif table == "TRANSACTIONS":
+                cust = get(row, "CUSTOMER_SOURCE_UNIQUE_ID")
+                self._txn_counts[cust] = self._txn_counts.get(cust, 0) + 1
+                amount = _to_float(get(row, "TXN_AMOUNT_ORIG"))
+                if amount is not None: self._amount(get(row, "CURRENCY_CODE_ORIG") or "?").add(amount)
+                base = _to_float(get(row, "TXN_AMOUNT_BASE"))
+                if base is not None: self._amount("BASE").add(base)
+                self.internal["INTERNAL" if get(row, "COUNTER_PARTY_BANK_CODE") == "BNK_INT" else "EXTERNAL"] += 1
+                cpty = get(row, "COUNTER_PARTY_ACCOUNT_NUM") or get(row, "COUNTER_PARTY_ACCOUNT_IBAN")
+                if cpty: self._hll("counterparty_accounts").add(cpty)
+                self._hll("transacting_customers").add(cust)
+            yield row
+        self.rows[table] = self.rows.get(table, 0) + n
+
+    def finish(self):
+        """Folds the exact per-customer counts into the (mergeable) sketch"""
+        for n in self._txn_counts.values(): self.per_customer.add(n)
+        self._txn_counts = {}
+
+    def merge(self, other):
+        for table, n in other.rows.items(): self.rows[table] = self.rows.get(table, 0) + n
+        for table, cols in other.mixes.items():
+            for col, counts in cols.items():
+                mine = self.mixes.setdefault(table, {}).setdefault(col, {})
+                for val, n in counts.items(): mine[val] = mine.get(val, 0) + n
+                # Each side may hold up to MAX_CATEGORIES values: cap the union again
+                self.mixes[table][col] = _cap(mine)
+        for key, sketch in other.amounts.items(): self._amount(key).merge(sketch)
+        for name, hll in other.distinct.items(): self._hll(name).merge(hll)
+        for key, n in other.internal.items(): self.internal[key] = self.internal.get(key, 0) + n
+        self.per_customer.merge(other.per_customer)
+
+    def summary(self):
+        txns = sum(self.internal.values())
+        return {
+            "rows": self.rows,
+            "mix": {table: {col: dict(sorted(counts.items(), key=lambda kv: -kv[1])) for col, counts in cols.items()}
+                    for table, cols in self.mixes.items()},
+            "amounts_by_currency": {k: s.summary() for k, s in sorted(self.amounts.items()) if k != "BASE"},
+            "amount_base": self.amounts["BASE"].summary() if "BASE" in self.amounts else {"count": 0},
+            "transactions_per_customer": self.per_customer.summary(),
+            "internal_share": round(self.internal["INTERNAL"] / txns, 4) if txns else None,
+            "internal_vs_external": self.internal,
+            "distinct_estimates": {name: hll.count() for name, hll in sorted(self.distinct.items())},
+        }
+
+    def state(self):
+        return {"rows": self.rows, "mixes": self.mixes, "internal": self.internal,
+                "amounts": {k: s.state() for k, s in self.amounts.items()},
+                "distinct": {k: h.state() for k, h in self.distinct.items()},
+                "per_customer": self.per_customer.state()}
+
+    @classmethod
+    def from_state(cls, state):
+        profile = cls()
+        profile.rows, profile.mixes, profile.internal = state["rows"], state["mixes"], state["internal"]
+        profile.amounts = {k: QuantileSketch.from_state(s) for k, s in state["amounts"].items()}
+        profile.distinct = {k: HyperLogLog.from_state(s) for k, s in state["distinct"].items()}
+        profile.per_customer = QuantileSketch.from_state(state["per_customer"])
+        return profile
+
+    def save(self, path, **extra):
+        self.finish()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(dict(extra, summary=self.summary(), state=self.state()), f, indent=1)
+        return path
+
+def load_profile(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return RunProfile.from_state(json.load(f)["state"])
+
+def merge_profiles(paths, out_path, **extra):
+    """Merges the profile.json files of several slices / shards into out_path"""
+    merged = RunProfile()
+    for path in paths: merged.merge(load_profile(path))
+    return merged.save(out_path, **extra)
@@ -0,0 +1,73 @@
+import os
+import re
+import json
+
+# Machine-readable schema for each output table, derived from the 0x_Spec_Fields specs.
+# Written as <TABLE>_<run_date>.schema.json next to the data file so bulk loaders
+# (COPY, Spark, DuckDB ...) can use typed ingestion instead of schema inference.
+
+DATE_FORMAT = "YYYYMMDD"
+TIMESTAMP_FORMAT = "YYYYMMDDHH24MISS"
+
+def parse_type(col_type):
+    """Spec type text -> (kind, arg). kind is STRING/DATE/TIMESTAMP/DECIMAL/INTEGER/NUMBER or None"""
+    col_type = col_type.upper().replace(' ', '')
+    m = re.match(r'^(DECIMAL|NUMBER)\((\d+),(\d+)\)$', col_type)
+    if m: return 'DECIMAL', (int(m.group(2)), int(m.group(3)))
+    if col_type.startswith('STRING('):
+        try: return 'STRING', int(col_type[7:].rstrip(')'))
+        except ValueError: return None, None
+    if col_type.startswith('TIMESTAMP'): return 'TIMESTAMP', None
+    if col_type.startswith('DATE'): return 'DATE', None
+    if col_type == 'INTEGER': return 'INTEGER', None
+    if col_type in ('NUMBER', 'FLOAT'): return 'NUMBER', None
+    return None, None
+
+def compile_rules(spec):
+    """Spec dict from _load_spec -> [(column, kind, arg, mandatory)]"""
+    rules = []
+    for i, col in enumerate(spec['columns']):
+        kind, arg = parse_type(spec['types'][i])
+        mandatory = spec['mandatory'][i].strip().upper() == 'YES'
+        rules.append((col.strip().upper(), kind, arg, mandatory))
+    return rules
+
+def header_row(spec):
+    return [col.strip().upper() for col in spec['columns']]
+
+def build_schema(table, spec, data_file, header=False):
+    columns = []
+    for pos, (name, kind, arg, mandatory) in enumerate(compile_rules(spec), start=1):
+        col = {"name": name, "position": pos, "spec_type": spec['types'][pos - 1].strip(), "nullable": not mandatory}
+        if kind == 'STRING':
+            col.update(type="string", length=arg)
+        elif kind == 'DATE':
+            col.update(type="date", format=DATE_FORMAT)
+        elif kind == 'TIMESTAMP':
+            col.update(type="timestamp", format=TIMESTAMP_FORMAT)
+        elif kind == 'DECIMAL':
+            col.update(type="decimal", precision=arg[0], scale=arg[1])
+        elif kind == 'INTEGER':
+            col.update(type="integer")
+        elif kind == 'NUMBER':
+            col.update(type="double")
+        else:
+            col.update(type="string")
+        columns.append(col)
+    return {
+        "table": table,
+        "file": os.path.basename(data_file),
+        "format": "csv",
+        "delimiter": "|",
+        "quote": '"',
+        "encoding": "utf-8",
+        "header": header,
+        "columns": columns
+    }
+
+def write_schema(table, spec, data_file, header=False):
+    """Writes the sidecar next to data_file and returns its path"""
+    path = os.path.splitext(data_file)[0] + ".schema.json"
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(build_schema(table, spec, data_file, header), f, indent=2)
+    return path
@@ -0,0 +1,210 @@
+"""
+Local HTTP generation service.
+
+  python gen_server.py --port 8765 --workers 4
+
+  POST /generate/<TABLE>?format=csv|gzip|arrow&header=1
+       body: blueprint JSON {"customer_profiles": [...], "transactions_per_customer": [...],
+                             "network_patterns": [...], "run_date": "20251130", "seed": 42}
+       TABLE: CUSTOMERS, ACCOUNTS, CUSTOMER_ACCOUNT_LINK or TRANSACTIONS
+  GET  /health
+
+Every request is generated in its own worker process (random / Faker state stays
+isolated, seeded runs stay reproducible); at most --workers run at once, later
+requests wait for a slot. Encoded chunks come back through a bounded queue and are
+sent with chunked transfer encoding while rows are still being produced, so large
+fixtures never touch the disk. Binds to 127.0.0.1 only.
+"""
+import io
+import csv
+import json
+import zlib
+import queue as queue_mod
+import argparse
+import threading
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+TABLES = ("CUSTOMERS", "ACCOUNTS", "CUSTOMER_ACCOUNT_LINK", "TRANSACTIONS")
+CONTENT_TYPES = {
+    "csv": "text/plain; charset=utf-8",
+    "gzip": "application/gzip",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+FILE_SUFFIXES = {"csv": "txt", "gzip": "txt.gz", "arrow": "arrows"}
+BATCH_ROWS = 20000
+POLL_SECONDS = 1.0 # how often a waiting handler checks that its worker is still alive
+_DONE = None # end-of-stream marker on the chunk queue
+
+def _csv_chunks(rows, columns, header):
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter='|', quoting=csv.QUOTE_MINIMAL, lineterminator='\r\n')
+    if header: writer.writerow(columns)
+    n = 0
+    for row in rows:
+        writer.writerow(row)
+        n += 1
+        if n == BATCH_ROWS:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate(0)
+            n = 0
+    if buf.tell(): yield buf.getvalue().encode('utf-8')
+
+def _gzip_chunks(rows, columns, header):
+    comp = zlib.compressobj(6, zlib.DEFLATED, 31) # wbits 31 = gzip container
+    for chunk in _csv_chunks(rows, columns, header):
+        data = comp.compress(chunk)
+        if data: yield data
+    yield comp.flush()
+
+def _arrow_chunks(rows, columns, header):
+    """Arrow IPC stream, all columns as strings (types: see the .schema.json sidecars)"""
+    import itertools
+    import pyarrow as pa
+    schema = pa.schema([(name, pa.string()) for name in columns])
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+    it = iter(rows)
+    while True:
+        batch = list(itertools.islice(it, BATCH_ROWS))
+        if not batch: break
+        arrays = [pa.array([row[i] if i < len(row) else '' for row in batch], pa.string()) for i in range(len(columns))]
+        writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate(0)
+    writer.close()
+    yield sink.getvalue()
+
+ENCODERS = {"csv": _csv_chunks, "gzip": _gzip_chunks, "arrow": _arrow_chunks}
+
+def _worker(blueprint, table, fmt, header, queue):
+    """Child process: generates the table and puts encoded chunks on queue"""
+    try:
+        from gen_orchestrator import iter_tables
+        from gen_schema import header_row
+        tables = iter_tables(
+            blueprint.get("customer_profiles", []),
+            str(blueprint.get("run_date", "20251130")),
+            blueprint.get("transactions_per_customer"),
+            blueprint.get("network_patterns"),
+            business_days=bool(blueprint.get("business_days", False)),
+            holidays=blueprint.get("holidays"),
+            seed=blueprint.get("seed")
+        )
+        for name, spec, rows in tables:
+            if name != table: continue
+            for chunk in ENCODERS[fmt](rows, header_row(spec), header):
+                if chunk: queue.put(chunk)
+        queue.put(_DONE)
+    except Exception as e:
+        queue.put(("error", f"{type(e).__name__}: {e}"))
+
+def _next_chunk(queue, proc):
+    """Next item from the worker; an ("error", ...) tuple if the worker died without sending one"""
+    while True:
+        try:
+            return queue.get(timeout=POLL_SECONDS)
+        except queue_mod.Empty:
+            if proc.is_alive(): continue
+            try: return queue.get_nowait() # put just before it exited
+            except queue_mod.Empty:
+                return ("error", f"generation worker exited unexpectedly (exit code {proc.exitcode})")
+
+class GenerationHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # needed for chunked transfer encoding
+
+    def _reply(self, status, text):
+        body = (text + "\n").encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/health": self._reply(200, "ok")
+        else: self._reply(404, "not found")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+        if len(parts) != 2 or parts[0] != "generate" or parts[1].upper() not in TABLES:
+            return self._reply(404, f"use POST /generate/<{'|'.join(TABLES)}>")
+        table = parts[1].upper()
+        query = parse_qs(url.query)
+        fmt = query.get("format", ["csv"])[0].lower()
+        header = query.get("header", ["0"])[0] in ("1", "true", "yes")
+        if fmt not in ENCODERS: return self._reply(400, f"format must be one of {', '.join(ENCODERS)}")
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            blueprint = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            return self._reply(400, f"invalid blueprint JSON: {e}")
+
+        with self.server.slots: # bounded pool: wait for a free worker
+            ctx = self.server.mp_context
+            queue = ctx.Queue(maxsize=8) # back-pressure: the worker pauses while the client is slow
+            proc = ctx.Process(target=_worker, args=(blueprint, table, fmt, header, queue), daemon=True)
+            proc.start()
+            try:
+                first = _next_chunk(queue, proc)
+                if isinstance(first, tuple): return self._reply(500, first[1])
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPES[fmt])
+                self.send_header("Transfer-Encoding", "chunked")
+                self.send_header("Content-Disposition", f'attachment; filename="{table}.{FILE_SUFFIXES[fmt]}"')
+                self.end_headers()
+                chunk = first
+                while chunk is not _DONE:
+                    if isinstance(chunk, tuple):
+                        # Headers are gone already: end the stream without the terminating chunk
+                        print(f"Generation failed mid-stream: {chunk[1]}")
+                        self.close_connection = True
+                        return
+                    self._write_chunk(chunk)
+                    chunk = _next_chunk(queue, proc)
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True # client went away
+            finally:
+                if proc.is_alive(): proc.terminate()
+                proc.join()
+
+def _mp_context():
+    """
+    Workers are started from request threads, so never fork this process: a lock held by
+    another thread at that moment (logging, imports, Faker pools) would stay locked in the
+    child. forkserver forks from a clean single-threaded server with the generators preloaded.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(["gen_orchestrator", "gen_schema"])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+def make_server(port=8765, workers=4, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), GenerationHandler)
+    server.daemon_threads = True
+    server.slots = threading.BoundedSemaphore(workers)
+    server.mp_context = _mp_context()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local HTTP service streaming generated tables")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=4, help="concurrent generation processes")
+    args = parser.parse_args()
+    server = make_server(args.port, args.workers)
+    print(f"Serving on http://127.0.0.1:{args.port} ({args.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
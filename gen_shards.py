@@ -0,0 +1,323 @@
+"""
+Multi-node generation through a shared directory.
+
+  python gen_shards.py plan --dir /shared/run1 --blueprint bp.json --shards 64 --seed 42
+  python gen_shards.py work --dir /shared/run1            # on every node, as many as wanted
+  python gen_shards.py finalize --dir /shared/run1        # once all shards are done
+  python gen_shards.py local --dir /tmp/run1 --workers 4  # plan must exist; processes stand in for nodes
+
+plan splits the customer profiles into contiguous slices and writes manifest.json.
+Workers claim a shard by creating locks/shard_NNNN.lock with O_CREAT | O_EXCL (atomic
+on local disks and NFS; the lock names the owner's host and pid, and a heartbeat
+thread refreshes its mtime every HEARTBEAT_SECONDS while the shard runs, after checking
+the lock still names it), generate the slice with the seeded counter mode (rows do not
+depend on which worker or node made them) into a per-attempt temporary directory, and
+only if they still own the lock move it to parts/shard_NNNN/ and write
+done/shard_NNNN.done. finalize checks that every shard is done,
+concatenates the part files in shard order into final/, verifies each table's row
+count against the shard manifests and merges the shard profiles.
+The blueprint uses the gen_server keys: customer_profiles, transactions_per_customer,
+network_patterns, typology_patterns, run_date, seed.
+
+Workers run with PYTHONHASHSEED=0 (the CLI re-executes itself to set it): some Faker
+locales build their value lists from sets (it_IT cities), so interpreters with
+different hash seeds would draw different values for the same row seed.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import threading
+import multiprocessing
+
+MANIFEST = "manifest.json"
+HASH_SEED = "0"
+HEARTBEAT_SECONDS = 30 # release_stale's max_age should be several of these
+TABLES = ("CUSTOMERS", "ACCOUNTS", "CUSTOMER_ACCOUNT_LINK", "TRANSACTIONS", "TYPOLOGY_LABELS")
+
+def _shard_name(shard_id):
+    return f"shard_{shard_id:04d}"
+
+def _write_json(path, data):
+    # Write then rename: readers on other nodes never see a half-written file
+    tmp = f"{path}.{socket.gethostname()}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f: json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+def _read_json(path):
+    with open(path, 'r', encoding='utf-8') as f: return json.load(f)
+
+def _pin_hash_seed():
+    if os.environ.get("PYTHONHASHSEED") != HASH_SEED:
+        os.execve(sys.executable, [sys.executable] + sys.argv, dict(os.environ, PYTHONHASHSEED=HASH_SEED))
+
+def plan_shards(shared_dir, blueprint, shards, seed=None):
+    """Writes the shard manifest for blueprint into shared_dir; returns its path"""
+    seed = seed if seed is not None else blueprint.get("seed")
+    if seed is None:
+        raise ValueError("sharded runs need a seed (rows must not depend on the shard that generates them)")
+    profiles = blueprint.get("customer_profiles", [])
+    shards = max(1, min(int(shards), len(profiles) or 1))
+    bounds = [round(i * len(profiles) / shards) for i in range(shards + 1)]
+
+    for sub in ("locks", "done", "parts"): os.makedirs(os.path.join(shared_dir, sub), exist_ok=True)
+    manifest = {
+        "run_date": str(blueprint.get("run_date", "20251130")),
+        "seed": seed,
+        "blueprint": blueprint,
+        "shards": [{"id": i, "customer_slice": [bounds[i], bounds[i + 1]]} for i in range(shards)],
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    path = os.path.join(shared_dir, MANIFEST)
+    _write_json(path, manifest)
+    return path
+
+def claim_shard(shared_dir, manifest, worker_id):
+    """Next unclaimed shard (dict) or None; the lock file records who took it"""
+    for shard in manifest["shards"]:
+        name = _shard_name(shard["id"])
+        if os.path.exists(os.path.join(shared_dir, "done", name + ".done")): continue
+        try:
+            fd = os.open(os.path.join(shared_dir, "locks", name + ".lock"), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            continue
+        with os.fdopen(fd, 'w') as f:
+            json.dump({"worker": worker_id, "host": socket.gethostname(), "pid": os.getpid(), "claimed": time.time()}, f)
+        return shard
+    return None
+
+class Heartbeat:
+    """Refreshes a lock's mtime every interval seconds while its shard is generated"""
+    def __init__(self, lock_path, worker_id, interval=HEARTBEAT_SECONDS):
+        self.lock_path = lock_path
+        self.owner = {"worker": worker_id, "host": socket.gethostname(), "pid": os.getpid()}
+        self.interval = interval
+        self.lost = False # the lock was removed or re-claimed under us (release_stale elsewhere)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def owned(self):
+        """
+        True while the lock still names this worker. The lock is re-read every time:
+        it may have been released and claimed again by another worker since the last beat.
+        """
+        if self.lost: return False
+        try:
+            lock = _read_json(self.lock_path)
+        except FileNotFoundError:
+            self.lost = True
+            return False
+        except (OSError, ValueError):
+            return True # shared disk hiccup or a claim being written: judge again next time
+        if any(lock.get(k) != v for k, v in self.owner.items()): self.lost = True
+        return not self.lost
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self.owned(): return
+            try:
+                os.utime(self.lock_path)
+            except FileNotFoundError:
+                self.lost = True
+                return
+            except OSError:
+                pass # shared disk hiccup: try again next beat
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+def _owner_running(lock_path):
+    """True when the lock belongs to a process on this host that still exists"""
+    try: owner = _read_json(lock_path)
+    except (OSError, ValueError): return False
+    if owner.get("host") != socket.gethostname() or not owner.get("pid"): return False
+    try: os.kill(int(owner["pid"]), 0)
+    except ProcessLookupError: return False
+    except PermissionError: pass # exists, other user
+    return True
+
+def release_stale(shared_dir, max_age):
+    """
+    Removes the locks of crashed workers: no heartbeat for max_age seconds, shard not
+    done, and (for owners on this host) the owning process is gone. Owners on other
+    hosts are judged by the heartbeat alone.
+    """
+    released = []
+    lock_dir = os.path.join(shared_dir, "locks")
+    for lock in sorted(os.listdir(lock_dir)):
+        name = lock[:-len(".lock")]
+        path = os.path.join(lock_dir, lock)
+        if os.path.exists(os.path.join(shared_dir, "done", name + ".done")): continue
+        try: age = time.time() - os.path.getmtime(path)
+        except FileNotFoundError: continue
+        if age > max_age and not _owner_running(path):
+            os.remove(path)
+            released.append(name)
+    return released
+
+def generate_shard(shared_dir, manifest, shard, owned=None):
+    """
+    Generates one shard into parts/shard_NNNN and returns its shard manifest.
+    Files are written to a temporary directory of this attempt first; with owned
+    (a callable, e.g. Heartbeat.owned) they only replace parts/shard_NNNN while it
+    returns True, otherwise they are discarded and None is returned.
+    """
+    from gen_orchestrator import generate_custom_data
+    from gen_profile import PROFILE_FILE
+
+    bp = manifest["blueprint"]
+    name = _shard_name(shard["id"])
+    final_dir = os.path.join(shared_dir, "parts", name)
+    part_dir = f"{final_dir}.{socket.gethostname()}.{os.getpid()}.tmp"
+    shutil.rmtree(part_dir, ignore_errors=True) # leftovers of a crashed attempt
+    generate_custom_data(
+        bp.get("customer_profiles", []),
+        manifest["run_date"],
+        None,
+        bp.get("transactions_per_customer"),
+        output_dir=part_dir,
+        business_days=bool(bp.get("business_days", False)),
+        holidays=bp.get("holidays"),
+        network_blueprint=bp.get("network_patterns"),
+        typology_blueprint=bp.get("typology_patterns"),
+        seed=manifest["seed"],
+        customer_slice=tuple(shard["customer_slice"]),
+        profile=True
+    )
+    rows = _read_json(os.path.join(part_dir, PROFILE_FILE))["summary"]["rows"]
+    shard_manifest = {
+        "id": shard["id"],
+        "customer_slice": shard["customer_slice"],
+        "files": {t: f"{t}_{manifest['run_date']}.txt" for t in TABLES
+                  if os.path.exists(os.path.join(part_dir, f"{t}_{manifest['run_date']}.txt"))},
+        "rows": rows,
+    }
+    _write_json(os.path.join(part_dir, "shard.json"), shard_manifest)
+
+    if owned is not None and not owned():
+        shutil.rmtree(part_dir, ignore_errors=True)
+        return None
+    shutil.rmtree(final_dir, ignore_errors=True)
+    try:
+        os.replace(part_dir, final_dir)
+    except OSError:
+        # Another attempt moved its directory in first (only possible once we lost the lock)
+        shutil.rmtree(part_dir, ignore_errors=True)
+        return None
+    return shard_manifest
+
+def run_worker(shared_dir, worker_id=None, max_shards=None):
+    """Claims and generates shards until none are left; returns the ids it generated"""
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    if os.environ.get("PYTHONHASHSEED") != HASH_SEED:
+        print(f"Warning: PYTHONHASHSEED is not {HASH_SEED}; shards from other workers may not match")
+    manifest = _read_json(os.path.join(shared_dir, MANIFEST))
+    done = []
+    while max_shards is None or len(done) < max_shards:
+        shard = claim_shard(shared_dir, manifest, worker_id)
+        if shard is None: break
+        name = _shard_name(shard["id"])
+        print(f"[{worker_id}] generating {name} (customers {shard['customer_slice']})")
+        with Heartbeat(os.path.join(shared_dir, "locks", name + ".lock"), worker_id) as beat:
+            shard_manifest = generate_shard(shared_dir, manifest, shard, beat.owned)
+        if shard_manifest is None or not beat.owned():
+            # Released as stale (and maybe re-claimed) while running: leave the shard to its new owner
+            print(f"[{worker_id}] lock of {name} was released while generating, not marking it done")
+            continue
+        _write_json(os.path.join(shared_dir, "done", name + ".done"),
+                    {"worker": worker_id, "finished": time.time()})
+        done.append(shard["id"])
+    return done
+
+def finalize(shared_dir, out_dir=None):
+    """
+    Stitches the part files of all shards (in shard order) into out_dir (default
+    shared_dir/final), verifies row counts and merges the shard profiles.
+    Raises RuntimeError when shards are missing or counts disagree.
+    """
+    from gen_preview import LineIndex
+    from gen_profile import merge_profiles, PROFILE_FILE
+
+    manifest = _read_json(os.path.join(shared_dir, MANIFEST))
+    out_dir = out_dir or os.path.join(shared_dir, "final")
+    missing = [_shard_name(s["id"]) for s in manifest["shards"]
+               if not os.path.exists(os.path.join(shared_dir, "done", _shard_name(s["id"]) + ".done"))]
+    if missing:
+        raise RuntimeError(f"{len(missing)} shard(s) not finished: {', '.join(missing[:10])}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    part_dirs = [os.path.join(shared_dir, "parts", _shard_name(s["id"])) for s in manifest["shards"]]
+    shard_manifests = [_read_json(os.path.join(d, "shard.json")) for d in part_dirs]
+    report = {"run_date": manifest["run_date"], "shards": len(part_dirs), "tables": {}, "ok": True}
+
+    for table in TABLES:
+        parts = [(d, m) for d, m in zip(part_dirs, shard_manifests) if table in m["files"]]
+        if not parts: continue
+        path = os.path.join(out_dir, f"{table}_{manifest['run_date']}.txt")
+        with open(path, 'wb') as out:
+            for d, m in parts:
+                with open(os.path.join(d, m["files"][table]), 'rb') as f: shutil.copyfileobj(f, out, 16 * 2 ** 20)
+        expected = sum(m["rows"].get(table, 0) for _, m in parts)
+        index = LineIndex(path)
+        actual = len(index)
+        index.close()
+        os.remove(path + ".lineidx.npy") # only needed for the count here
+        report["tables"][table] = {"rows": actual, "expected": expected}
+        if actual != expected: report["ok"] = False
+
+    merge_profiles([os.path.join(d, PROFILE_FILE) for d in part_dirs], os.path.join(out_dir, PROFILE_FILE),
+                   run_date=manifest["run_date"], shards=len(part_dirs))
+    _write_json(os.path.join(out_dir, MANIFEST), report)
+    if not report["ok"]:
+        bad = {t: r for t, r in report["tables"].items() if r["rows"] != r["expected"]}
+        raise RuntimeError(f"Row counts do not match the shard manifests: {bad}")
+    print(f"Finalized {len(part_dirs)} shards into {out_dir}")
+    return report
+
+def run_local(shared_dir, workers):
+    """Runs `workers` worker processes against shared_dir (stand-ins for nodes), then finalizes"""
+    procs = [multiprocessing.Process(target=run_worker, args=(shared_dir, f"local-{i}")) for i in range(workers)]
+    for p in procs: p.start()
+    for p in procs: p.join()
+    return finalize(shared_dir)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shard a generation run over workers sharing a directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_plan = sub.add_parser("plan", help="write the shard manifest")
+    p_plan.add_argument("--dir", required=True)
+    p_plan.add_argument("--blueprint", required=True, help="blueprint JSON file")
+    p_plan.add_argument("--shards", type=int, required=True)
+    p_plan.add_argument("--seed", type=int)
+    p_work = sub.add_parser("work", help="claim and generate shards until none are left")
+    p_work.add_argument("--dir", required=True)
+    p_work.add_argument("--max-shards", type=int)
+    p_work.add_argument("--release-stale", type=float, metavar="SECONDS",
+                        help=f"first drop locks of crashed workers (no heartbeat for SECONDS, > {HEARTBEAT_SECONDS})")
+    p_final = sub.add_parser("finalize", help="stitch the part files and verify row counts")
+    p_final.add_argument("--dir", required=True)
+    p_final.add_argument("--out")
+    p_local = sub.add_parser("local", help="run several local worker processes, then finalize")
+    p_local.add_argument("--dir", required=True)
+    p_local.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    if args.command in ("work", "local"): _pin_hash_seed()
+
+    if args.command == "plan":
+        print(plan_shards(args.dir, _read_json(args.blueprint), args.shards, args.seed))
+    elif args.command == "work":
+        if args.release_stale: print(f"Released: {release_stale(args.dir, args.release_stale)}")
+        print(f"Generated shards: {run_worker(args.dir, max_shards=args.max_shards)}")
+    elif args.command == "finalize":
+        print(json.dumps(finalize(args.dir, args.out)["tables"], indent=2))
+    else:
+        print(json.dumps(run_local(args.dir, args.workers)["tables"], indent=2))
@@ -1,9 +1,85 @@
-import pandas as pd
-from faker import Faker
 import random
-from datetime import datetime, timedelta
+from datetime import datetime, date
 import os
-import re
+import hashlib
+import threading
+
+# Faker is imported on first use. Building an instance costs far more than importing
+# every generator module, so instances are cached per locale - and per thread, since
+# a Faker instance (its random state, unique proxies) must not be shared between threads.
+class FakerPool:
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.fallbacks = set()
+
+    def _cache(self):
+        cache = getattr(self._local, 'fakers', None)
+        if cache is None:
+            cache = self._local.fakers = {}
+        return cache
+
+    def _create(self, locale):
+        from faker import Faker
+        if not locale: return Faker()
+        try:
+            return Faker(locale)
+        except (AttributeError, ImportError, ValueError) as e:
+            with self._lock:
+                if locale not in self.fallbacks:
+                    self.fallbacks.add(locale)
+                    print(f"Faker locale {locale} unavailable ({e}), falling back to default")
+            return Faker()
+
+    def get(self, locale=None):
+        """This thread's instance for locale (None = Faker default)"""
+        cache = self._cache()
+        fake = cache.get(locale)
+        if fake is None:
+            fake = cache[locale] = self._create(locale)
+            seed = getattr(self._local, 'seed', None)
+            if seed is not None: fake.seed_instance(seed)
+        return fake
+
+    def reseed(self, seed):
+        """Seeds this thread's instances (and the ones it creates later) with seed"""
+        self._local.seed = seed
+        for fake in self._cache().values(): fake.seed_instance(seed)
+
+    def warm(self, locales, workers=None):
+        """Builds the calling thread's instances for locales in parallel, before generation starts"""
+        cache = self._cache()
+        todo = [loc for loc in dict.fromkeys(locales) if loc not in cache]
+        if not todo: return
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=workers or min(8, len(todo))) as pool:
+            for locale, fake in zip(todo, pool.map(self._create, todo)):
+                cache[locale] = fake
+
+FAKERS = FakerPool()
+
+def get_faker(locale=None):
+    """Lazily created Faker instance per locale (None = Faker default), per thread"""
+    return FAKERS.get(locale)
+
+class CounterRng:
+    """
+    Counter-based randomness: before each row the shared streams (random and this
+    thread's Faker instances) are reseeded from hash(seed, table, row key), so any row
+    can be regenerated alone - in any order, process or slice - with the same result.
+    """
+    def __init__(self, seed):
+        self.seed = seed
+
+    def key(self, *parts):
+        text = "|".join(str(p) for p in (self.seed,) + parts)
+        return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+    def enter(self, *parts):
+        key = self.key(*parts)
+        random.seed(key)
+        FAKERS.reseed(key)
+        return key
 
 class ReferenceLoader:
     """Shared Loader for all Spec files"""
@@ -31,6 +107,16 @@ class ReferenceLoader:
             print(f"Error reading {file_path}: {e}")
         return data_map, valid_keys
 
+    def load_rows(self, file_path):
+        """All data rows of a pipe-delimited spec file, as lists of stripped fields"""
+        if not os.path.exists(file_path): return []
+        try:
+            with open(file_path, 'r', encoding='utf-8-sig') as f:
+                return [[p.strip() for p in line.strip().split('|')] for line in f.readlines()[1:] if line.strip()]
+        except Exception as e:
+            print(f"Error loading {file_path}: {e}")
+            return []
+
     def load_transaction_types(self, file_path):
         """Special Loader for Transaction Types (Complex Structure)"""
         data = []
@@ -50,24 +136,206 @@ class ReferenceLoader:
         except: pass
         return data
 
+class BranchIndex:
+    """
+    Country -> branches and branch -> employees, built once from the spec files.
+    The employee spec has no branch, so employees are spread over the branches in
+    file order. Picks are round-robin per country / branch to keep portfolios balanced;
+    balanced=False gives independent uniform picks (seeded, random-access runs).
+    """
+    def __init__(self, loader, branch_file='00_Spec_Branch.txt', employee_file='00_Spec_Employee.txt'):
+        rows = loader.load_rows(branch_file)
+        self.branches = [r[0] for r in rows if r[0]]
+        self.by_country = {}
+        for r in rows:
+            if len(r) >= 3 and r[0]: self.by_country.setdefault(r[2].upper(), []).append(r[0])
+
+        self.employees = [r[0] for r in loader.load_rows(employee_file) if r[0]]
+        self.staff = {b: [] for b in self.branches}
+        for i, emp in enumerate(self.employees):
+            if self.branches: self.staff[self.branches[i % len(self.branches)]].append(emp)
+        self._next = {}
+
+    def _pick(self, key, items, balanced):
+        if not balanced: return random.choice(items)
+        i = self._next.get(key, 0)
+        self._next[key] = i + 1
+        return items[i % len(items)]
+
+    def assign(self, country, balanced=True):
+        """-> (branch ID, relationship manager ID); branches of other countries only if the country has none"""
+        branches = self.by_country.get(country) or self.branches
+        branch = self._pick(('BRANCH', country), branches, balanced) if branches else ""
+        staff = self.staff.get(branch) or self.employees
+        manager = self._pick(('RM', branch), staff, balanced) if staff else ""
+        return branch, manager
+
+class DateService:
+    """Precomputed day ranges and YYYYMMDD strings shared by all Generators.
+
+    Dates are handled as ordinals internally and formatted once per distinct
+    day. An optional business-day calendar (skip Sundays, per-country holidays)
+    is applied when a range is first built, so sampling stays a single pick.
+    Holidays are given per country as 'YYYYMMDD' (one-off) or 'MMDD' (yearly).
+    """
+    def __init__(self, today=None, skip_sundays=False, holidays=None):
+        self.today_ord = (today or date.today()).toordinal()
+        self.skip_sundays = skip_sundays
+        self.holidays = {}
+        for country, days in (holidays or {}).items():
+            self.holidays[str(country).upper()] = {str(d).strip() for d in days}
+        self._str_cache = {}
+        self._ord_cache = {}
+        self._ranges = {}
+
+    @property
+    def uses_calendar(self):
+        return self.skip_sundays or bool(self.holidays)
+
+    def fmt(self, ordinal, fmt='%Y%m%d'):
+        key = (ordinal, fmt)
+        val = self._str_cache.get(key)
+        if val is None:
+            val = date.fromordinal(ordinal).strftime(fmt)
+            self._str_cache[key] = val
+        return val
+
+    def weekday(self, ordinal):
+        """0 = Monday ... 6 = Sunday (ordinal 1 = 0001-01-01 was a Monday)"""
+        return (ordinal - 1) % 7
+
+    def parse(self, yyyymmdd):
+        """Day ordinal of a 'YYYYMMDD' (or ISO 'YYYY-MM-DD') date; ValueError otherwise"""
+        val = self._ord_cache.get(yyyymmdd)
+        if val is None:
+            try: val = datetime.strptime(yyyymmdd, "%Y%m%d").date().toordinal()
+            except ValueError: val = date.fromisoformat(yyyymmdd).toordinal()
+            self._ord_cache[yyyymmdd] = val
+        return val
+
+    def is_business_day(self, ordinal, country=None):
+        if self.skip_sundays and date.fromordinal(ordinal).isoweekday() == 7: return False
+        days_off = self.holidays.get(country) if country else None
+        if days_off:
+            ymd = self.fmt(ordinal)
+            if ymd in days_off or ymd[4:] in days_off: return False
+        return True
+
+    def candidate_days(self, lo, hi, country=None):
+        """Candidate ordinals for [lo, hi], built once per (range, country)"""
+        if not self.uses_calendar: return range(lo, hi + 1)
+        key = (lo, hi, country if country in self.holidays else None)
+        days = self._ranges.get(key)
+        if days is None:
+            days = [o for o in range(lo, hi + 1) if self.is_business_day(o, key[2])]
+            self._ranges[key] = days or range(lo, hi + 1)
+            days = self._ranges[key]
+        return days
+
+    def random_date(self, start_year=-5, end_year=0, fmt='%Y%m%d', country=None):
+        lo = self.today_ord + start_year * 365
+        hi = self.today_ord + end_year * 365
+        return self.fmt(random.choice(self.candidate_days(lo, hi, country)), fmt)
+
+class LazyContext(dict):
+    """Row context whose missing keys are computed once, on first use, by registered derivers"""
+    def __init__(self, derivers, values=None):
+        super().__init__(values or {})
+        self._derivers = derivers
+
+    def __missing__(self, key):
+        derive = self._derivers.get(key)
+        if derive is None: raise KeyError(key)
+        val = derive(self)
+        self[key] = val
+        return val
+
+class ColumnRegistry:
+    """
+    Maps spec columns to provider functions provider(ctx, run) -> value.
+    A spec is compiled once into a plan holding only the providers of the columns it
+    contains, so work behind absent columns (e.g. Faker counterparties) never runs when
+    the context derives it lazily. Columns without a provider use default(col_name, col_type),
+    which may return a provider or None (empty value).
+    """
+    def __init__(self, default=None):
+        self.providers = {}
+        self.derivers = {}
+        self.default = default
+
+    def column(self, *names):
+        """Decorator: @registry.column('COL_A', 'COL_B')"""
+        def register(fn):
+            for name in names: self.providers[name.upper()] = fn
+            return fn
+        return register
+
+    def derive(self, key):
+        """Decorator: lazily computed context key shared by several columns"""
+        def register(fn):
+            self.derivers[key] = fn
+            return fn
+        return register
+
+    def context(self, values=None):
+        return LazyContext(self.derivers, values)
+
+    def compile(self, spec, fill):
+        """Spec -> plan of (provider, fill value if mandatory else None, max length or None)"""
+        plan = []
+        for i, col in enumerate(spec['columns']):
+            col_name = col.strip().upper()
+            col_type = spec['types'][i] if i < len(spec['types']) else 'STRING'
+            mandatory = spec['mandatory'][i] if i < len(spec['mandatory']) else 'NO'
+            provider = self.providers.get(col_name) or (self.default(col_name, col_type) if self.default else None)
+            max_len = None
+            if 'STRING' in col_type and '(' in col_type:
+                try: max_len = int(col_type.split('(')[1].split(')')[0])
+                except ValueError: pass
+            plan.append((provider, fill(col_type) if mandatory == 'YES' else None, max_len))
+        return plan
+
+    @staticmethod
+    def render(plan, ctx, run=None):
+        row = []
+        for provider, fill, max_len in plan:
+            val = provider(ctx, run) if provider else ""
+            if fill is not None and not val: val = fill
+            val = str(val)
+            row.append(val[:max_len] if max_len is not None else val)
+        return row
+
 class BaseGenerator:
     """Shared Helper methods for all Generators"""
-    def __init__(self):
-        self.fake = Faker()
+    def __init__(self, date_service=None):
         self.loader = ReferenceLoader()
+        self.dates = date_service or DateService()
+        self.rng = None # CounterRng for seeded, random-access runs
+        self._resolved = {} # _resolve_value hits
+
+    def _seed_row(self, *parts):
+        if self.rng is not None: self.rng.enter(*parts)
+
+    @property
+    def fake(self):
+        return get_faker()
     
-    def _resolve_value(self, input_val, mapping, valid_list, default=None):
+    def _resolve_value(self, input_val, mapping, valid_list, default=None, domain=None):
         """Strict Enum Enforcer"""
         if not input_val: return default if default else (random.choice(valid_list) if valid_list else "")
+        # Hits are memoized per (domain, raw input) when the caller names the domain (gen_categories names);
+        # the resolved value is still the spec string, not a category code
+        key = (domain, str(input_val))
+        if domain and key in self._resolved: return self._resolved[key]
         clean_input = str(input_val).strip().upper()
-        if clean_input in valid_list: return clean_input
-        if clean_input in mapping: return mapping[clean_input]
-        return default if default else (random.choice(valid_list) if valid_list else "")
-
-    def _get_random_date(self, start_year=-5, end_year=0, fmt='%Y%m%d'):
-        end = datetime.now() + timedelta(days=end_year*365)
-        start = datetime.now() + timedelta(days=start_year*365)
-        return self.fake.date_between(start_date=start, end_date=end).strftime(fmt)
+        if clean_input in valid_list: value = clean_input
+        elif clean_input in mapping: value = mapping[clean_input]
+        else: return default if default else (random.choice(valid_list) if valid_list else "")
+        if domain: self._resolved[key] = value
+        return value
+
+    def _get_random_date(self, start_year=-5, end_year=0, fmt='%Y%m%d', country=None):
+        return self.dates.random_date(start_year, end_year, fmt, country)
 
     def _enforce_length(self, value, col_type):
         val_str = str(value)
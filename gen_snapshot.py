@@ -0,0 +1,104 @@
+import os
+import json
+from gen_categories import CATEGORY_COLUMNS, CategoryDictionary
+
+# Customer / Account contexts are stored as NumPy record arrays (one fixed-width
+# UTF-8 byte column per context key). They load back memory-mapped, so a re-run
+# that only changes the transaction blueprint skips Steps 1-2 entirely; rows are
+# decoded into context dicts one at a time, as they are read.
+# Categorical keys (gen_categories) are stored as uint16 codes; their dictionaries
+# go into the meta file, so a snapshot reads back without the spec files.
+SNAPSHOT_META = "snapshot_meta.json"
+SNAPSHOT_FILES = {"customers": "snapshot_customers.npy", "accounts": "snapshot_accounts.npy"}
+
+def _encode_table(contexts, categories):
+    """Contexts -> (record array, column kinds). Non-string values are JSON encoded."""
+    import numpy as np
+
+    keys = []
+    for ctx in contexts:
+        for k in ctx:
+            if k not in keys: keys.append(k)
+
+    kinds = {}
+    columns = {}
+    for k in keys:
+        values = [ctx.get(k) for ctx in contexts]
+        is_text = all(isinstance(v, str) for v in values)
+        if is_text and k in CATEGORY_COLUMNS:
+            kinds[k] = "cat:" + CATEGORY_COLUMNS[k]
+            columns[k] = categories.encode_column(CATEGORY_COLUMNS[k], values)
+            continue
+        kinds[k] = "str" if is_text else "json"
+        columns[k] = [(v if is_text else json.dumps(v)).encode("utf-8") for v in values]
+
+    dtype = [(k, columns[k].dtype.str) if kinds[k].startswith("cat:") else (k, f"S{max([len(v) for v in columns[k]] + [1])}")
+             for k in keys]
+    table = np.empty(len(contexts), dtype=dtype)
+    for k in keys:
+        table[k] = columns[k]
+    return table, kinds
+
+class SnapshotTable:
+    """
+    Read-only sequence over a memory-mapped snapshot table. A row is decoded into a
+    context dict only when it is accessed, so restoring a run does not materialize
+    every context at once. Slices are views over the same pages.
+    """
+    def __init__(self, table, kinds, dictionaries):
+        self.table = table
+        self.kinds = kinds
+        self.dictionaries = dictionaries
+        self._decoders = [(k, self._decoder(kinds.get(k, "str"))) for k in table.dtype.names or ()]
+
+    def _decoder(self, kind):
+        if kind.startswith("cat:"):
+            values = self.dictionaries[kind[4:]]
+            return lambda v: values[int(v)]
+        if kind == "str": return lambda v: v.decode("utf-8")
+        return lambda v: json.loads(v.decode("utf-8"))
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice): return SnapshotTable(self.table[idx], self.kinds, self.dictionaries)
+        rec = self.table[idx]
+        return {k: decode(rec[k]) for k, decode in self._decoders}
+
+    def __iter__(self):
+        for i in range(len(self.table)): yield self[i]
+
+def save_snapshot(output_dir, customer_contexts, account_contexts, run_date=None):
+    """Writes the customer and account contexts of a run next to its output files"""
+    import numpy as np
+
+    meta = {"run_date": run_date, "tables": {}}
+    categories = CategoryDictionary()
+    used = set()
+    for name, contexts in (("customers", customer_contexts), ("accounts", account_contexts)):
+        table, kinds = _encode_table(contexts, categories)
+        np.save(os.path.join(output_dir, SNAPSHOT_FILES[name]), table, allow_pickle=False)
+        meta["tables"][name] = {"rows": len(contexts), "kinds": kinds}
+        used.update(kind[4:] for kind in kinds.values() if kind.startswith("cat:"))
+    meta["dictionaries"] = {domain: categories.values(domain) for domain in sorted(used)}
+
+    with open(os.path.join(output_dir, SNAPSHOT_META), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return os.path.join(output_dir, SNAPSHOT_META)
+
+def has_snapshot(run_dir):
+    return os.path.exists(os.path.join(run_dir, SNAPSHOT_META))
+
+def load_snapshot(run_dir):
+    """Returns (customer_contexts, account_contexts) saved by save_snapshot, as lazy SnapshotTables"""
+    import numpy as np
+
+    with open(os.path.join(run_dir, SNAPSHOT_META), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    result = []
+    for name in ("customers", "accounts"):
+        table = np.load(os.path.join(run_dir, SNAPSHOT_FILES[name]), mmap_mode="r", allow_pickle=False)
+        result.append(SnapshotTable(table, meta["tables"][name]["kinds"], meta.get("dictionaries", {})))
+    return result[0], result[1]
@@ -0,0 +1,135 @@
+import random
+
+# Intraday timing of transactions.
+# Each channel (00_Spec_Transaction_Channel_Code.txt descriptions) follows an activity
+# profile: 24 hourly weights (local time) and 7 weekday weights (Mon..Sun). Days, times
+# of day and posting / value lags are drawn in NumPy batches per (profile, country, range)
+# and handed out row by row; seeded runs draw per row from `random` instead, so a row
+# still depends only on its own seed.
+
+HOURLY = {
+    'ATM':    [2, 1, 1, 1, 1, 1, 2, 4, 6, 7, 8, 9, 11, 10, 9, 9, 10, 12, 12, 10, 8, 6, 4, 3],
+    'CARD':   [1, 0.5, 0.3, 0.2, 0.2, 0.3, 1, 3, 5, 7, 9, 11, 13, 11, 9, 9, 10, 12, 13, 11, 8, 5, 3, 2],
+    'BRANCH': [0] * 9 + [8, 10, 11, 12, 10, 9, 10, 9, 6] + [0] * 6, # opening hours 09-18
+    'WIRE':   [0, 0, 0, 0, 0, 0, 1, 4, 9, 11, 12, 11, 9, 10, 11, 10, 9, 6, 2, 1, 0, 0, 0, 0],
+    'BATCH':  [0, 0, 1, 0, 0, 0, 12, 2, 1, 1, 1, 1, 10, 2, 1, 1, 1, 1, 8, 1, 0, 0, 0, 0], # clearing windows
+    'ONLINE': [3, 2, 1, 1, 1, 1, 2, 4, 6, 7, 7, 8, 9, 8, 7, 7, 8, 9, 11, 12, 12, 11, 8, 5],
+}
+WEEKLY = {
+    'ATM':    [1.0, 1.0, 1.0, 1.05, 1.3, 1.25, 0.7],
+    'CARD':   [0.9, 0.95, 0.95, 1.0, 1.2, 1.4, 0.6],
+    'BRANCH': [1.1, 1.0, 1.0, 1.0, 1.1, 0.4, 0.0],
+    'WIRE':   [1.1, 1.0, 1.0, 1.0, 1.1, 0.0, 0.0],
+    'BATCH':  [1.0, 1.0, 1.0, 1.0, 1.0, 0.0, 0.0],
+    'ONLINE': [1.0, 1.0, 1.0, 1.0, 1.0, 1.1, 1.2],
+}
+CHANNEL_PROFILES = {
+    'ATM': 'ATM', 'POS': 'CARD', 'CREDITCARD': 'CARD',
+    'INBRANCH': 'BRANCH', 'BRANCH': 'BRANCH', 'CHEQUE': 'BRANCH',
+    'SWIFT': 'WIRE', 'ACH': 'BATCH', 'PAYPAL': 'ONLINE', 'MONEYGRAM': 'ONLINE',
+    'INTERNET': 'ONLINE', # blueprint default (DEFAULT_CHANNEL_CODE in gen_transactions)
+}
+DEFAULT_PROFILE = 'ONLINE'
+
+# (posting lag after origination, value lag after posting) as (min, max) days
+LAGS = {
+    'POS': ((1, 2), (0, 0)), 'CREDITCARD': ((1, 2), (0, 0)), 'CHEQUE': ((1, 3), (0, 1)),
+    'SWIFT': ((0, 1), (0, 2)), 'ACH': ((1, 1), (0, 0)), 'PAYPAL': ((0, 1), (0, 0)), 'MONEYGRAM': ((0, 1), (0, 0)),
+}
+NO_LAG = ((0, 0), (0, 0))
+
+# Standard-time UTC offsets in minutes (no DST); unknown countries use UTC
+UTC_OFFSETS = {
+    'US': -300, 'CA': -300, 'MX': -360, 'BR': -180, 'GB': 0, 'IE': 0, 'PT': 0,
+    'DE': 60, 'FR': 60, 'IT': 60, 'ES': 60, 'NL': 60, 'BE': 60, 'LU': 60, 'AT': 60, 'CH': 60,
+    'SE': 60, 'NO': 60, 'DK': 60, 'PL': 60, 'CZ': 60, 'SK': 60, 'HU': 60, 'SI': 60, 'HR': 60, 'MT': 60,
+    'FI': 120, 'EE': 120, 'LV': 120, 'LT': 120, 'GR': 120, 'RO': 120, 'CY': 120, 'ZA': 120,
+    'TR': 180, 'RU': 180, 'AE': 240, 'IN': 330, 'SG': 480, 'HK': 480, 'CN': 480,
+    'JP': 540, 'KR': 540, 'AU': 600,
+}
+
+class ActivityClock:
+    def __init__(self, dates, batch=4096):
+        self.dates = dates
+        self.batch = batch
+        self._buffers = {}
+        self._np_rng = None
+
+    def _rng(self):
+        if self._np_rng is None:
+            import numpy as np
+            self._np_rng = np.random.default_rng(random.getrandbits(64))
+        return self._np_rng
+
+    def _day_weights(self, profile, days):
+        weekly = WEEKLY[profile]
+        weights = [weekly[self.dates.weekday(o)] for o in days]
+        return weights if sum(weights) > 0 else [1.0] * len(days)
+
+    def _fill(self, key, profile, lags, days):
+        """Draws a batch of (day, second of day, posting lag, value lag) for one key"""
+        import numpy as np
+        rng = self._rng()
+        hourly = np.array(HOURLY[profile], dtype=np.float64)
+        n = self.batch
+        out = {}
+        if days is not None:
+            p = np.array(self._day_weights(profile, days), dtype=np.float64)
+            out['day'] = np.asarray(days, dtype=np.int64)[rng.choice(len(days), size=n, p=p / p.sum())].tolist()
+        out['sec'] = (rng.choice(24, size=n, p=hourly / hourly.sum()) * 3600 + rng.integers(0, 3600, size=n)).tolist()
+        (pl_lo, pl_hi), (vl_lo, vl_hi) = lags
+        out['post'] = rng.integers(pl_lo, pl_hi + 1, size=n).tolist()
+        out['value'] = rng.integers(vl_lo, vl_hi + 1, size=n).tolist()
+        self._buffers[key] = [out, 0]
+
+    def _draw(self, profile, lags, days, key, vectorized):
+        if not vectorized:
+            day = random.choices(days, self._day_weights(profile, days))[0] if days is not None else None
+            sec = random.choices(range(24), HOURLY[profile])[0] * 3600 + random.randrange(3600)
+            (pl_lo, pl_hi), (vl_lo, vl_hi) = lags
+            return day, sec, random.randint(pl_lo, pl_hi), random.randint(vl_lo, vl_hi)
+        buf = self._buffers.get(key)
+        if buf is None or buf[1] >= self.batch:
+            self._fill(key, profile, lags, days)
+            buf = self._buffers[key]
+        out, i = buf
+        buf[1] += 1
+        return (out['day'][i] if 'day' in out else None), out['sec'][i], out['post'][i], out['value'][i]
+
+    def _shift(self, ordinal, lag, country):
+        day = ordinal + lag
+        if lag and self.dates.uses_calendar:
+            while not self.dates.is_business_day(day, country): day += 1
+        return day
+
+    def _timestamp(self, ordinal, sec):
+        h, rest = divmod(sec, 3600)
+        return f"{self.dates.fmt(ordinal)}{h:02d}{rest // 60:02d}{rest % 60:02d}"
+
+    def sample(self, channel, run_date, country, fixed_date=None, max_days=30, vectorized=True):
+        """
+        -> (origination date, posting date, value date, local timestamp, system timestamp (UTC)).
+        fixed_date keeps the day and only draws the time of day; posting and value dates are
+        capped at run_date (or the origination day, if that is later).
+        """
+        channel = (channel or '').upper()
+        profile = CHANNEL_PROFILES.get(channel, DEFAULT_PROFILE)
+        lags = LAGS.get(channel, NO_LAG)
+        run_ord = self.dates.parse(run_date)
+        if fixed_date:
+            days, key = None, (channel, None)
+        else:
+            days = self.dates.candidate_days(run_ord - max_days, run_ord, country)
+            key = (channel, country if self.dates.uses_calendar else None, run_ord, max_days)
+
+        day, sec, post_lag, value_lag = self._draw(profile, lags, days, key, vectorized)
+        if fixed_date:
+            try: day = self.dates.parse(fixed_date)
+            except ValueError: return fixed_date, fixed_date, fixed_date, "", ""
+
+        last_day = max(day, run_ord)
+        post_day = min(self._shift(day, post_lag, country), last_day)
+        value_day = min(self._shift(post_day, value_lag, country), last_day)
+        utc_day, utc_sec = divmod(day * 86400 + sec - UTC_OFFSETS.get(country, 0) * 60, 86400)
+        return (self.dates.fmt(day), self.dates.fmt(post_day), self.dates.fmt(value_day),
+                self._timestamp(day, sec), self._timestamp(utc_day, utc_sec))
@@ -1,10 +1,123 @@
 import random
-from datetime import datetime, timedelta
-from gen_shared import BaseGenerator
+from functools import partial
+from gen_shared import BaseGenerator, ColumnRegistry
+from gen_network import NetworkIndex
+from gen_fx import FxRates
+from gen_temporal import ActivityClock
+
+# Blueprint items without a known channel_desc (the original fallback code, not a spec row)
+DEFAULT_CHANNEL_DESC = 'INTERNET'
+DEFAULT_CHANNEL_CODE = 'CH001'
+# iter_rows converts foreign-currency amounts per batch of this many rows (one FX lookup each)
+FX_BATCH_ROWS = 4096
+
+# Transaction columns are rendered from a LazyContext: the derived parts below
+# (counterparty, date, FX amounts, parties ...) only run when a spec column asks for them.
+TXN_COLUMNS = ColumnRegistry()
+
+@TXN_COLUMNS.derive('CPTY')
+def _derive_cpty(ctx):
+    # CPTY_SOURCE is either a ready counterparty dict or a callable building one (Faker etc.)
+    src = ctx['CPTY_SOURCE']
+    return src() if callable(src) else src
+
+@TXN_COLUMNS.derive('TIMING')
+def _derive_timing(ctx):
+    """(origination, posting, value date, local timestamp, system timestamp) from the channel's activity profile"""
+    gen, tpl = ctx['_gen'], ctx['TPL']
+    return gen.clock.sample(
+        gen.channel_map.get(tpl['CHANNEL_CODE'], DEFAULT_CHANNEL_DESC), ctx['RUN_DATE'], ctx['ACC']['COUNTRY_CODE'],
+        fixed_date=ctx['ORIG_DATE'] or tpl['DATE'], vectorized=gen.rng is None
+    )
+
+@TXN_COLUMNS.derive('DATE')
+def _derive_date(ctx):
+    return ctx['TIMING'][0]
+
+@TXN_COLUMNS.derive('AMOUNTS')
+def _derive_amounts(ctx):
+    """
+    (currency orig, currency base, amount orig, amount base), converted at the transaction date.
+    With an FX_PENDING list (batched rows) the conversion is queued there and amount base is None.
+    """
+    gen, tpl, acc = ctx['_gen'], ctx['TPL'], ctx['ACC']
+    curr_orig = tpl['CURRENCY_ORIG'] or acc['CURRENCY_CODE']
+    curr_base = acc['CURRENCY_CODE']
+    amt_orig = ctx['AMT_ORIG'] or tpl['AMOUNT'] or random.uniform(10.0, 1000.0)
+    if curr_orig == curr_base:
+        amt_base = amt_orig
+    else:
+        try: fx_day = gen.dates.parse(ctx['DATE'])
+        except ValueError: fx_day = gen.dates.parse(ctx['RUN_DATE'])
+        if ctx['FX_PENDING'] is not None:
+            ctx['FX_PENDING'].append((curr_orig, curr_base, fx_day, amt_orig))
+            amt_base = None
+        else:
+            amt_base = gen.fx.convert(amt_orig, curr_orig, curr_base, fx_day)
+    return curr_orig, curr_base, amt_orig, amt_base
+
+@TXN_COLUMNS.derive('TXN_ID')
+def _derive_txn_id(ctx):
+    return f"TXN-{random.randint(10000000, 99999999)}"
+
+@TXN_COLUMNS.derive('PARTIES')
+def _derive_parties(ctx):
+    """(originator name, originator bank, beneficiary name, beneficiary bank)"""
+    # If Debit (Out): Originator = Account Holder, Beneficiary = Cpty
+    # If Credit (In): Originator = Cpty, Beneficiary = Account Holder
+    my_name = ctx['ACC']['ACCOUNT_NAME']
+    my_bank = "My Bank" # Simplified, usually derived from Branch/Org
+    cpty = ctx['CPTY']
+    if ctx['CD'] == 'D': return my_name, my_bank, cpty['NAME'], cpty['BANK_NAME']
+    return cpty['NAME'], cpty['BANK_NAME'], my_name, my_bank
+
+TXN_COLUMNS.column('RUN_TIMESTAMP')(lambda ctx, run: f"{ctx['RUN_DATE']}000000")
+TXN_COLUMNS.column('SOURCE_TXN_NUM', 'SOURCE_TXN_UNIQUE_ID')(lambda ctx, run: ctx['TXN_ID'])
+TXN_COLUMNS.column('ACCOUNT_SOURCE_UNIQUE_ID', 'ACCOUNT_SOURCE_REF_ID')(lambda ctx, run: ctx['ACC']['ACCOUNT_SOURCE_UNIQUE_ID'])
+TXN_COLUMNS.column('CUSTOMER_SOURCE_UNIQUE_ID', 'PRIMARY_CUST_SRCE_REF_ID')(lambda ctx, run: ctx['ACC']['CUSTOMER_SOURCE_UNIQUE_ID'])
+TXN_COLUMNS.column('BRANCH_ID')(lambda ctx, run: ctx['ACC']['BRANCH_ID'])
+TXN_COLUMNS.column('ORG_UNIT_CODE')(lambda ctx, run: ctx['ACC'].get('ORG_UNIT_CODE', ''))
+
+TXN_COLUMNS.column('CURRENCY_CODE_ORIG')(lambda ctx, run: ctx['AMOUNTS'][0])
+TXN_COLUMNS.column('CURRENCY_CODE_BASE')(lambda ctx, run: ctx['AMOUNTS'][1])
+TXN_COLUMNS.column('TXN_AMOUNT_ORIG')(lambda ctx, run: f"{ctx['AMOUNTS'][2]:.2f}")
+TXN_COLUMNS.column('TXN_AMOUNT_BASE')(
+    lambda ctx, run: f"{ctx['AMOUNTS'][3]:.2f}" if ctx['AMOUNTS'][3] is not None else "") # None: filled in by _convert_batch
+TXN_COLUMNS.column('CREDIT_DEBIT_CODE')(lambda ctx, run: ctx['CD'])
+TXN_COLUMNS.column('ORIGINATION_DATE')(lambda ctx, run: ctx['DATE'])
+TXN_COLUMNS.column('POSTING_DATE')(lambda ctx, run: ctx['TIMING'][1])
+TXN_COLUMNS.column('VALUE_DATE')(lambda ctx, run: ctx['TIMING'][2])
+TXN_COLUMNS.column('LOCAL_TIMESTAMP')(lambda ctx, run: ctx['TIMING'][3])
+TXN_COLUMNS.column('SYSTEM_TIMESTAMP')(lambda ctx, run: ctx['TIMING'][4])
+
+TXN_COLUMNS.column('TRANS_REF_DESC')(lambda ctx, run: ctx['TPL']['DESCRIPTION'])
+TXN_COLUMNS.column('TRANS_REF_DESC_2', 'TRANS_REF_DESC_6')(lambda ctx, run: ctx['TPL']['PAY_MEAN'])
+TXN_COLUMNS.column('TRANS_REF_DESC_3')(lambda ctx, run: ctx['TPL']['SCOPE_DESC'])
+TXN_COLUMNS.column('TRANS_REF_DESC_4')(lambda ctx, run: ctx['TPL']['INSTRUMENT'])
+TXN_COLUMNS.column('TRANS_REF_DESC_5')(
+    lambda ctx, run: "DOMESTIC" if ctx['ACC']['COUNTRY_CODE'] == ctx['CPTY']['COUNTRY'] else "INTERNATIONAL")
+TXN_COLUMNS.column('TXN_SOURCE_TYPE_CODE')(lambda ctx, run: ctx['TPL']['SOURCE_TYPE_CODE'])
+TXN_COLUMNS.column('TXN_CHANNEL_CODE')(lambda ctx, run: ctx['TPL']['CHANNEL_CODE'])
+
+# Counterparty Fields (a-r)
+for _col, _key in [
+    ('NAME', 'NAME'), ('ADDRESS', 'ADDRESS'), ('ZONE', 'ZONE'), ('POSTAL_CODE', 'POSTAL_CODE'),
+    ('CITY', 'CITY'), ('COUNTRY_CODE', 'COUNTRY'), ('ACCOUNT_NUM', 'ACCOUNT_NUM'),
+    ('ACCOUNT_NAME', 'ACCOUNT_NAME'), ('ACCOUNT_TYPE', 'ACCOUNT_TYPE'), ('ACCOUNT_IBAN', 'IBAN'),
+    ('ACCOUNT_BIC', 'BIC'), ('BANK_NAME', 'BANK_NAME'), ('BANK_CODE', 'BANK_CODE'),
+    ('BANK_ADDRESS', 'BANK_ADDRESS'), ('BANK_CITY', 'BANK_CITY'), ('BANK_ZONE', 'BANK_ZONE'),
+    ('BANK_POSTAL_CODE', 'BANK_POSTAL_CODE'), ('BNK_CNTRY_CD', 'BANK_COUNTRY')]:
+    TXN_COLUMNS.column(f'COUNTER_PARTY_{_col}')(lambda ctx, run, key=_key: ctx['CPTY'][key])
+
+# Originator/Beneficiary
+for _i, _col in enumerate(['ORIGINATOR_NAME', 'ORIGINATOR_BANK_NAME', 'BENEFICIARY_NAME', 'BENEFICIARY_BANK_NAME']):
+    TXN_COLUMNS.column(_col)(lambda ctx, run, i=_i: ctx['PARTIES'][i])
+
+TXN_COLUMNS.column('CASHBACK_AMT')(lambda ctx, run: "0")
 
 class TransactionGenerator(BaseGenerator):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, date_service=None):
+        super().__init__(date_service)
         self.txn_spec = self._load_spec('03_Spec_Fields_Transactions.txt')
         self.txn_types = self.loader.load_transaction_types('00_Spec_Transaction_Type.txt')
         
@@ -17,6 +130,24 @@ class TransactionGenerator(BaseGenerator):
         # ITEM 1: Load Channel Codes
         self.channel_map, self.channel_codes = self.loader.load_file('00_Spec_Transaction_Channel_Code.txt', key_idx=1, val_idx=0)
 
+        # FX Rates (date x currency table, falls back to a static mock if the spec file is missing);
+        # built on first conversion, runs without foreign currency never load NumPy for it
+        self._fx = None
+
+        # Intraday timestamps and posting / value lags per channel
+        self.clock = ActivityClock(self.dates)
+
+        # Column plan, compiled once: only the columns of the spec are ever derived
+        self.txn_plan = TXN_COLUMNS.compile(
+            self.txn_spec, fill=lambda t: "0" if 'NUMBER' in t or 'DECIMAL' in t else "N")
+        cols = [c.strip().upper() for c in self.txn_spec['columns']]
+        self.amount_base_col = cols.index('TXN_AMOUNT_BASE') if 'TXN_AMOUNT_BASE' in cols else None
+
+    @property
+    def fx(self):
+        if self._fx is None: self._fx = FxRates('00_Spec_FX_Rates.txt')
+        return self._fx
+
     def _get_counterparty(self):
         """Generates fake counterparty data (Fallback only)"""
         return {
@@ -32,242 +163,268 @@ class TransactionGenerator(BaseGenerator):
             "BANK_COUNTRY": self.fake.country_code()
         }
 
-    def generate_rows(self, account_contexts, run_date, global_blueprint=None):
-        csv_rows = []
-        
-        # Simple Mock FX Rates
-        fx_rates = {'USD': 1.0, 'EUR': 0.95, 'GBP': 0.80, 'JPY': 150.0, 'CNY': 7.2, 'CAD': 1.35}
-        
+    def _compile_template(self, txn_req):
+        """Resolves the parts of a blueprint item that are identical for every copy"""
+        # 1. CHANNEL
+        chan_desc = txn_req.get('channel_desc', DEFAULT_CHANNEL_DESC).upper()
+        chan_code = self.channel_map.get(chan_desc, DEFAULT_CHANNEL_CODE) # Default
+        if not chan_code and self.channel_codes: chan_code = self.channel_codes[0]
+
+        # 2. CREDIT/DEBIT
+        cd_code = txn_req.get('credit_debit')
+        if not cd_code: cd_code = 'D' if txn_req.get('TYPE_HINT') == 'Purchase' else 'C'
+
+        # Payment Mean & Source Type
+        pay_mean = txn_req.get('payment_mean', 'Wire Transfer')
+        bp_type_desc = txn_req.get('txn_type_desc', '').upper()
+        txn_source_type_code = self.txn_type_map.get(bp_type_desc, "TT0013") # Default to Other if missing
+
+        # Internal/External Scope
+        is_internal = txn_req.get('is_internal', False)
+
+        # Instrument Mapping (Simple keyword check)
+        pm_upper = pay_mean.upper()
+        if "CARD" in pm_upper: instrument = "CARD"
+        elif "CASH" in pm_upper or "CURRENCY" in pm_upper: instrument = "CASH"
+        elif "CHECK" in pm_upper or "CHEQUE" in pm_upper: instrument = "CHEQUE"
+        else: instrument = "WIRE"
+
+        # External counterparty fields given by the blueprint (Faker only fills the gaps)
+        cpty_fixed = {
+            "NAME": txn_req.get('counterparty_name'),
+            "ADDRESS": txn_req.get('counterparty_address'),
+            "ZONE": txn_req.get('counterparty_zone', ''),
+            "CITY": txn_req.get('counterparty_city'),
+            "POSTAL_CODE": txn_req.get('counterparty_postal_code', ''),
+            "COUNTRY": txn_req.get('counterparty_country'),
+            "ACCOUNT_NUM": txn_req.get('counterparty_account_num'),
+            "ACCOUNT_NAME": txn_req.get('counterparty_account_name'),
+            "ACCOUNT_TYPE": txn_req.get('counterparty_account_type', 'Current'),
+            "IBAN": txn_req.get('counterparty_account_iban'),
+            "BIC": txn_req.get('counterparty_account_bic'),
+            "BANK_NAME": txn_req.get('counterparty_bank_name'),
+            "BANK_CODE": txn_req.get('counterparty_bank_code', 'BNK001'),
+            "BANK_ADDRESS": txn_req.get('counterparty_bank_address'),
+            "BANK_CITY": txn_req.get('counterparty_bank_city'),
+            "BANK_ZONE": txn_req.get('counterparty_bank_zone', ''),
+            "BANK_POSTAL_CODE": txn_req.get('counterparty_bank_postal_code', ''),
+            "BANK_COUNTRY": txn_req.get('counterparty_bank_country'),
+        }
+        fallback_keys = ['NAME', 'ADDRESS', 'CITY', 'COUNTRY', 'ACCOUNT_NAME', 'IBAN', 'BIC', 'BANK_NAME', 'BANK_ADDRESS', 'BANK_CITY', 'BANK_COUNTRY']
+
+        amount = txn_req.get('amount_orig') or txn_req.get('AMOUNT')
+
+        return {
+            "CHANNEL_CODE": chan_code,
+            "CD_CODE": cd_code,
+            "PAY_MEAN": pay_mean,
+            "SOURCE_TYPE_CODE": txn_source_type_code,
+            "IS_INTERNAL": is_internal,
+            "CPTY_ROLE": txn_req.get('internal_counterparty_role') if is_internal else None,
+            "SCOPE_DESC": "INTERNAL" if is_internal else "EXTERNAL",
+            "INSTRUMENT": instrument,
+            "DESCRIPTION": txn_req.get('description', 'Generic'),
+            "CURRENCY_ORIG": txn_req.get('currency_orig'),
+            "AMOUNT": float(amount) if amount else None,
+            "DATE": txn_req.get('date'),
+            "CPTY_FIXED": cpty_fixed,
+            "NEEDS_FALLBACK": any(not cpty_fixed[k] for k in fallback_keys),
+        }
+
+    def _iter_requests(self, templates):
+        """Lazily expands compiled templates by their count (nothing is materialized)"""
+        if templates:
+            for tpl, count in templates:
+                for _ in range(count):
+                    yield tpl
+        else:
+            purchase = self._compile_template({"TYPE_HINT": "Purchase"})
+            for _ in range(random.randint(1, 5)):
+                yield purchase
+
+    def _pick_internal_account(self, all_accounts_list, cust_id):
+        """Random account of another customer; rejection sampling avoids rebuilding the candidate list per row"""
+        if hasattr(all_accounts_list, 'pick'): return all_accounts_list.pick(cust_id) # AccountDirectory
+        if not all_accounts_list: return None
+        for _ in range(16):
+            acc = random.choice(all_accounts_list)
+            if acc['CUSTOMER_SOURCE_UNIQUE_ID'] != cust_id: return acc
+        candidates = [a for a in all_accounts_list if a['CUSTOMER_SOURCE_UNIQUE_ID'] != cust_id]
+        return random.choice(candidates) if candidates else None
+
+    def generate_rows(self, account_contexts, run_date, global_blueprint=None, account_directory=None):
+        return list(self.iter_rows(account_contexts, run_date, global_blueprint, account_directory))
+
+    def _internal_cpty(self, int_acc):
+        """Counterparty block for an account of this bank"""
+        return {
+            "NAME": int_acc['ACCOUNT_NAME'],
+            "ADDRESS": int_acc.get('ADDRESS', ''),
+            "ZONE": "",
+            "CITY": int_acc.get('CITY', ''),
+            "POSTAL_CODE": int_acc.get('POSTAL_CODE', ''),
+            "COUNTRY": int_acc.get('COUNTRY_CODE', ''),
+            "ACCOUNT_NUM": int_acc['ACCOUNT_SOURCE_UNIQUE_ID'],
+            "ACCOUNT_NAME": int_acc['ACCOUNT_NAME'],
+            "ACCOUNT_TYPE": "Current",
+            "IBAN": int_acc.get('IBAN', ''),
+            "BIC": int_acc.get('BIC', ''),
+            "BANK_NAME": "INTERNAL BANK",
+            "BANK_CODE": "BNK_INT",
+            "BANK_ADDRESS": "Internal HQ",
+            "BANK_CITY": int_acc.get('CITY', ''),
+            "BANK_ZONE": "",
+            "BANK_POSTAL_CODE": "",
+            "BANK_COUNTRY": int_acc.get('COUNTRY_CODE', '')
+        }
+
+    def _external_cpty(self, tpl):
+        """External: Blueprint values first, Faker fallback only when something is missing"""
+        fixed = tpl['CPTY_FIXED']
+        fallback = self._get_counterparty() if tpl['NEEDS_FALLBACK'] else {}
+        return {
+            "NAME": fixed['NAME'] or fallback.get('NAME'),
+            "ADDRESS": fixed['ADDRESS'] or fallback.get('ADDRESS'),
+            "ZONE": fixed['ZONE'],
+            "CITY": fixed['CITY'] or fallback.get('CITY'),
+            "POSTAL_CODE": fixed['POSTAL_CODE'],
+            "COUNTRY": fixed['COUNTRY'] or fallback.get('COUNTRY'),
+            
+            "ACCOUNT_NUM": fixed['ACCOUNT_NUM'] or f"ACC-{random.randint(1000,9999)}",
+            "ACCOUNT_NAME": fixed['ACCOUNT_NAME'] or fallback.get('NAME'),
+            "ACCOUNT_TYPE": fixed['ACCOUNT_TYPE'],
+            "IBAN": fixed['IBAN'] or fallback.get('IBAN'),
+            "BIC": fixed['BIC'] or fallback.get('BIC'),
+            
+            "BANK_NAME": fixed['BANK_NAME'] or fallback.get('BANK'),
+            "BANK_CODE": fixed['BANK_CODE'],
+            "BANK_ADDRESS": fixed['BANK_ADDRESS'] or fallback.get('BANK_ADDRESS'),
+            "BANK_CITY": fixed['BANK_CITY'] or fallback.get('BANK_CITY'),
+            "BANK_ZONE": fixed['BANK_ZONE'],
+            "BANK_POSTAL_CODE": fixed['BANK_POSTAL_CODE'],
+            "BANK_COUNTRY": fixed['BANK_COUNTRY'] or fallback.get('BANK_COUNTRY')
+        }
+
+    def iter_rows(self, account_contexts, run_date, global_blueprint=None, account_directory=None):
+        """
+        Yields Transaction rows for the given accounts. Internal counterparties are
+        drawn from account_directory (a shared memory-mapped AccountDirectory) when
+        given, so a worker only needs its own shard of account_contexts.
+        """
         # Group Accounts by Customer ID
-        accounts_by_cust = {}
-        all_accounts_list = account_contexts # Reference for internal lookup
-        
-        for acc in account_contexts:
-            cust_id = acc['CUSTOMER_SOURCE_UNIQUE_ID']
-            if cust_id not in accounts_by_cust: accounts_by_cust[cust_id] = []
-            accounts_by_cust[cust_id].append(acc)
+        all_accounts_list = account_directory if account_directory is not None else account_contexts # Reference for internal lookup
+
+        if hasattr(account_contexts, 'iter_customers'):
+            # AccountDirectory: grouped on its mapped owner column, dicts built per customer as we go
+            customers = account_contexts.iter_customers()
+        else:
+            accounts_by_cust = {}
+            for acc in account_contexts:
+                cust_id = acc['CUSTOMER_SOURCE_UNIQUE_ID']
+                if cust_id not in accounts_by_cust: accounts_by_cust[cust_id] = []
+                accounts_by_cust[cust_id].append(acc)
+            customers = accounts_by_cust.items()
+
+        # Compile each blueprint item once for the whole run
+        self._seed_row('TEMPLATES')
+        templates = []
+        for bp_item in (global_blueprint or []):
+            templates.append((self._compile_template(bp_item), int(bp_item.get('count', 1))))
+
+        # Role-targeted internal counterparties (internal_counterparty_role) need the network index
+        role_picker = all_accounts_list if hasattr(all_accounts_list, 'pick') else None
+        if role_picker is None and any(tpl['CPTY_ROLE'] for tpl, _ in templates):
+            role_picker = NetworkIndex(all_accounts_list)
+
+        # Rows are yielded in batches: their foreign-currency amounts are converted together
+        batch, fx_rows, fx_pending = [], [], []
 
         # Iterate through every Customer
-        for cust_id, accounts in accounts_by_cust.items():
+        for cust_id, accounts in customers:
             if not accounts: continue
 
-            txns_to_make = []
-            if global_blueprint:
-                for bp_item in global_blueprint:
-                    count = int(bp_item.get('count', 1))
-                    for _ in range(count):
-                        txns_to_make.append(bp_item)
-            else:
-                for _ in range(random.randint(1, 5)):
-                    txns_to_make.append({"TYPE_HINT": "Purchase"})
-
-            for txn_req in txns_to_make:
+            # Seeded runs: a customer's rows depend only on (seed, customer, row number)
+            self._seed_row('TRANSACTIONS', cust_id)
+            for row_no, tpl in enumerate(self._iter_requests(templates)):
+                self._seed_row('TRANSACTIONS', cust_id, row_no)
                 target_acc = random.choice(accounts)
-                
-# --- LOGIC START ---
-
-                # 1. ORG UNIT
-                org_unit = target_acc.get('ORG_UNIT_CODE', '')
-
-                # 2. CHANNEL
-                chan_desc = txn_req.get('channel_desc', 'INTERNET').upper()
-                chan_code = self.channel_map.get(chan_desc, 'CH001') # Default
-                if not chan_code and self.channel_codes: chan_code = self.channel_codes[0]
-
-                # 3. CREDIT/DEBIT
-                cd_code = txn_req.get('credit_debit')
-                if not cd_code: cd_code = 'D' if txn_req.get('TYPE_HINT') == 'Purchase' else 'C'
-
-                # --- NEW LOGIC FOR REQ 14-18 & 9 (Source Type) ---
-                
-                # Payment Mean & Source Type
-                pay_mean = txn_req.get('payment_mean', 'Wire Transfer')
-                bp_type_desc = txn_req.get('txn_type_desc', '').upper()
-                txn_source_type_code = self.txn_type_map.get(bp_type_desc, "TT0013") # Default to Other if missing
-
-                # Internal/External Scope
-                is_internal = txn_req.get('is_internal', False)
-                scope_desc = "INTERNAL" if is_internal else "EXTERNAL"
-
-                # Instrument Mapping (Simple keyword check)
-                pm_upper = pay_mean.upper()
-                if "CARD" in pm_upper: instrument = "CARD"
-                elif "CASH" in pm_upper or "CURRENCY" in pm_upper: instrument = "CASH"
-                elif "CHECK" in pm_upper or "CHEQUE" in pm_upper: instrument = "CHEQUE"
-                else: instrument = "WIRE"
-
-                # 4. COUNTERPARTY RESOLUTION (Expanded)
-                cpty_data = {}
-
-                if is_internal:
-                    candidates = [a for a in all_accounts_list if a['CUSTOMER_SOURCE_UNIQUE_ID'] != cust_id]
-                    if candidates:
-                        int_acc = random.choice(candidates)
-                        cpty_data = {
-                            "NAME": int_acc['ACCOUNT_NAME'],
-                            "ADDRESS": int_acc.get('ADDRESS', ''),
-                            "ZONE": "",
-                            "CITY": int_acc.get('CITY', ''),
-                            "POSTAL_CODE": int_acc.get('POSTAL_CODE', ''),
-                            "COUNTRY": int_acc.get('COUNTRY_CODE', ''),
-                            "ACCOUNT_NUM": int_acc['ACCOUNT_SOURCE_UNIQUE_ID'],
-                            "ACCOUNT_NAME": int_acc['ACCOUNT_NAME'],
-                            "ACCOUNT_TYPE": "Current",
-                            "IBAN": int_acc.get('IBAN', ''),
-                            "BIC": int_acc.get('BIC', ''),
-                            "BANK_NAME": "INTERNAL BANK",
-                            "BANK_CODE": "BNK_INT",
-                            "BANK_ADDRESS": "Internal HQ",
-                            "BANK_CITY": int_acc.get('CITY', ''),
-                            "BANK_ZONE": "",
-                            "BANK_POSTAL_CODE": "",
-                            "BANK_COUNTRY": int_acc.get('COUNTRY_CODE', '')
-                        }
-                    else:
-                        cpty_data = self._get_counterparty()
-                else:
-                    # External: Map all new Brain fields
-                    fallback = self._get_counterparty()
-                    cpty_data = {
-                        "NAME": txn_req.get('counterparty_name') or fallback['NAME'],
-                        "ADDRESS": txn_req.get('counterparty_address') or fallback['ADDRESS'],
-                        "ZONE": txn_req.get('counterparty_zone', ''),
-                        "CITY": txn_req.get('counterparty_city') or fallback['CITY'],
-                        "POSTAL_CODE": txn_req.get('counterparty_postal_code', ''),
-                        "COUNTRY": txn_req.get('counterparty_country') or fallback['COUNTRY'],
-                        
-                        "ACCOUNT_NUM": txn_req.get('counterparty_account_num') or f"ACC-{random.randint(1000,9999)}",
-                        "ACCOUNT_NAME": txn_req.get('counterparty_account_name') or fallback['NAME'],
-                        "ACCOUNT_TYPE": txn_req.get('counterparty_account_type', 'Current'),
-                        "IBAN": txn_req.get('counterparty_account_iban') or fallback['IBAN'],
-                        "BIC": txn_req.get('counterparty_account_bic') or fallback['BIC'],
-                        
-                        "BANK_NAME": txn_req.get('counterparty_bank_name') or fallback['BANK'],
-                        "BANK_CODE": txn_req.get('counterparty_bank_code', 'BNK001'),
-                        "BANK_ADDRESS": txn_req.get('counterparty_bank_address') or fallback['BANK_ADDRESS'],
-                        "BANK_CITY": txn_req.get('counterparty_bank_city') or fallback['BANK_CITY'],
-                        "BANK_ZONE": txn_req.get('counterparty_bank_zone', ''),
-                        "BANK_POSTAL_CODE": txn_req.get('counterparty_bank_postal_code', ''),
-                        "BANK_COUNTRY": txn_req.get('counterparty_bank_country') or fallback['BANK_COUNTRY']
-                    }
-                    
-                # Geo Scope
-                geo_scope = "DOMESTIC" if target_acc['COUNTRY_CODE'] == cpty_data['COUNTRY'] else "INTERNATIONAL"
-
-                # 5. ORIGINATOR vs BENEFICIARY (Logic 5)
-                # If Debit (Out): Originator = Account Holder, Beneficiary = Cpty
-                # If Credit (In): Originator = Cpty, Beneficiary = Account Holder
-                
-                my_name = target_acc['ACCOUNT_NAME']
-                my_bank = "My Bank" # Simplified, usually derived from Branch/Org
-                
-                if cd_code == 'D':
-                    orig_name = my_name
-                    orig_bank = my_bank
-                    ben_name = cpty_data['NAME']
-                    ben_bank = cpty_data['BANK_NAME']
-                else:
-                    orig_name = cpty_data['NAME']
-                    orig_bank = cpty_data['BANK_NAME']
-                    ben_name = my_name
-                    ben_bank = my_bank
-
-                # Currency & Amounts (Previous Logic)
-                curr_orig = txn_req.get('currency_orig', target_acc['CURRENCY_CODE'])
-                curr_base = target_acc['CURRENCY_CODE']
-                
-                amt_orig = float(txn_req.get('amount_orig') or txn_req.get('AMOUNT') or random.uniform(10.0, 1000.0))
-                if curr_orig == curr_base:
-                    amt_base = amt_orig
-                else:
-                    rate_orig = fx_rates.get(curr_orig, 1.0)
-                    rate_base = fx_rates.get(curr_base, 1.0)
-                    amt_base = amt_orig * (rate_base / rate_orig)
-
-                # Date Logic
-                specified_date = txn_req.get('date')
-                if specified_date:
-                    orig_date = specified_date
+
+                # COUNTERPARTY RESOLUTION (Expanded)
+                # (built lazily: skipped entirely if the spec has no counterparty columns)
+                if tpl['IS_INTERNAL'] and tpl['CPTY_ROLE']:
+                    int_acc = role_picker.pick(cust_id, tpl['CPTY_ROLE'], target_acc.get('NETWORK_ID'))
+                    cpty_data = partial(self._internal_cpty, int_acc) if int_acc else self._get_counterparty
+                elif tpl['IS_INTERNAL']:
+                    int_acc = self._pick_internal_account(all_accounts_list, cust_id)
+                    cpty_data = partial(self._internal_cpty, int_acc) if int_acc else self._get_counterparty
                 else:
-                    dt_obj = datetime.strptime(run_date, "%Y%m%d") - timedelta(days=random.randint(0, 30))
-                    orig_date = dt_obj.strftime("%Y%m%d")
-
-                txn_unique_id = f"TXN-{random.randint(10000000, 99999999)}"
-
-                txn_ctx = {
-                    "RUN_TIMESTAMP": f"{run_date}000000",
-                    "SOURCE_TXN_NUM": txn_unique_id,
-                    "SOURCE_TXN_UNIQUE_ID": txn_unique_id,
-                    "ACCOUNT_SOURCE_UNIQUE_ID": target_acc['ACCOUNT_SOURCE_UNIQUE_ID'],
-                    "ACCOUNT_SOURCE_REF_ID": target_acc['ACCOUNT_SOURCE_UNIQUE_ID'],
-                    "CUSTOMER_SOURCE_UNIQUE_ID": cust_id,
-                    "PRIMARY_CUST_SRCE_REF_ID": cust_id,
-                    "BRANCH_ID": target_acc['BRANCH_ID'],
-                    
-                    "CURRENCY_CODE_ORIG": curr_orig,
-                    "CURRENCY_CODE_BASE": curr_base,
-                    "TXN_AMOUNT_ORIG": f"{amt_orig:.2f}",
-                    "TXN_AMOUNT_BASE": f"{amt_base:.2f}",
-                    "CREDIT_DEBIT_CODE": cd_code,
-                    "ORIGINATION_DATE": orig_date,
-                    "POSTING_DATE": orig_date,
-                    "VALUE_DATE": orig_date,
-                    "TRANS_REF_DESC": txn_req.get('description', 'Generic'),
-                    "TRANS_REF_DESC_2": pay_mean, 
-                    "TRANS_REF_DESC_3": scope_desc,
-                    "TRANS_REF_DESC_4": instrument,
-                    "TRANS_REF_DESC_5": geo_scope,
-                    "TRANS_REF_DESC_6": pay_mean,
-
-                    "TXN_SOURCE_TYPE_CODE": txn_source_type_code,
-                    "TXN_CHANNEL_CODE": chan_code,
-                    
-                    # ITEM 1: Channel
-                    "TXN_CHANNEL_CODE": chan_code,
-                    
-                    # ITEM 2: Org Unit
-                    "ORG_UNIT_CODE": org_unit,
-                    
-                    # ITEM 4: Counterparty Fields (a-r)
-"COUNTER_PARTY_NAME": cpty_data['NAME'],
-                    "COUNTER_PARTY_ADDRESS": cpty_data['ADDRESS'],
-                    "COUNTER_PARTY_ZONE": cpty_data['ZONE'],
-                    "COUNTER_PARTY_POSTAL_CODE": cpty_data['POSTAL_CODE'],
-                    "COUNTER_PARTY_CITY": cpty_data['CITY'],
-                    "COUNTER_PARTY_COUNTRY_CODE": cpty_data['COUNTRY'],
-                    "COUNTER_PARTY_ACCOUNT_NUM": cpty_data['ACCOUNT_NUM'],
-                    "COUNTER_PARTY_ACCOUNT_NAME": cpty_data['ACCOUNT_NAME'],
-                    "COUNTER_PARTY_ACCOUNT_TYPE": cpty_data['ACCOUNT_TYPE'],
-                    "COUNTER_PARTY_ACCOUNT_IBAN": cpty_data['IBAN'],
-                    "COUNTER_PARTY_ACCOUNT_BIC": cpty_data['BIC'],
-                    "COUNTER_PARTY_BANK_NAME": cpty_data['BANK_NAME'],
-                    "COUNTER_PARTY_BANK_CODE": cpty_data['BANK_CODE'],
-                    "COUNTER_PARTY_BANK_ADDRESS": cpty_data['BANK_ADDRESS'],
-                    "COUNTER_PARTY_BANK_CITY": cpty_data['BANK_CITY'],
-                    "COUNTER_PARTY_BANK_ZONE": cpty_data['BANK_ZONE'],
-                    "COUNTER_PARTY_BANK_POSTAL_CODE": cpty_data['BANK_POSTAL_CODE'],
-                    "COUNTER_PARTY_BNK_CNTRY_CD": cpty_data['BANK_COUNTRY'],
-
-                    # ITEM 5: Originator/Beneficiary
-                    "ORIGINATOR_NAME": orig_name,
-                    "BENEFICIARY_NAME": ben_name,
-                    "ORIGINATOR_BANK_NAME": orig_bank,
-                    "BENEFICIARY_BANK_NAME": ben_bank,
-                    
-                    # ITEM 6: Cashback
-                    "CASHBACK_AMT": "0"
-                }
-
-                # Map to CSV
-                row = []
-                for i, col in enumerate(self.txn_spec['columns']):
-                    col_name = col.upper()
-                    col_type = self.txn_spec['types'][i]
-                    val = ""
-                    if col_name in txn_ctx: val = txn_ctx[col_name]
-                    if self.txn_spec['mandatory'][i] == 'YES' and not val: 
-                        val = "0" if 'NUMBER' in col_type or 'DECIMAL' in col_type else "N"
-                    row.append(self._enforce_length(val, col_type))
-                csv_rows.append(row)
-
-        return csv_rows
\ No newline at end of file
+                    cpty_data = partial(self._external_cpty, tpl)
+
+                queued = len(fx_pending)
+                batch.append(self._build_row(tpl, target_acc, cpty_data, run_date, fx_pending=fx_pending))
+                if len(fx_pending) > queued: fx_rows.append(len(batch) - 1)
+                if len(batch) >= FX_BATCH_ROWS:
+                    yield from self._convert_batch(batch, fx_rows, fx_pending)
+                    batch, fx_rows, fx_pending = [], [], []
+        yield from self._convert_batch(batch, fx_rows, fx_pending)
+
+    def _convert_batch(self, rows, fx_rows, fx_pending):
+        """Fills TXN_AMOUNT_BASE of the rows whose conversion was queued (fx_rows[i] <-> fx_pending[i])"""
+        if fx_pending and self.amount_base_col is not None:
+            import numpy as np
+            curr_orig, curr_base, days, amounts = zip(*fx_pending)
+            converted = self.fx.convert_array(self.fx.codes(curr_orig), self.fx.codes(curr_base),
+                                              self.fx.day_indices(days), np.array(amounts, dtype=np.float64))
+            _, _, max_len = self.txn_plan[self.amount_base_col]
+            for row_idx, amount in zip(fx_rows, converted.tolist()):
+                val = f"{amount:.2f}"
+                rows[row_idx][self.amount_base_col] = val[:max_len] if max_len is not None else val
+        return rows
+
+    def iter_network_rows(self, account_contexts, run_date, network_blueprint):
+        """
+        Yields the rows of network patterns (FAN_IN, FAN_OUT, LAYERING, CYCLE) over the
+        HUB/FEEDER/BENEFICIARY members of each network_id. Every hop is written twice:
+        a debit on the paying account and a credit on the receiving one, each naming the
+        other as internal counterparty, so the topology can be rebuilt from the file.
+        """
+        if not network_blueprint: return
+        index = NetworkIndex(account_contexts)
+        run_ordinal = self.dates.parse(run_date)
+
+        for item_no, item in enumerate(network_blueprint):
+            pattern = str(item.get('pattern', '')).upper()
+            network_ids = [item['network_id']] if item.get('network_id') else index.network_ids
+            base = dict(item, is_internal=True)
+            base.pop('internal_counterparty_role', None)
+
+            for nid in network_ids:
+                self._seed_row('NETWORK', item_no, nid)
+                description = item.get('description') or f"{pattern} {nid}"
+                tpl_out = self._compile_template(dict(base, credit_debit='D', description=description))
+                tpl_in = self._compile_template(dict(base, credit_debit='C', description=description))
+                edges = index.iter_edges(
+                    nid, pattern, int(item.get('count', 1)), run_ordinal,
+                    base_amount=float(item.get('amount_orig') or 1000.0),
+                    fee=float(item.get('fee', 0.02)),
+                    seed=self.rng.key('NETWORK', item_no, nid) if self.rng else None
+                )
+                for hop_no, (src, dst, amount, day) in enumerate(edges):
+                    self._seed_row('NETWORK', item_no, nid, hop_no)
+                    src_acc, dst_acc = index.accounts[src], index.accounts[dst]
+                    orig_date = self.dates.fmt(day)
+                    yield self._build_row(tpl_out, src_acc, self._internal_cpty(dst_acc), run_date, amount, orig_date)
+                    yield self._build_row(tpl_in, dst_acc, self._internal_cpty(src_acc), run_date, amount, orig_date)
+
+    def _build_row(self, tpl, target_acc, cpty_data, run_date, amt_orig=None, orig_date=None, cd_code=None,
+                   fx_pending=None):
+        """
+        Maps one transaction (template + account + counterparty) to a CSV row.
+        cpty_data may be a dict or a callable returning one (only called if a column needs it).
+        fx_pending: list queuing a foreign-currency conversion instead (see _convert_batch).
+        """
+        ctx = TXN_COLUMNS.context({
+            "_gen": self, "TPL": tpl, "ACC": target_acc, "CPTY_SOURCE": cpty_data, "RUN_DATE": run_date,
+            "AMT_ORIG": amt_orig, "ORIG_DATE": orig_date, "CD": cd_code or tpl['CD_CODE'], "FX_PENDING": fx_pending
+        })
+        return TXN_COLUMNS.render(self.txn_plan, ctx)
\ No newline at end of file
@@ -0,0 +1,151 @@
+import random
+import hashlib
+from functools import partial
+
+# Labelled AML typologies overlaid on a generated population.
+# Customers are picked per typology by hashing (typology, customer ID), so selection
+# needs no state and the injector makes a single pass over the accounts. Injected rows
+# are built by the TransactionGenerator (same columns / rules as normal rows); each one
+# gets a ground-truth label row (TYPOLOGY_LABELS file).
+#
+#   typology_blueprint = [
+#       {"typology": "STRUCTURING", "fraction": 0.02, "threshold": 10000, "count": 6},
+#       {"typology": "RAPID_IN_OUT", "fraction": 0.01},
+#       {"typology": "ROUND_TRIP", "fraction": 0.01},
+#       {"typology": "HIGH_RISK_WIRE", "fraction": 0.01, "countries": ["IR", "KP"]},
+#   ]
+
+TYPOLOGIES = ("STRUCTURING", "RAPID_IN_OUT", "ROUND_TRIP", "HIGH_RISK_WIRE")
+
+# FATF call-for-action / increased-monitoring style list; only codes in 00_Spec_Country.txt are used
+DEFAULT_HIGH_RISK = ['KP', 'IR', 'MM', 'AF', 'SY', 'YE', 'VE', 'HT', 'SS', 'ML', 'NG', 'CD']
+
+LABEL_COLUMNS = ['CASE_ID', 'TYPOLOGY', 'CUSTOMER_SOURCE_UNIQUE_ID', 'ACCOUNT_SOURCE_UNIQUE_ID',
+                 'SOURCE_TXN_UNIQUE_ID', 'LEG']
+# Same shape as a _load_spec result, so the label table goes through the normal writers / sinks
+LABEL_SPEC = {
+    'columns': LABEL_COLUMNS,
+    'types': ['STRING (40)', 'STRING (20)', 'STRING (32)', 'STRING (32)', 'STRING (32)', 'STRING (20)'],
+    'mandatory': ['YES'] * len(LABEL_COLUMNS),
+}
+
+def _selected(typology, cust_id, fraction):
+    digest = hashlib.blake2b(f"{typology}|{cust_id}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') < fraction * 2 ** 64
+
+class TypologyInjector:
+    def __init__(self, gen_txn, typology_blueprint, country_file='00_Spec_Country.txt'):
+        self.gen = gen_txn
+        self.items = []
+        for item in typology_blueprint or []:
+            typology = str(item.get('typology', '')).upper()
+            if typology not in TYPOLOGIES:
+                print(f"Unknown typology '{typology}', skipped")
+                continue
+            self.items.append(dict(item, typology=typology))
+
+        _, known_countries = gen_txn.loader.load_file(country_file)
+        self.known_countries = set(known_countries)
+        self.txn_cols = [c.strip().upper() for c in gen_txn.txn_spec['columns']]
+        self._templates = {}
+
+    def _tpl(self, key, **req):
+        """Compiled template per (typology leg, country), built on first use"""
+        tpl = self._templates.get(key)
+        if tpl is None:
+            tpl = self._templates[key] = self.gen._compile_template(req)
+        return tpl
+
+    def _high_risk(self, item):
+        countries = [c for c in (item.get('countries') or DEFAULT_HIGH_RISK) if c in self.known_countries]
+        return countries or DEFAULT_HIGH_RISK[:1]
+
+    def iter_rows(self, account_contexts, run_date, labels, population=None):
+        """
+        Yields injected transaction rows and appends their label rows to labels.
+        population: accounts to draw round-trip partners from (default account_contexts).
+        Partner legs are written with the initiator's, so when generating a customer slice
+        the population must be the slice's own accounts (the orchestrator passes those).
+        """
+        if not self.items: return
+        population = population if population is not None else account_contexts
+        id_idx = self.txn_cols.index('SOURCE_TXN_UNIQUE_ID') if 'SOURCE_TXN_UNIQUE_ID' in self.txn_cols else None
+        run_ord = self.gen.dates.parse(run_date)
+        seen = set()
+
+        for acc in account_contexts:
+            cust_id = acc['CUSTOMER_SOURCE_UNIQUE_ID']
+            if cust_id in seen: continue # one case per customer and typology, on its first account
+            seen.add(cust_id)
+            for item in self.items:
+                typology = item['typology']
+                if not _selected(typology, cust_id, float(item.get('fraction', 0.01))): continue
+                self.gen._seed_row('TYPOLOGY', typology, cust_id)
+                case_id = f"{typology[:4]}-{cust_id}"
+                legs = getattr(self, '_' + typology.lower())(item, acc, cust_id, run_ord, population)
+                for leg, owner, row in legs:
+                    labels.append([case_id, typology, owner['CUSTOMER_SOURCE_UNIQUE_ID'], owner['ACCOUNT_SOURCE_UNIQUE_ID'],
+                                   row[id_idx] if id_idx is not None else "", leg])
+                    yield row
+
+    def _row(self, tpl, acc, cpty, run_ord, amount, day, cd_code=None):
+        day = min(day, run_ord)
+        return self.gen._build_row(tpl, acc, cpty, self.gen.dates.fmt(run_ord), round(amount, 2), self.gen.dates.fmt(day), cd_code)
+
+    def _structuring(self, item, acc, cust_id, run_ord, population):
+        """Cash deposits just below the reporting threshold on consecutive days"""
+        threshold = float(item.get('threshold', 10000))
+        tpl = self._tpl('STRUCTURING', credit_debit='C', channel_desc='BRANCH', payment_mean='Cash',
+                        txn_type_desc='Cash', description='Cash deposit')
+        day = run_ord - random.randint(7, 25)
+        for i in range(int(item['count'] if 'count' in item else random.randint(3, 8))):
+            amount = threshold * random.uniform(0.80, 0.99)
+            yield 'DEPOSIT', acc, self._row(tpl, acc, partial(self.gen._external_cpty, tpl), run_ord, amount, day + i)
+
+    def _rapid_in_out(self, item, acc, cust_id, run_ord, population):
+        """Large incoming wire, forwarded within two days in 1-3 outgoing wires"""
+        threshold = float(item.get('threshold', 10000))
+        tpl_in = self._tpl('RAPID_IN', credit_debit='C', channel_desc='SWIFT', payment_mean='Wire Transfer',
+                           txn_type_desc='Wire Transfer', description='Incoming transfer')
+        tpl_out = self._tpl('RAPID_OUT', credit_debit='D', channel_desc='SWIFT', payment_mean='Wire Transfer',
+                            txn_type_desc='Wire Transfer', description='Outgoing transfer')
+        day = run_ord - random.randint(3, 25)
+        amount = threshold * random.uniform(3, 20)
+        yield 'IN', acc, self._row(tpl_in, acc, partial(self.gen._external_cpty, tpl_in), run_ord, amount, day)
+        parts = random.randint(1, 3)
+        out_total = amount * random.uniform(0.90, 0.98)
+        for _ in range(parts):
+            yield 'OUT', acc, self._row(tpl_out, acc, partial(self.gen._external_cpty, tpl_out), run_ord,
+                                        out_total / parts, day + random.randint(0, 2))
+
+    def _round_trip(self, item, acc, cust_id, run_ord, population):
+        """Funds leave to another customer's account and come back a few days later, minus a cut"""
+        partner = self.gen._pick_internal_account(population, cust_id)
+        if partner is None: return
+        threshold = float(item.get('threshold', 10000))
+        tpl_out = self._tpl('ROUND_OUT', credit_debit='D', is_internal=True, payment_mean='Wire Transfer',
+                            txn_type_desc='Electronic Transfer', description='Transfer')
+        tpl_in = self._tpl('ROUND_IN', credit_debit='C', is_internal=True, payment_mean='Wire Transfer',
+                           txn_type_desc='Electronic Transfer', description='Transfer')
+        day = run_ord - random.randint(6, 25)
+        back_day = day + random.randint(1, 5)
+        amount = threshold * random.uniform(1, 10)
+        back = amount * random.uniform(0.93, 0.99)
+        own_cpty, partner_cpty = partial(self.gen._internal_cpty, acc), partial(self.gen._internal_cpty, partner)
+        yield 'OUT', acc, self._row(tpl_out, acc, partner_cpty, run_ord, amount, day)
+        yield 'PARTNER_IN', partner, self._row(tpl_in, partner, own_cpty, run_ord, amount, day)
+        yield 'PARTNER_OUT', partner, self._row(tpl_out, partner, own_cpty, run_ord, back, back_day)
+        yield 'BACK', acc, self._row(tpl_in, acc, partner_cpty, run_ord, back, back_day)
+
+    def _high_risk_wire(self, item, acc, cust_id, run_ord, population):
+        """Outgoing wires to counterparties in high-risk jurisdictions"""
+        threshold = float(item.get('threshold', 10000))
+        countries = self._high_risk(item)
+        for _ in range(int(item['count'] if 'count' in item else random.randint(1, 4))):
+            country = random.choice(countries)
+            tpl = self._tpl(('HIGH_RISK_WIRE', country), credit_debit='D', channel_desc='SWIFT',
+                            payment_mean='Wire Transfer', txn_type_desc='Wire Transfer', description='International transfer',
+                            counterparty_country=country, counterparty_bank_country=country)
+            amount = threshold * random.uniform(0.5, 3)
+            yield 'WIRE_OUT', acc, self._row(tpl, acc, partial(self.gen._external_cpty, tpl), run_ord,
+                                             amount, run_ord - random.randint(1, 25))
@@ -0,0 +1,237 @@
+import os
+import csv
+import json
+import hashlib
+import itertools
+from datetime import datetime
+from gen_shared import BaseGenerator
+from gen_schema import compile_rules
+from gen_typologies import LABEL_SPEC
+
+# Streaming validator for the generated files against the 0x_Spec_Fields_*.txt specs.
+# The parent reads each file with csv.reader and hands chunks of rows to worker processes,
+# which check the column rules and return 64-bit hashes of the key columns. The parent then
+# checks uniqueness and foreign keys on those hashes, one chunk at a time.
+
+TABLES = [
+    # name, file prefix, spec, unique key, foreign keys (column -> parent table)
+    ("CUSTOMERS", "CUSTOMERS", "01_Spec_Fields_customers.txt", "CUSTOMER_SOURCE_UNIQUE_ID", {}),
+    ("ACCOUNTS", "ACCOUNTS", "02_Spec_Fields_Accounts.txt", "ACCOUNT_SOURCE_UNIQUE_ID",
+        {"CUSTOMER_SOURCE_UNIQUE_ID": "CUSTOMERS"}),
+    ("LINKS", "CUSTOMER_ACCOUNT_LINK", "04_Spec_Fields_CustomerAccountLink.txt", None,
+        {"ACCOUNT_SOURCE_UNIQUE_ID": "ACCOUNTS", "CUSTOMER_SOURCE_UNIQUE_ID": "CUSTOMERS"}),
+    ("TRANSACTIONS", "TRANSACTIONS", "03_Spec_Fields_Transactions.txt", "SOURCE_TXN_UNIQUE_ID",
+        {"ACCOUNT_SOURCE_UNIQUE_ID": "ACCOUNTS", "CUSTOMER_SOURCE_UNIQUE_ID": "CUSTOMERS"}),
+    # The label spec lives in gen_typologies (a _load_spec shaped dict, not a file)
+    ("TYPOLOGY_LABELS", "TYPOLOGY_LABELS", LABEL_SPEC, None,
+        {"SOURCE_TXN_UNIQUE_ID": "TRANSACTIONS", "ACCOUNT_SOURCE_UNIQUE_ID": "ACCOUNTS",
+         "CUSTOMER_SOURCE_UNIQUE_ID": "CUSTOMERS"}),
+]
+MAX_SAMPLES = 20
+
+def load_table_spec(spec, spec_reader=None):
+    """Spec dict for a TABLES entry (spec file name or in-code spec)"""
+    if isinstance(spec, dict): return spec
+    return (spec_reader or BaseGenerator())._load_spec(spec)
+
+def hash_key(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'little')
+
+MAX_CACHED_DATES = 65536
+
+class ChunkChecker:
+    """Column rules of one table plus a bounded cache of date strings already parsed"""
+    def __init__(self, rules, key_cols):
+        self.rules = rules
+        self.key_idx = {col: [r[0] for r in rules].index(col) for col in key_cols}
+        self.dates = {}
+
+    def valid_date(self, val):
+        ok = self.dates.get(val)
+        if ok is None:
+            try: ok = len(val) == 8 and bool(datetime.strptime(val, "%Y%m%d"))
+            except ValueError: ok = False
+            if len(self.dates) >= MAX_CACHED_DATES: self.dates.clear()
+            self.dates[val] = ok
+        return ok
+
+    def check(self, first_row, rows):
+        """(row count, error counts, samples, {key column: [hashes]})"""
+        rules, n_cols = self.rules, len(self.rules)
+        errors, samples = {}, []
+        keys = {col: [] for col in self.key_idx}
+
+        def fail(row_no, col, rule, val):
+            errors[(col, rule)] = errors.get((col, rule), 0) + 1
+            if len(samples) < MAX_SAMPLES: samples.append([row_no, col, rule, val[:50]])
+
+        for offset, row in enumerate(rows):
+            row_no = first_row + offset
+            if len(row) != n_cols:
+                fail(row_no, '*', 'column_count', str(len(row)))
+            for (col, kind, arg, mandatory), val in zip(rules, row):
+                if not val:
+                    if mandatory: fail(row_no, col, 'mandatory', val)
+                    continue
+                if kind == 'STRING':
+                    if len(val) > arg: fail(row_no, col, 'length', val)
+                elif kind == 'DATE':
+                    if not self.valid_date(val): fail(row_no, col, 'date_format', val)
+                elif kind == 'TIMESTAMP':
+                    if len(val) != 14 or not val.isdigit() or not self.valid_date(val[:8]): fail(row_no, col, 'timestamp_format', val)
+                elif kind == 'DECIMAL':
+                    whole, _, frac = val.lstrip('-').partition('.')
+                    if not whole.isdigit() or len(whole) > arg[0] - arg[1] or (frac and (not frac.isdigit() or len(frac) > arg[1])):
+                        fail(row_no, col, 'decimal', val)
+                elif kind == 'INTEGER':
+                    if not val.lstrip('-').isdigit(): fail(row_no, col, 'integer', val)
+                elif kind == 'NUMBER':
+                    try: float(val)
+                    except ValueError: fail(row_no, col, 'number', val)
+            for col, idx in self.key_idx.items():
+                keys[col].append(hash_key(row[idx]) if idx < len(row) else 0)
+        return len(rows), errors, samples, keys
+
+_CHECKER = None
+
+def _init_worker(rules, key_cols):
+    global _CHECKER
+    _CHECKER = ChunkChecker(rules, key_cols)
+
+def check_chunk(args):
+    """Worker: (first row number, rows) -> ChunkChecker.check result"""
+    return _CHECKER.check(*args)
+
+class BloomFilter:
+    """Fixed-memory set of 64-bit hashes (false positives possible, no false negatives)"""
+    def __init__(self, bits, hashes=4):
+        import numpy as np
+        self.bits = int(bits)
+        self.hashes = hashes
+        self.array = np.zeros((self.bits + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, values):
+        import numpy as np
+        h1 = values & np.uint64(0xFFFFFFFF)
+        h2 = (values >> np.uint64(32)) | np.uint64(1)
+        return [((h1 + np.uint64(i) * h2) % np.uint64(self.bits)).astype(np.int64) for i in range(self.hashes)]
+
+    def contains(self, values):
+        import numpy as np
+        found = np.ones(len(values), dtype=bool)
+        for pos in self._positions(values):
+            found &= ((self.array[pos >> 3] >> (pos & 7).astype(np.uint8)) & 1) == 1
+        return found
+
+    def add(self, values):
+        import numpy as np
+        for pos in self._positions(values):
+            np.bitwise_or.at(self.array, pos >> 3, (np.uint8(1) << (pos & 7).astype(np.uint8)))
+
+class KeySet:
+    """Unique-key tracker: exact (sorted hash arrays) or Bloom filter when bloom_bits is set"""
+    def __init__(self, bloom_bits=None):
+        self.bloom = BloomFilter(bloom_bits) if bloom_bits else None
+        self.parts = []
+        self.sorted = None
+        self.duplicates = 0
+
+    def add(self, hashes):
+        import numpy as np
+        values, counts = np.unique(np.asarray(hashes, dtype=np.uint64), return_counts=True)
+        self.duplicates += int((counts - 1).sum())
+        if self.bloom is not None:
+            self.duplicates += int(self.bloom.contains(values).sum())
+            self.bloom.add(values)
+        else:
+            self.parts.append(values)
+
+    def finish(self):
+        """Counts duplicates across chunks (exact mode) and freezes the set for lookups"""
+        import numpy as np
+        if self.bloom is None:
+            merged = np.sort(np.concatenate(self.parts)) if self.parts else np.zeros(0, dtype=np.uint64)
+            dup = merged[1:] == merged[:-1]
+            self.duplicates += int(dup.sum())
+            self.sorted = merged[np.concatenate([[True], ~dup])] if len(merged) else merged
+            self.parts = []
+
+    def missing(self, hashes):
+        """How many of hashes are not in the set"""
+        import numpy as np
+        values = np.asarray(hashes, dtype=np.uint64)
+        if self.bloom is not None: return int((~self.bloom.contains(values)).sum())
+        if not len(self.sorted): return len(values)
+        pos = np.clip(np.searchsorted(self.sorted, values), 0, len(self.sorted) - 1)
+        return int((self.sorted[pos] != values).sum())
+
+def _iter_chunks(path, chunk_rows, header):
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f, delimiter='|')
+        if header: next(reader, None)
+        row_no = 2 if header else 1
+        while True:
+            rows = list(itertools.islice(reader, chunk_rows))
+            if not rows: break
+            yield row_no, rows
+            row_no += len(rows)
+
+def validate_run(output_dir, run_date, workers=None, chunk_rows=100000, header=False,
+                 bloom_bits=None, report_name="validation_report.json"):
+    """
+    Validates the output files of a run (typology labels included) and writes a JSON summary report.
+    workers: process count (None = all CPUs, 1 = in-process).
+    bloom_bits: switch ID uniqueness / FK sets to fixed-size Bloom filters (for 100M+ rows).
+    """
+    import multiprocessing
+    workers = workers or os.cpu_count() or 1
+    spec_reader = BaseGenerator()
+    key_sets = {}
+    report = {"run_date": run_date, "tables": {}, "ok": True}
+
+    for name, prefix, spec_file, unique_col, fks in TABLES:
+        path = os.path.join(output_dir, f"{prefix}_{run_date}.txt")
+        if not os.path.exists(path): continue
+        rules = compile_rules(load_table_spec(spec_file, spec_reader))
+        columns = [r[0] for r in rules]
+        key_cols = [c for c in ([unique_col] if unique_col else []) + list(fks) if c in columns]
+        fk_checks = {col: parent for col, parent in fks.items() if col in columns and parent in key_sets}
+        own_keys = KeySet(bloom_bits) if unique_col in key_cols else None
+
+        summary = {"rows": 0, "errors": {}, "samples": [], "duplicate_ids": 0, "orphans": {c: 0 for c in fk_checks}}
+        chunks = _iter_chunks(path, chunk_rows, header)
+        if workers > 1:
+            pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(rules, key_cols))
+            results = pool.imap_unordered(check_chunk, chunks)
+        else:
+            pool = None
+            _init_worker(rules, key_cols)
+            results = map(check_chunk, chunks)
+
+        try:
+            for n_rows, errors, samples, keys in results:
+                summary["rows"] += n_rows
+                for (col, rule), n in errors.items():
+                    summary["errors"].setdefault(col, {})
+                    summary["errors"][col][rule] = summary["errors"][col].get(rule, 0) + n
+                summary["samples"].extend(samples[:MAX_SAMPLES - len(summary["samples"])])
+                if own_keys is not None: own_keys.add(keys[unique_col])
+                for col, parent in fk_checks.items():
+                    summary["orphans"][col] += key_sets[parent].missing(keys[col])
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        if own_keys is not None:
+            own_keys.finish()
+            summary["duplicate_ids"] = own_keys.duplicates
+            key_sets[name] = own_keys
+        summary["samples"].sort()
+        summary["ok"] = not summary["errors"] and not summary["duplicate_ids"] and not any(summary["orphans"].values())
+        report["ok"] = report["ok"] and summary["ok"]
+        report["tables"][name] = summary
+
+    with open(os.path.join(output_dir, report_name), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return report
@@ -13,6 +13,9 @@ import glob
 from datetime import datetime
 from openai import OpenAI
 from gen_orchestrator import generate_custom_data 
+from gen_snapshot import has_snapshot
+from gen_cache import ScenarioCache
+from gen_preview import LineIndex, ColumnProfiler, table_columns
 
 # =============================================================================
 # Configuration Settings
@@ -22,6 +25,7 @@ from gen_orchestrator import generate_custom_data
 
 HISTORY_FILE = "chat_history.json"
 BASE_OUTPUT_DIR = "generated_data"  
+CACHE_DIR = os.path.join(BASE_OUTPUT_DIR, "_cache") # per-profile rows, keyed by content hash
 
 st.set_page_config(
     page_title="Senior Data Consultant", 
@@ -120,6 +124,10 @@ tools = [{
                         "type": "object", 
                         "properties": { 
                             "type": {"enum": ["C", "P"]},
+                            "ref": {
+                                "type": "string",
+                                "description": "Short unique alias, used to name this customer as account owner elsewhere"
+                            },
                             "country": {"type": "string"},
                             "phone_country_code": {
                                 "type": "string",
@@ -144,6 +152,25 @@ tools = [{
                                         "overdraft_limit": {
                                             "type": "number",
                                             "description": "Overdraft limit amount. Default 0.00"
+                                        },
+                                        "owners": {
+                                            "type": "array",
+                                            "description": "Additional owners (joint holders, signatories) besides this customer",
+                                            "items": {
+                                                "type": "object",
+                                                "properties": {
+                                                    "customer_ref": {
+                                                        "type": "string",
+                                                        "description": "The 'ref' of another customer profile (or '#<position>' in the profile list)"
+                                                    },
+                                                    "role": {
+                                                        "type": "string",
+                                                        "description": "e.g. JOINT, SIGNATORY, GUARANTOR"
+                                                    },
+                                                    "from_date": {"type": "string"},
+                                                    "to_date": {"type": "string"}
+                                                }
+                                            }
                                         }
                                     }
                                 }
@@ -276,6 +303,30 @@ tools = [{
                             "count": {"type": "integer"} 
                         } 
                     } 
+                },
+                "network_patterns": {
+                    "type": "array",
+                    "description": "Optional money-flow patterns between customers sharing a network_id",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "pattern": {"enum": ["FAN_IN", "FAN_OUT", "LAYERING", "CYCLE"]},
+                            "network_id": {
+                                "type": "string",
+                                "description": "Omit to apply to every network"
+                            },
+                            "count": {
+                                "type": "integer",
+                                "description": "Number of rounds of the pattern"
+                            },
+                            "amount_orig": {"type": "number"},
+                            "currency_orig": {"type": "string"},
+                            "payment_mean": {"type": "string"},
+                            "channel_desc": {"type": "string"},
+                            "description": {"type": "string"}
+                        },
+                        "required": ["pattern"]
+                    }
                 }
             },
             "required": ["summary", "customer_profiles"]
@@ -356,6 +407,7 @@ You MUST estimate realistic **MONTHLY** averages for ALL the following fields. D
 Define the `accounts` list INSIDE each customer profile based on needs:
 - **Corp:** Business, Trading, or Currency accounts
 - **Indiv:** Current, Savings, or Joint accounts
+- **Joint / Signatories:** give the co-owner profile a `ref` and list it in the account's `owners` (role JOINT, SIGNATORY ...)
 
 ### 3. TRANSACTIONS (The "Brain" Logic)
 Define specific transactions in `transactions_per_customer`.
@@ -374,6 +426,10 @@ Define specific transactions in `transactions_per_customer`.
 - **Internal:** 
   - Between generated customers: set `is_internal` = True
   - Do NOT invent details; Engine will link them
+  - Use `internal_counterparty_role` to target a role (e.g. HUB) in the same `network_id`
+- **Networks:** 
+  - For mule / layering scenarios give customers a `role` and shared `network_id`
+  - Add `network_patterns` (FAN_IN, FAN_OUT, LAYERING, CYCLE) instead of listing each hop
 - **External:** 
   - Third party: set `is_internal` = False
   - MUST provide:
@@ -456,6 +512,23 @@ Valid Transaction Types (Pick for txn_type_desc):
 if "blueprint" in st.session_state and st.session_state["blueprint"]:
     st.divider()
     col1, col2 = st.columns([1, 4])
+    
+    # Previous runs with saved Customer/Account contexts can be reused
+    # so only Links and Transactions are regenerated (same IDs, much faster)
+    snapshot_runs = sorted(
+        [d for d in os.listdir(BASE_OUTPUT_DIR) if has_snapshot(os.path.join(BASE_OUTPUT_DIR, d))],
+        reverse=True
+    )
+    with col2:
+        reuse_run = st.selectbox(
+            "Reuse customers & accounts from",
+            ["(generate new)"] + snapshot_runs
+        )
+        if reuse_run == "(generate new)":
+            unchanged, changed = ScenarioCache(CACHE_DIR).diff(
+                st.session_state["blueprint"].get("customer_profiles", []), run_date)
+            st.caption(f"{unchanged} profile(s) unchanged (cached), {changed} new or changed")
+    
     with col1:
         if st.button("Generate Files Now", type="primary"):
             bp = st.session_state["blueprint"]
@@ -469,9 +542,65 @@ if "blueprint" in st.session_state and st.session_state["blueprint"]:
                     run_date, 
                     None,  # No global account blueprint anymore
                     bp.get("transactions_per_customer", []),
-                    output_dir=full_path
+                    output_dir=full_path,
+                    save_contexts=True,
+                    network_blueprint=bp.get("network_patterns"),
+                    cache_dir=CACHE_DIR,
+                    profile=True,
+                    restore_from=None if reuse_run == "(generate new)" else os.path.join(BASE_OUTPUT_DIR, reuse_run)
                 )
             
             st.success(f"Files saved to `{run_folder}`")
             st.session_state["blueprint"] = None
-            st.rerun()
\ No newline at end of file
+            st.rerun()
+
+# =============================================================================
+# Run Browser
+# - Pages through generated files without loading them (memory-mapped, line-offset index)
+# - Per-column statistics are computed in the background and refresh on demand
+# =============================================================================
+
+PAGE_SIZE = 100
+
+@st.cache_resource(max_entries=8)
+def open_index(path, mtime):
+    """One LineIndex per file version (the index itself is cached beside the file)"""
+    return LineIndex(path)
+
+@st.cache_resource(max_entries=8)
+def start_profiler(path, mtime, skip_header):
+    return ColumnProfiler(path, table_columns(path), skip_header=skip_header).start()
+
+run_dirs = sorted(
+    [d for d in os.listdir(BASE_OUTPUT_DIR) if d.startswith("run_") and os.path.isdir(os.path.join(BASE_OUTPUT_DIR, d))],
+    reverse=True
+)
+if run_dirs:
+    st.divider()
+    with st.expander("Browse Runs", expanded=False):
+        browse_col1, browse_col2 = st.columns(2)
+        with browse_col1:
+            browse_run = st.selectbox("Run", run_dirs)
+        run_files = sorted(glob.glob(os.path.join(BASE_OUTPUT_DIR, browse_run, "*.txt")))
+        with browse_col2:
+            browse_file = st.selectbox("File", run_files, format_func=os.path.basename) if run_files else None
+
+        if browse_file:
+            mtime = os.path.getmtime(browse_file)
+            index = open_index(browse_file, mtime)
+            columns = table_columns(browse_file)
+            has_header = bool(columns) and index.rows(0, 1) == [columns]
+            n_rows = len(index) - (1 if has_header else 0)
+            pages = max(1, -(-n_rows // PAGE_SIZE))
+
+            page = st.number_input(f"Page (of {pages:,}, {n_rows:,} rows)", min_value=1, max_value=pages, value=1)
+            rows = index.rows((page - 1) * PAGE_SIZE + (1 if has_header else 0), PAGE_SIZE)
+            width = max([len(r) for r in rows] + [len(columns or [])])
+            names = (columns or []) + [f"#{i + 1}" for i in range(len(columns or []), width)]
+            st.dataframe([dict(zip(names, r)) for r in rows], use_container_width=True)
+
+            profiler = start_profiler(browse_file, mtime, has_header)
+            status = "complete" if profiler.done else f"{profiler.progress:.0%} scanned"
+            st.caption(f"Column statistics: {profiler.rows:,} rows profiled ({status})")
+            if not profiler.done: st.button("Refresh statistics")
+            st.dataframe(profiler.snapshot(), use_container_width=True)
\ No newline at end of file